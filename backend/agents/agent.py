@@ -1,16 +1,22 @@
 from typing import List, Dict, Any, Optional, Callable
 from dataclasses import dataclass
 from datetime import datetime
-import json, os
+import json, os, time
+import asyncio
+from functools import partial
 import logging
-from openai import OpenAI
+from backend.agents.clients import get_llm_client
 from backend.tools.base_tool import BaseTool, ToolParameter, ParameterType
+from backend.tools.registry import ToolRegistry, ToolArgumentError
 from backend.agents.system_prompt import system_prompt_road_trip_planner
-import traceback
-from rich.console import Console
-from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from rich import print as rprint
+from backend.agents.executor import ToolExecutor
+from backend.agents.streaming import StreamedMessage
+from backend.agents.context import ContextBudget
+from backend.agents.run_context import RunContext, use_run_context
+from backend.agents.sinks import EventSink, NullSink
+from backend.agents.metrics import (
+    RunMetrics, LlmCallMetrics, ToolCallMetrics, measure_tool_call
+)
 
 @dataclass
 class Message:
@@ -36,25 +42,42 @@ class OpenAIAgent:
         base_url: str = "https://api.openai.com/v1",
         temperature: float = 0.7,
         on_message: Optional[Callable[[Message], None]] = None,
-        on_tool_use: Optional[Callable[[ToolCall], None]] = None
+        on_tool_use: Optional[Callable[[ToolCall], None]] = None,
+        max_workers: int = 8,
+        tool_concurrency: Optional[Dict[str, int]] = None,
+        executor: Optional[ToolExecutor] = None,
+        stream: bool = False,
+        context_budget: Optional[ContextBudget] = None,
+        sink: Optional[EventSink] = None,
+        client: Optional[Any] = None
     ):
-        self.console = Console()
+        # Destination des événements de déroulement (console rich, logs JSON, rien)
+        self.sink = sink or NullSink()
         self.name = name
-        self.tools = {tool.name: tool for tool in tools}
+        # Schémas figés et validateurs d'arguments précompilés
+        self.registry = tools if isinstance(tools, ToolRegistry) else ToolRegistry(tools)
+        self.tools = self.registry.tools
         self.conversation_history: List[Message] = []
         self.tool_calls_history: List[ToolCall] = []
         
         # Configuration Gemini
-        self.client = OpenAI(
-            api_key=api_key,
-            base_url=base_url
-        )
+        self.client = client or self._create_client(api_key, base_url)
         self.model = model
         self.temperature = temperature
+        # En mode streaming, les deltas du LLM sont émis au fil de l'eau
+        self.stream = stream
+        # Budget de tokens de la conversation envoyée au LLM (None = historique complet)
+        self.context_budget = context_budget
         
         # Callbacks pour le suivi en temps réel
         self.on_message = on_message
         self.on_tool_use = on_tool_use
+
+        # Exécution parallèle des appels d'outils d'un même tour
+        self.executor = executor or ToolExecutor(
+            max_workers=max_workers,
+            per_tool_limits=tool_concurrency
+        )
         
         # Configuration du logging améliorée
         self.logger = logging.getLogger(f"agent.{name}")
@@ -69,51 +92,15 @@ class OpenAIAgent:
             self.logger.addHandler(console_handler)
         
         self.logger.debug(f"Agent {name} initialized with model {model}")
-        self.console.print(f"[bold green]Agent {name} initialized with model {model}[/bold green]")
+        self.sink.emit("agent_initialized", name=name, model=model)
+
+    def _create_client(self, api_key: str, base_url: Optional[str]):
+        # Client keep-alive partagé par tous les agents du processus
+        return get_llm_client(api_key, base_url)
 
     def _create_tools_description(self) -> List[Dict[str, Any]]:
         """Crée la description des outils pour l'API OpenAI"""
-        # Mapping des types pour JSON Schema
-        type_mapping = {
-            ParameterType.STRING: "string",
-            ParameterType.INTEGER: "integer",
-            ParameterType.FLOAT: "number",
-            ParameterType.BOOLEAN: "boolean",
-            ParameterType.LIST: "array",
-            ParameterType.DICT: "object"
-        }
-
-        tools = []
-        for tool in self.tools.values():
-            tool_desc = {
-                "type": "function",
-                "function": {
-                    "name": tool.name,
-                    "description": tool.description,
-                    "parameters": {
-                        "type": "object",
-                        "properties": {},
-                        "required": []
-                    }
-                }
-            }
-            
-            # Ajout des paramètres
-            for param in tool.parameters:
-                tool_desc["function"]["parameters"]["properties"][param.name] = {
-                    "type": type_mapping[param.param_type],
-                    "description": param.description
-                }
-                if param.constraints:
-                    if "choices" in param.constraints:
-                        tool_desc["function"]["parameters"]["properties"][param.name]["enum"] = \
-                            param.constraints["choices"]
-                if param.required:
-                    tool_desc["function"]["parameters"]["required"].append(param.name)
-            
-            tools.append(tool_desc)
-        
-        return tools
+        return self.registry.schemas
 
     def _add_to_history(self, message: Message):
         """Ajoute un message à l'historique"""
@@ -124,10 +111,11 @@ class OpenAIAgent:
 
     def _get_tools_schema(self) -> List[Dict[str, Any]]:
         """Retourne le schéma des outils au format OpenAI"""
-        return [tool.get_schema() for tool in self.tools]
+        return self.registry.schemas
 
-    def execute_task(self, task_description: str, max_steps: int = 40):
-        self.console.print(Panel(f"[bold blue]New Task[/bold blue]\n{task_description}"))
+    def _start_task(self, task_description: str, max_steps: int):
+        """Prépare les messages initiaux et les événements correspondants"""
+        self.sink.emit("task_started", task=task_description, max_steps=max_steps)
         
         self.logger.debug(f"Starting task: {task_description}")
         
@@ -141,149 +129,387 @@ class OpenAIAgent:
         )
         
         messages = [system_message, user_message]
+        # État propre à ce trip, partagé avec les outils pendant leur exécution
+        self.run_context = RunContext()
+        self.run_metrics = RunMetrics()
+        events = [
+            {
+                'type': 'message',
+                'data': system_message.__dict__
+            },
+            {
+                'type': 'message',
+                'data': user_message.__dict__
+            }
+        ]
+        return messages, events
+
+    def _completion_kwargs(self, messages: List[Message]) -> Dict[str, Any]:
+        """Arguments de l'appel chat.completions.create pour l'état courant"""
+        api_messages = [
+            {
+                "role": msg.role, 
+                "content": msg.content,
+                **({"name": msg.name} if msg.name else {}),
+                **({"tool_call_id": msg.tool_call_id} if msg.tool_call_id else {})
+            }
+            for msg in (self.context_budget.fit(messages) if self.context_budget else messages)
+        ]
+        return {
+            "model": self.model,
+            "messages": api_messages,
+            "tools": self.registry.schemas,
+            "tool_choice": "auto",
+            "temperature": self.temperature
+        }
+
+    def _complete(self, messages: List[Message]):
+        """Appelle le LLM et renvoie le message de l'assistant.
+
+        En mode streaming, émet les événements message_delta / tool_call_delta au fil de l'eau.
+        """
+        kwargs = self._completion_kwargs(messages)
+        start = time.perf_counter()
+        if not self.stream:
+            response = self.client.chat.completions.create(**kwargs)
+            yield self._llm_metrics_event(start, usage=response.usage)
+            return response.choices[0].message
+
+        streamed = StreamedMessage(start)
+        response = self.client.chat.completions.create(**self._stream_kwargs(kwargs))
+        # create() rend la main à la réception des en-têtes : attente côté fournisseur
+        streamed.mark_queued()
+        for chunk in response:
+            yield from streamed.add_chunk(chunk)
+        yield self._stream_metrics_event(streamed)
+        return streamed
+
+    def _stream_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Arguments de create() pour une réponse streamée ; l'usage arrive dans un dernier chunk sans choix"""
+        return {**kwargs, "stream": True, "stream_options": {"include_usage": True}}
+
+    def _stream_metrics_event(self, streamed: StreamedMessage) -> Dict[str, Any]:
+        """Mesures d'une réponse streamée entièrement reçue (agents sync et async)"""
+        return self._llm_metrics_event(streamed.started_at, streamed.queued_at, streamed.first_token_at, streamed.usage)
+
+    def _llm_metrics_event(
+        self,
+        start: float,
+        queued_at: Optional[float] = None,
+        first_token_at: Optional[float] = None,
+        usage: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        """Enregistre les mesures d'un appel LLM et renvoie l'événement `metrics`"""
+        metrics = LlmCallMetrics(
+            step=len(self.run_metrics.llm_calls) + 1,
+            seconds=time.perf_counter() - start,
+            queue_seconds=None if queued_at is None else queued_at - start,
+            ttft_seconds=None if first_token_at is None else first_token_at - start,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None)
+        )
+        self.run_metrics.add_llm_call(metrics)
+        return self._metrics_event(metrics.to_dict())
+
+    def _tool_metrics_event(self, metrics: ToolCallMetrics) -> Dict[str, Any]:
+        self.run_metrics.add_tool_call(metrics)
+        return self._metrics_event(metrics.to_dict())
+
+    def _metrics_event(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        self.sink.emit("metrics", **data)
+        return {
+            'type': 'metrics',
+            'data': data
+        }
+
+    def _on_assistant_message(self, assistant_message, messages: List[Message]):
+        """Ajoute la réponse de l'assistant et renvoie (événements, appels d'outils)"""
+        # Créer un Message à partir de la réponse de l'assistant
+        assistant_msg = Message(
+            role="assistant",
+            content=assistant_message.content if assistant_message.content else ""
+        )
+        messages.append(assistant_msg)
         
-        # Yield initial messages
-        yield {
+        events = [{
             'type': 'message',
-            'data': system_message.__dict__
+            'data': assistant_msg.__dict__
+        }]
+        
+        if assistant_message.content:
+            self.sink.emit("assistant_message", content=assistant_message.content)
+        
+        calls = []
+        for tool_call in assistant_message.tool_calls or []:
+            tool_name = tool_call.function.name
+            try:
+                tool_args = json.loads(tool_call.function.arguments or "{}")
+            except ValueError:
+                # Rejeté avec une erreur structurée lors de la validation
+                tool_args = tool_call.function.arguments
+            # Identifiant repris par tool_result et tool_result_patch
+            call_id = self.run_context.next_id("call_")
+            calls.append((tool_name, tool_args, call_id))
+            
+            self.sink.emit("tool_call", tool_name=tool_name, parameters=tool_args)
+            
+            events.append({
+                'type': 'tool_call',
+                'data': {
+                    'tool_name': tool_name,
+                    'parameters': tool_args,
+                    'call_id': call_id
+                }
+            })
+        return events, calls
+
+    def _invoke_tool(
+        self,
+        tool_name: str,
+        tool_args: Dict[str, Any],
+        metrics: ToolCallMetrics,
+        call_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Valide les arguments puis exécute l'outil, en le chronométrant dans `metrics`.
+
+        Des arguments invalides sont rejetés localement : le modèle reçoit l'erreur
+        structurée comme résultat de l'outil et peut corriger son appel.
+        """
+        try:
+            arguments = self.registry.validate(tool_name, tool_args)
+        except ToolArgumentError as e:
+            return e.to_dict()
+        with use_run_context(self.run_context, call_id), measure_tool_call(metrics):
+            return self.tools[tool_name].execute(**arguments)
+
+    def _tool_result_event(self, tool_name: str, result: Dict[str, Any], call_id: Optional[str] = None) -> Dict[str, Any]:
+        self.sink.emit("tool_result", tool_name=tool_name, result=result)
+        return {
+            'type': 'tool_result',
+            'data': {
+                'tool_name': tool_name,
+                'result': result,
+                'call_id': call_id
+            }
         }
-        yield {
-            'type': 'message',
-            'data': user_message.__dict__
+
+    def _patch_events(self) -> List[Dict[str, Any]]:
+        """Valeurs différées des résultats d'outils déjà disponibles (ex: images des hôtels)"""
+        events = []
+        for patch in self.run_context.pop_completed():
+            self.sink.emit("tool_result_patch", **patch)
+            events.append({
+                'type': 'tool_result_patch',
+                'data': patch
+            })
+        return events
+
+    def _tool_error_event(self, tool_name: str, error: Exception, call_id: Optional[str] = None) -> Dict[str, Any]:
+        self.sink.emit("tool_error", tool_name=tool_name, error=error)
+        return {
+            'type': 'error',
+            'data': {
+                'message': str(error),
+                'tool_name': tool_name,
+                'call_id': call_id
+            }
+        }
+
+    @staticmethod
+    def _error_result(error: Exception) -> Dict[str, Any]:
+        """Résultat envoyé au modèle à la place de celui d'un outil qui a échoué"""
+        return {"error": f"An error occurred: {str(error)}"}
+
+    def _error_event(self, error: Exception) -> Dict[str, Any]:
+        self.sink.emit("error", error=error)
+        return {
+            'type': 'error',
+            'data': {
+                'message': str(error)
+            }
         }
+
+    def _compact_result(self, tool_name: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Projection du résultat envoyée au modèle ; le client SSE reçoit le résultat complet"""
+        if tool_name not in self.tools or not isinstance(result, dict):
+            return result
+        with use_run_context(self.run_context):
+            return self.tools[tool_name].compact(result)
+
+    def _on_tool_results(self, calls, results, messages: List[Message]):
+        """Ajoute les réponses des outils dans l'ordre des appels, renvoie (événements, terminé)"""
+        events = []
+        done = False
+        for (tool_name, _, _), result in zip(calls, results):
+            if tool_name == "return" and "result" in result:
+                # Dernières valeurs différées puis bilan du trip, émis avant le résultat final
+                events.extend(self._patch_events())
+                events.append(self._metrics_event(self.run_metrics.summary()))
+                events.append({
+                    'type': 'final_result',
+                    'data': result["result"]
+                })
+                self.sink.emit("task_completed")
+                done = True
+
+            # Créer un Message pour la réponse de l'outil, avec la projection compacte destinée au modèle
+            tool_msg = Message(
+                role="function",
+                name=tool_name,
+                content=json.dumps(self._compact_result(tool_name, result))
+            )
+            messages.append(tool_msg)
+        return events, done
+
+    def execute_task(self, task_description: str, max_steps: int = 40):
+        messages, events = self._start_task(task_description, max_steps)
+        
+        # Yield initial messages
+        yield from events
         
         step = 0
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=self.console
-        ) as progress:
-            task = progress.add_task("[cyan]Processing...", total=max_steps)
-            
+        try:
             while step < max_steps:
                 step += 1
-                progress.update(task, advance=1, description=f"[cyan]Step {step}/{max_steps}")
+                self.sink.emit("step", step=step, max_steps=max_steps)
                 
                 try:
-                    api_messages = [
-                        {
-                            "role": msg.role, 
-                            "content": msg.content,
-                            **({"name": msg.name} if msg.name else {}),
-                            **({"tool_call_id": msg.tool_call_id} if msg.tool_call_id else {})
-                        }
-                        for msg in messages
-                    ]
-                    
-                    response = self.client.chat.completions.create(
-                        model=self.model,
-                        messages=api_messages,
-                        tools=[tool.get_schema() for tool in self.tools.values()],
-                        tool_choice="auto",
-                        temperature=self.temperature
-                    )
-
-                    assistant_message = response.choices[0].message
-                    
-                    # Créer un Message à partir de la réponse de l'assistant
-                    assistant_msg = Message(
-                        role="assistant",
-                        content=assistant_message.content if assistant_message.content else ""
-                    )
-                    messages.append(assistant_msg)
-                    
-                    # Yield assistant's response
-                    yield {
-                        'type': 'message',
-                        'data': assistant_msg.__dict__
-                    }
-                    
-                    if assistant_message.content:
-                        self.console.print(Panel(
-                            assistant_message.content,
-                            title="[bold purple]Assistant[/bold purple]",
-                            border_style="purple"
-                        ))
-                    
-                    if assistant_message.tool_calls:
-                        for tool_call in assistant_message.tool_calls:
-                            tool_name = tool_call.function.name
-                            tool_args = json.loads(tool_call.function.arguments)
-                            
-                            self.console.print(f"[bold yellow]Using tool[/bold yellow]: {tool_name}")
-                            self.console.print(f"[dim]Parameters:[/dim] {tool_args}")
-                            
-                            # Yield tool call event
-                            yield {
-                                'type': 'tool_call',
-                                'data': {
-                                    'tool_name': tool_name,
-                                    'parameters': tool_args
-                                }
-                            }
+                    assistant_message = yield from self._complete(messages)
+                    yield from self._patch_events()
 
+                    events, calls = self._on_assistant_message(assistant_message, messages)
+                    yield from events
+                    
+                    if calls:
+                        # Les outils tournent en parallèle, les résultats sont émis dès qu'ils arrivent
+                        results: List[Any] = [None] * len(calls)
+                        tool_metrics = [ToolCallMetrics(tool_name) for tool_name, _, _ in calls]
+                        for index, future in self.executor.run_all([
+                            (tool_name, partial(self._invoke_tool, tool_name, tool_args, tool_metrics[index], call_id))
+                            for index, (tool_name, tool_args, call_id) in enumerate(calls)
+                        ]):
+                            tool_name, _, call_id = calls[index]
                             try:
-                                result = self.tools[tool_name].execute(**tool_args)
-
-                                self.console.print(f"[bold green]Tool result for {tool_name}:[/bold green]")
-                                self.console.print(Panel(str(result), style="green"))
-                                
-                                """"
-                                # Convertir le générateur en liste si nécessaire
-                                if hasattr(result, '__iter__') and hasattr(result, '__next__'):
-                                    result = list(result)"""
-                                
-                                # Yield tool result
-                                yield {
-                                    'type': 'tool_result',
-                                    'data': {
-                                        'tool_name': tool_name,
-                                        'result': result
-                                    }
-                                }
-
-                                if tool_name == "return" and "result" in result:
-                                    result = result
-                                    yield {
-                                        'type': 'final_result',
-                                        'data': result["result"]
-                                    }
-                                    self.console.print("[bold green]✓ Task completed successfully![/bold green]")
-                                    step = max_steps # Terminer la boucle
-
-                                # Créer un Message pour la réponse de l'outil
-                                tool_msg = Message(
-                                    role="function",
-                                    name=tool_name,
-                                    content=json.dumps(result)
-                                )
-                                messages.append(tool_msg)
+                                results[index] = future.result()
+                            except Exception as e:
+                                # Les autres outils du tour continuent ; le modèle reçoit l'erreur
+                                results[index] = self._error_result(e)
+                                yield self._tool_error_event(tool_name, e, call_id)
+                            yield self._tool_result_event(tool_name, results[index], call_id)
+                            yield self._tool_metrics_event(tool_metrics[index])
+                            yield from self._patch_events()
 
+                        events, done = self._on_tool_results(calls, results, messages)
+                        yield from events
+                        if done:
+                            step = max_steps # Terminer la boucle
 
+                except Exception as e:
+                    yield self._error_event(e)
+                    raise
+        finally:
+            self.sink.emit("task_finished")
 
-                            except Exception as e:
-                                self.console.print(f"[bold red]Error while executing tool {tool_name}:[/bold red]")
-                                self.console.print(Panel(str(e), style="red"))
-                                print(e)
-                                traceback.print_exc()
-                                yield {
-                                    'type': 'error',
-                                    'data': {
-                                        'message': str(e)
-                                    }
-                                }
-                                raise
 
+class AsyncOpenAIAgent(OpenAIAgent):
+    """Variante asyncio de l'agent, basée sur le client AsyncOpenAI.
+
+    execute_task est un générateur asynchrone qui produit les mêmes événements
+    que OpenAIAgent.execute_task, sans bloquer de thread pendant l'attente du LLM.
+    Les outils sont appelés via BaseTool.aexecute.
+    """
+
+    def _create_client(self, api_key: str, base_url: Optional[str]):
+        return get_llm_client(api_key, base_url, asynchronous=True)
+
+    async def _run_tool(
+        self,
+        index: int,
+        tool_name: str,
+        tool_args: Dict[str, Any],
+        metrics: ToolCallMetrics,
+        call_id: Optional[str] = None
+    ):
+        try:
+            arguments = self.registry.validate(tool_name, tool_args)
+        except ToolArgumentError as e:
+            return index, e.to_dict(), None
+        # Limites du ToolExecutor, partagées avec les autres agents de la fabrique. La limite de
+        # l'outil d'abord : un appel en attente de son outil n'occupe pas de place globale
+        async with self.executor.async_limit(tool_name), self.executor.async_limit():
+            try:
+                # aexecute copie le contexte dans son thread : les requêtes HTTP y sont attribuées
+                with use_run_context(self.run_context, call_id), measure_tool_call(metrics):
+                    return index, await self.tools[tool_name].aexecute(**arguments), None
+            except Exception as e:
+                return index, None, e
+
+    async def execute_task(self, task_description: str, max_steps: int = 40):
+        messages, events = self._start_task(task_description, max_steps)
+        for event in events:
+            yield event
+        
+        step = 0
+        try:
+            while step < max_steps:
+                step += 1
+                self.sink.emit("step", step=step, max_steps=max_steps)
+                
+                try:
+                    kwargs = self._completion_kwargs(messages)
+                    start = time.perf_counter()
+                    if self.stream:
+                        assistant_message = StreamedMessage(start)
+                        response = await self.client.chat.completions.create(**self._stream_kwargs(kwargs))
+                        assistant_message.mark_queued()
+                        async for chunk in response:
+                            for event in assistant_message.add_chunk(chunk):
+                                yield event
+                        yield self._stream_metrics_event(assistant_message)
+                    else:
+                        response = await self.client.chat.completions.create(**kwargs)
+                        yield self._llm_metrics_event(start, usage=response.usage)
+                        assistant_message = response.choices[0].message
+                    for event in self._patch_events():
+                        yield event
+
+                    events, calls = self._on_assistant_message(assistant_message, messages)
+                    for event in events:
+                        yield event
+                    
+                    if calls:
+                        tool_metrics = [ToolCallMetrics(tool_name) for tool_name, _, _ in calls]
+                        tasks = [
+                            asyncio.ensure_future(
+                                self._run_tool(index, tool_name, tool_args, tool_metrics[index], call_id)
+                            )
+                            for index, (tool_name, tool_args, call_id) in enumerate(calls)
+                        ]
+                        results: List[Any] = [None] * len(calls)
+                        try:
+                            for next_done in asyncio.as_completed(tasks):
+                                index, result, error = await next_done
+                                tool_name, _, call_id = calls[index]
+                                if error is not None:
+                                    result = self._error_result(error)
+                                    yield self._tool_error_event(tool_name, error, call_id)
+                                results[index] = result
+                                yield self._tool_result_event(tool_name, result, call_id)
+                                yield self._tool_metrics_event(tool_metrics[index])
+                                for event in self._patch_events():
+                                    yield event
+                        finally:
+                            for pending in tasks:
+                                pending.cancel()
+
+                        events, done = self._on_tool_results(calls, results, messages)
+                        for event in events:
+                            yield event
+                        if done:
+                            step = max_steps # Terminer la boucle
 
                 except Exception as e:
-                    self.console.print("[bold red]General error:[/bold red]")
-                    self.console.print(Panel(str(e), style="red"))
-                    print(e)
-                    traceback.print_exc()
-                    yield {
-                        'type': 'error',
-                        'data': {
-                            'message': str(e)
-                        }
-                    }
-                    raise
\ No newline at end of file
+                    yield self._error_event(e)
+                    raise
+        finally:
+            self.sink.emit("task_finished")
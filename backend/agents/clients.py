@@ -0,0 +1,26 @@
+from typing import Dict, Optional, Tuple
+from openai import OpenAI, AsyncOpenAI
+import threading
+
+# Clients LLM partagés par tout le processus : un pool de connexions keep-alive
+# (et une session TLS) par fournisseur, au lieu d'un nouveau client par requête.
+_clients: Dict[Tuple[bool, Optional[str], str], object] = {}
+_lock = threading.Lock()
+
+
+def get_llm_client(api_key: str, base_url: Optional[str] = None, asynchronous: bool = False):
+    """Renvoie le client OpenAI (ou AsyncOpenAI) partagé pour ce base_url et cette clé.
+
+    Les clients OpenAI sont thread-safe ; un client asynchrone doit rester utilisé
+    depuis le même event loop.
+    """
+    key = (asynchronous, base_url, api_key)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client_class = AsyncOpenAI if asynchronous else OpenAI
+                client = client_class(api_key=api_key, base_url=base_url)
+                _clients[key] = client
+    return client
@@ -0,0 +1,146 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from dataclasses import replace
+import json
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken est optionnel, on retombe sur une estimation
+    tiktoken = None
+
+# Surcoût approximatif de chaque message (rôle, séparateurs) dans le prompt
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def _default_tokenizer() -> Callable[[str], int]:
+    if tiktoken is not None:
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    # ~4 caractères par token pour du texte/JSON
+    return lambda text: (len(text) + 3) // 4
+
+
+def summarize_tool_result(content: str, max_chars: int = 300) -> str:
+    """
+    Résumé compact d'un résultat d'outil déjà envoyé au modèle.
+
+    Les références courtes des éléments ("H3" -> nom de l'hôtel) et les identifiants d'étapes
+    ({"Lyon": "S7282"}) sont conservés en entier : le modèle doit pouvoir les réutiliser.
+    """
+    try:
+        data = json.loads(content)
+    except ValueError:
+        data = None
+
+    kept = {}
+    if isinstance(data, dict):
+        parts = []
+        refs = {}
+        for key, value in data.items():
+            if isinstance(value, list):
+                names = []
+                for item in value:
+                    if not isinstance(item, dict) or "name" not in item:
+                        continue
+                    if "ref" in item:
+                        refs[str(item["ref"])] = str(item["name"])[:40]
+                    else:
+                        names.append(str(item["name"]))
+                if names:
+                    parts.append(f"{key}: {len(value)} items ({', '.join(names)})")
+                else:
+                    parts.append(f"{key}: {len(value)} items")
+            elif isinstance(value, dict) and value and all(isinstance(item, str) and len(item) <= 16 for item in value.values()):
+                kept[key] = value
+            elif isinstance(value, dict):
+                parts.append(f"{key}: {{{', '.join(value)}}}")
+            else:
+                parts.append(f"{key}: {value}")
+        summary = "; ".join(parts)
+        if refs:
+            kept = {"refs": refs, **kept}
+    else:
+        summary = content
+
+    if len(summary) > max_chars:
+        summary = summary[:max_chars] + "..."
+    return json.dumps({"elided": True, "summary": summary, **kept}, ensure_ascii=False)
+
+
+class ContextBudget:
+    """Maintient la conversation envoyée au LLM sous un budget de tokens.
+
+    Les `pinned` premiers messages (prompt système et demande utilisateur) et les
+    `keep_recent` derniers messages sont toujours envoyés tels quels. Au-delà du
+    budget, les anciens résultats d'outils sont remplacés par un résumé, puis les
+    plus anciens messages intermédiaires sont retirés. Une fois élidé, un message le
+    reste : le préfixe envoyé d'une étape à l'autre reste stable.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 16000,
+        pinned: int = 2,
+        keep_recent: int = 6,
+        tokenizer: Optional[Callable[[str], int]] = None,
+        summarizer: Callable[[str], str] = summarize_tool_result
+    ):
+        self.max_tokens = max_tokens
+        self.pinned = pinned
+        self.keep_recent = keep_recent
+        self.tokenizer = tokenizer or _default_tokenizer()
+        self.summarizer = summarizer
+        # id(message) -> (message, version envoyée, nombre de tokens)
+        self._cache: Dict[int, Tuple[object, object, int]] = {}
+
+    def count(self, message) -> int:
+        """Nombre de tokens de la version envoyée du message (mis en cache)"""
+        return self._entry(message)[2]
+
+    def _entry(self, message):
+        entry = self._cache.get(id(message))
+        if entry is None or entry[0] is not message:
+            entry = (message, message, self._count(message))
+            self._cache[id(message)] = entry
+        return entry
+
+    def _count(self, message) -> int:
+        return self.tokenizer(message.content or "") + MESSAGE_OVERHEAD_TOKENS
+
+    def _elide(self, message) -> int:
+        """Remplace un résultat d'outil par son résumé, renvoie les tokens gagnés"""
+        original, sent, tokens = self._entry(message)
+        if sent is not original or message.role not in ("function", "tool"):
+            return 0
+        summary = replace(message, content=self.summarizer(message.content or ""))
+        summary_tokens = self._count(summary)
+        if summary_tokens >= tokens:
+            return 0
+        self._cache[id(message)] = (original, summary, summary_tokens)
+        return tokens - summary_tokens
+
+    def fit(self, messages: List) -> List:
+        """Renvoie la liste de messages à envoyer, sans modifier l'historique"""
+        pinned = messages[:self.pinned]
+        middle = messages[self.pinned:max(self.pinned, len(messages) - self.keep_recent)]
+        recent = messages[len(pinned) + len(middle):]
+
+        total = sum(self.count(message) for message in messages)
+
+        # 1. Résumer les anciens résultats d'outils, du plus ancien au plus récent
+        for message in middle:
+            if total <= self.max_tokens:
+                break
+            total -= self._elide(message)
+
+        # 2. Retirer les plus anciens messages intermédiaires
+        dropped = 0
+        while total > self.max_tokens and dropped < len(middle):
+            total -= self.count(middle[dropped])
+            dropped += 1
+
+        kept = [self._entry(message)[1] for message in middle[dropped:]]
+        # Oublier les messages qui ne sont plus dans la conversation
+        if len(self._cache) > 2 * len(messages):
+            alive = {id(message) for message in messages}
+            self._cache = {key: entry for key, entry in self._cache.items() if key in alive}
+        return pinned + kept + recent
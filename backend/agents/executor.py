@@ -0,0 +1,103 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from contextlib import nullcontext
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import threading
+import weakref
+
+
+class ToolExecutor:
+    """Exécute les appels d'outils d'un même tour de l'assistant en parallèle.
+
+    `max_workers` borne le nombre total d'appels simultanés, `per_tool_limits`
+    borne le nombre d'appels simultanés d'un même outil (ex: {"hotel_searcher": 2}).
+    Un appel au-delà de la limite de son outil attend dans une file, sans occuper
+    de thread du pool : les autres outils ne sont pas retardés.
+
+    Les agents asyncio appliquent les mêmes limites avec async_limit ; partagées par
+    tous les agents qui utilisent cet exécuteur (ex: ceux d'une AgentFactory).
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        per_tool_limits: Optional[Dict[str, int]] = None
+    ):
+        self.max_workers = max_workers
+        self.per_tool_limits = dict(per_tool_limits or {})
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        # Par outil limité : appels en cours et appels en attente d'une place
+        self._running: Dict[str, int] = {}
+        self._waiting: Dict[str, Deque[Tuple[Future, Callable[[], Any]]]] = {}
+        self._lock = threading.Lock()
+        # Sémaphores asyncio par event loop : None (total) puis nom d'outil -> Semaphore
+        self._async_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Optional[str], asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+    def async_limit(self, tool_name: Optional[str] = None):
+        """Place asyncio pour un appel de l'outil (tool_name=None : limite totale max_workers)"""
+        limit = self.max_workers if tool_name is None else self.per_tool_limits.get(tool_name)
+        if not limit:
+            return nullcontext()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._async_limits.setdefault(loop, {})
+            if tool_name not in semaphores:
+                semaphores[tool_name] = asyncio.Semaphore(limit)
+            return semaphores[tool_name]
+
+    def submit(self, tool_name: str, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Soumet un appel d'outil en respectant la limite propre à l'outil"""
+        limit = self.per_tool_limits.get(tool_name)
+        if not limit:
+            return self._pool.submit(fn, *args, **kwargs)
+
+        future = Future()
+        call = (future, lambda: fn(*args, **kwargs))
+        with self._lock:
+            running = self._running.get(tool_name, 0)
+            if running >= limit:
+                self._waiting.setdefault(tool_name, deque()).append(call)
+                return future
+            self._running[tool_name] = running + 1
+        self._start(tool_name, *call)
+        return future
+
+    def _start(self, tool_name: str, future: Future, call: Callable[[], Any]):
+        def run():
+            # Annulé pendant l'attente : la place est rendue sans exécuter l'appel
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(call())
+            except BaseException as e:
+                future.set_exception(e)
+
+        self._pool.submit(run).add_done_callback(lambda _: self._release(tool_name))
+
+    def _release(self, tool_name: str):
+        """Un appel de l'outil est terminé : démarre le suivant en attente"""
+        with self._lock:
+            waiting = self._waiting.get(tool_name)
+            if not waiting:
+                self._running[tool_name] -= 1
+                return
+            call = waiting.popleft()
+        self._start(tool_name, *call)
+
+    def run_all(self, calls: List[Tuple[str, Callable[[], Any]]]) -> Iterator[Tuple[int, Future]]:
+        """Lance tous les appels et renvoie (index, future) au fur et à mesure qu'ils se terminent"""
+        futures = {
+            self.submit(tool_name, fn): index
+            for index, (tool_name, fn) in enumerate(calls)
+        }
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future
+        finally:
+            # Si l'appelant abandonne (erreur), on annule ce qui n'a pas démarré
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,68 @@
+from typing import Any, Dict, List, Optional, Type
+from backend.agents.agent import OpenAIAgent, AsyncOpenAIAgent
+from backend.agents.clients import get_llm_client
+from backend.agents.context import ContextBudget
+from backend.agents.executor import ToolExecutor
+from backend.tools.base_tool import BaseTool
+from backend.tools.registry import ToolRegistry
+
+
+class AgentFactory:
+    """
+    Fabrique d'agents partagée par le serveur (thread-safe).
+
+    Créée une fois au démarrage : les outils (sans état), leur registre compilé,
+    le pool d'exécution des outils et le client LLM keep-alive sont partagés par
+    toutes les requêtes. Chaque appel à create() renvoie un agent neuf qui porte
+    l'état propre à la requête (conversation, contexte du trip, budget de tokens).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        tools: List[BaseTool],
+        api_key: str,
+        model: str,
+        base_url: Optional[str] = None,
+        agent_class: Type[OpenAIAgent] = OpenAIAgent,
+        max_workers: int = 8,
+        tool_concurrency: Optional[Dict[str, int]] = None,
+        context_tokens: Optional[int] = None,
+        **agent_kwargs: Any
+    ):
+        self.name = name
+        self.registry = ToolRegistry(tools)
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+        self.agent_class = agent_class
+        self.executor = ToolExecutor(max_workers=max_workers, per_tool_limits=tool_concurrency)
+        self.context_tokens = context_tokens
+        self.agent_kwargs = agent_kwargs
+
+    @property
+    def client(self):
+        return get_llm_client(
+            self.api_key,
+            self.base_url,
+            asynchronous=issubclass(self.agent_class, AsyncOpenAIAgent)
+        )
+
+    def create(self, **overrides: Any) -> OpenAIAgent:
+        """Nouvel agent pour une requête ; `overrides` remplace les options par défaut (ex: sink)"""
+        kwargs = {
+            "context_budget": ContextBudget(max_tokens=self.context_tokens) if self.context_tokens else None,
+            "executor": self.executor,
+            **self.agent_kwargs,
+            **overrides
+        }
+        if "client" not in kwargs:
+            kwargs["client"] = self.client
+        return self.agent_class(
+            name=self.name,
+            tools=self.registry,
+            api_key=self.api_key,
+            model=self.model,
+            base_url=self.base_url,
+            **kwargs
+        )
@@ -0,0 +1,170 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+import threading
+import time
+
+
+@dataclass
+class HttpCallMetrics:
+    host: str
+    method: str
+    status: Optional[int]
+    seconds: float
+    bytes: int
+
+
+@dataclass
+class ToolCallMetrics:
+    tool_name: str
+    seconds: float = 0.0
+    http: List[HttpCallMetrics] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": "tool",
+            "tool_name": self.tool_name,
+            "total_s": round(self.seconds, 4),
+            "http_s": round(sum(call.seconds for call in self.http), 4),
+            "http": [asdict(call) for call in self.http]
+        }
+
+
+@dataclass
+class LlmCallMetrics:
+    step: int
+    seconds: float
+    queue_seconds: Optional[float] = None
+    ttft_seconds: Optional[float] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": "llm",
+            "step": self.step,
+            "total_s": round(self.seconds, 4),
+            "queue_s": None if self.queue_seconds is None else round(self.queue_seconds, 4),
+            "ttft_s": None if self.ttft_seconds is None else round(self.ttft_seconds, 4),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens
+        }
+
+
+class RunMetrics:
+    """Mesures d'une exécution de l'agent : appels LLM, appels d'outils et leurs requêtes HTTP"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.llm_calls: List[LlmCallMetrics] = []
+        self.tool_calls: List[ToolCallMetrics] = []
+        self._lock = threading.Lock()
+
+    def add_llm_call(self, metrics: LlmCallMetrics):
+        with self._lock:
+            self.llm_calls.append(metrics)
+
+    def add_tool_call(self, metrics: ToolCallMetrics):
+        with self._lock:
+            self.tool_calls.append(metrics)
+
+    def summary(self) -> Dict[str, Any]:
+        tools: Dict[str, Dict[str, Any]] = {}
+        hosts: Dict[str, Dict[str, Any]] = {}
+        for call in self.tool_calls:
+            tool = tools.setdefault(call.tool_name, {"calls": 0, "total_s": 0.0})
+            tool["calls"] += 1
+            tool["total_s"] += call.seconds
+            for http_call in call.http:
+                host = hosts.setdefault(http_call.host, {"calls": 0, "total_s": 0.0, "bytes": 0})
+                host["calls"] += 1
+                host["total_s"] += http_call.seconds
+                host["bytes"] += http_call.bytes
+        for stats in list(tools.values()) + list(hosts.values()):
+            stats["total_s"] = round(stats["total_s"], 4)
+
+        return {
+            "kind": "summary",
+            "wall_s": round(time.perf_counter() - self.started, 4),
+            "llm": {
+                "calls": len(self.llm_calls),
+                "total_s": round(sum(call.seconds for call in self.llm_calls), 4),
+                "prompt_tokens": sum(call.prompt_tokens or 0 for call in self.llm_calls),
+                "completion_tokens": sum(call.completion_tokens or 0 for call in self.llm_calls)
+            },
+            "tools": tools,
+            "http": hosts
+        }
+
+
+_current_tool_call: ContextVar[Optional[ToolCallMetrics]] = ContextVar("tool_call_metrics", default=None)
+
+
+@contextmanager
+def measure_tool_call(metrics: ToolCallMetrics):
+    """Chronomètre un appel d'outil et y rattache les requêtes HTTP faites pendant l'appel"""
+    token = _current_tool_call.set(metrics)
+    start = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics.seconds = time.perf_counter() - start
+        _current_tool_call.reset(token)
+
+
+def record_http_call(url: str, method: str, status: Optional[int], seconds: float, nbytes: int):
+    """Rattache une requête HTTP à l'appel d'outil en cours (sans effet hors d'un outil)"""
+    metrics = _current_tool_call.get()
+    if metrics is not None:
+        metrics.http.append(HttpCallMetrics(
+            host=urlsplit(url).netloc,
+            method=method.upper(),
+            status=status,
+            seconds=seconds,
+            bytes=nbytes
+        ))
+
+
+def httpx_event_hooks() -> Dict[str, List[Callable[..., None]]]:
+    """
+    Hooks d'un httpx.Client qui rattachent chaque réponse à l'appel d'outil en cours.
+    Le corps est lu dans le hook : à réserver à un client sans streaming (HttpClient).
+    """
+    def on_request(request):
+        request.extensions["metrics_start"] = time.perf_counter()
+
+    def on_response(response):
+        start = response.request.extensions.get("metrics_start")
+        response.read()
+        record_http_call(
+            str(response.request.url),
+            response.request.method,
+            response.status_code,
+            time.perf_counter() - start if start is not None else 0.0,
+            len(response.content)
+        )
+
+    return {"request": [on_request], "response": [on_response]}
+
+
+def instrumented_session():
+    """
+    Session `requests` dont les réponses sont rattachées à l'appel d'outil en cours, pour les
+    bibliothèques tierces qui acceptent une session (googlemaps). Les outils passent par HttpClient.
+    """
+    import requests
+
+    def on_response(response, *args, **kwargs):
+        record_http_call(
+            response.url,
+            response.request.method,
+            response.status_code,
+            response.elapsed.total_seconds(),
+            0 if kwargs.get("stream") else len(response.content)
+        )
+
+    session = requests.Session()
+    session.hooks["response"].append(on_response)
+    return session
@@ -0,0 +1,193 @@
+from concurrent.futures import Future, wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import hashlib
+import re
+import threading
+
+from backend.utils.geocoding import normalize_query
+
+# Résolution d'un nom de lieu en (lat, lon), ou None s'il est introuvable
+Resolver = Callable[[str], Optional[Tuple[float, float]]]
+
+_STOP_ID = re.compile(r"^S\d+$")
+
+
+def stop_id(location: str, digits: int = 4) -> str:
+    """Identifiant d'étape ("S7282") dérivé du nom normalisé, sur `digits` chiffres"""
+    digest = int(hashlib.sha1(normalize_query(location).encode("utf-8")).hexdigest(), 16)
+    return f"S{digest % 10 ** digits:0{digits}d}"
+
+
+@dataclass
+class Stop:
+    """Lieu du trip, géocodé une seule fois et partagé par les outils.
+
+    id vaut stop_id(name), sauf collision avec une étape déjà résolue du même trip : l'étape
+    résolue ensuite reçoit un identifiant plus long. Un identifiant n'est donc garanti que
+    pour le trip en cours (il ne change jamais une fois donné au modèle).
+    """
+    id: Optional[str]
+    name: str
+    latitude: float
+    longitude: float
+
+
+class RunContext:
+    """État propre à une exécution de l'agent (un trip).
+
+    Les outils sont partageables entre requêtes ; tout ce qui dépend du trip en
+    cours vit ici. Les outils y accèdent via current_run_context().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._counters: Dict[str, int] = {}
+        # Parties de résultats d'outils complétées après coup : (call_id, chemin, future)
+        self._deferred: List[Tuple[Optional[str], List[Any], Future]] = []
+        # Table des étapes : id -> Stop, nom normalisé -> id, résolutions en cours
+        self._stops: Dict[str, Stop] = {}
+        self._stop_ids: Dict[str, str] = {}
+        self._resolving: Dict[str, Future] = {}
+
+    def add_record(self, prefix: str, record: Dict[str, Any]) -> str:
+        """Conserve un enregistrement complet et renvoie un identifiant court (ex: "H3")"""
+        with self._lock:
+            self._counters[prefix] = self._counters.get(prefix, 0) + 1
+            ref = f"{prefix}{self._counters[prefix]}"
+            self._records[ref] = record
+        return ref
+
+    def get_record(self, ref: str) -> Optional[Dict[str, Any]]:
+        return self._records.get(str(ref).strip().upper())
+
+    def next_id(self, prefix: str) -> str:
+        with self._lock:
+            self._counters[prefix] = self._counters.get(prefix, 0) + 1
+            return f"{prefix}{self._counters[prefix]}"
+
+    def find_stop(self, location: str) -> Optional[Stop]:
+        """Étape déjà résolue, par identifiant ("S7282") ou par nom"""
+        ref = str(location).strip().upper()
+        with self._lock:
+            if ref in self._stops:
+                return self._stops[ref]
+            stop_id = self._stop_ids.get(normalize_query(location))
+            return self._stops[stop_id] if stop_id else None
+
+    def resolve_stop(self, location: str, resolve: Resolver) -> Optional[Stop]:
+        """
+        Étape du lieu (nom ou identifiant), résolue au premier appel puis partagée par tous les
+        outils du trip ; des résolutions simultanées du même lieu n'en font qu'une.
+        None si le lieu est introuvable ou l'identifiant inconnu.
+        """
+        stop = self.find_stop(location)
+        if stop is not None or _STOP_ID.match(str(location).strip().upper()):
+            return stop
+
+        key = normalize_query(location)
+        with self._lock:
+            future = self._resolving.get(key)
+            leader = future is None
+            if leader:
+                future = self._resolving[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            coordinates = resolve(location)
+            stop = None
+            if coordinates is not None:
+                with self._lock:
+                    # Collision avec un autre lieu du trip (rare) : l'identifiant déjà donné est
+                    # conservé, le nouveau lieu prend un identifiant plus long
+                    digits = 4
+                    while stop_id(key, digits) in self._stops:
+                        digits += 1
+                    stop = Stop(stop_id(key, digits), location, coordinates[0], coordinates[1])
+                    self._stops[stop.id] = stop
+                    self._stop_ids[key] = stop.id
+            future.set_result(stop)
+            return stop
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._resolving.pop(key, None)
+
+    def defer(self, path: List[Any], future: Future):
+        """Annonce qu'une valeur du résultat de l'outil en cours (chemin dans le résultat) arrivera plus tard.
+
+        L'agent émet un événement tool_result_patch quand la future est terminée.
+        """
+        with self._lock:
+            self._deferred.append((current_call_id(), path, future))
+
+    def wait_deferred(self, timeout: Optional[float] = None):
+        """Attend les valeurs différées (ex: avant de construire le résultat final)"""
+        with self._lock:
+            futures = [future for _, _, future in self._deferred]
+        if futures:
+            wait(futures, timeout=timeout)
+
+    def pop_completed(self) -> List[Dict[str, Any]]:
+        """Retire et renvoie les valeurs différées disponibles : [{call_id, path, value}]"""
+        completed = []
+        with self._lock:
+            pending = []
+            for call_id, path, future in self._deferred:
+                if not future.done():
+                    pending.append((call_id, path, future))
+                elif not future.cancelled() and future.exception() is None:
+                    completed.append({"call_id": call_id, "path": path, "value": future.result()})
+            self._deferred = pending
+        return completed
+
+
+_current_run_context: ContextVar[Optional[RunContext]] = ContextVar("run_context", default=None)
+_current_call_id: ContextVar[Optional[str]] = ContextVar("call_id", default=None)
+
+
+def current_run_context() -> Optional[RunContext]:
+    """Contexte du trip en cours, ou None hors d'une exécution de l'agent"""
+    return _current_run_context.get()
+
+
+def current_call_id() -> Optional[str]:
+    """Identifiant de l'appel d'outil en cours (repris dans les événements tool_result / tool_result_patch)"""
+    return _current_call_id.get()
+
+
+def resolve_stop(location: str, resolve: Resolver) -> Optional[Stop]:
+    """Étape du trip en cours (résolue une fois par trip) ; hors d'une exécution, résolution directe"""
+    context = current_run_context()
+    if context is not None:
+        return context.resolve_stop(location, resolve)
+    coordinates = resolve(location)
+    return Stop(None, location, coordinates[0], coordinates[1]) if coordinates is not None else None
+
+
+def stop_refs(locations: List[str]) -> Dict[str, str]:
+    """Identifiants des étapes connues du trip en cours, par nom de lieu (vide hors d'une exécution)"""
+    context = current_run_context()
+    refs = {}
+    for location in locations if context is not None else []:
+        stop = context.find_stop(location)
+        if stop is not None and stop.id != str(location).strip().upper():
+            refs[location] = stop.id
+    return refs
+
+
+@contextmanager
+def use_run_context(context: Optional[RunContext], call_id: Optional[str] = None):
+    token = _current_run_context.set(context)
+    call_token = _current_call_id.set(call_id)
+    try:
+        yield context
+    finally:
+        _current_call_id.reset(call_token)
+        _current_run_context.reset(token)
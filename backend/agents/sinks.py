@@ -0,0 +1,140 @@
+from typing import Any, Dict, Optional
+import json
+import logging
+import traceback
+
+
+class EventSink:
+    """Reçoit les événements de déroulement de l'agent (logs, console).
+
+    Les événements sont transmis bruts (objets Python) : le formatage n'a lieu que
+    dans le sink qui les affiche. Événements émis par l'agent : agent_initialized,
+    task_started, step, assistant_message, tool_call, tool_result, tool_error,
+    task_completed, metrics, error, task_finished.
+    """
+
+    def emit(self, event: str, **fields: Any):
+        raise NotImplementedError
+
+
+class NullSink(EventSink):
+    """Ignore tous les événements (mode serveur sans logs de déroulement)"""
+
+    def emit(self, event: str, **fields: Any):
+        pass
+
+
+class JsonLinesSink(EventSink):
+    """Écrit un objet JSON par événement dans un logger (ou un fichier ouvert)"""
+
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        stream=None,
+        max_field_chars: int = 2000
+    ):
+        self.logger = logger or logging.getLogger("agent.events")
+        self.stream = stream
+        self.max_field_chars = max_field_chars
+
+    def _field(self, value: Any) -> str:
+        """Valeur sérialisée en JSON (une seule fois), tronquée au-delà de max_field_chars"""
+        if isinstance(value, BaseException):
+            return json.dumps({"type": type(value).__name__, "message": str(value)}, ensure_ascii=False)
+        if isinstance(value, (str, int, float, bool)) or value is None:
+            return json.dumps(value, ensure_ascii=False)
+        try:
+            text = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError):
+            text = json.dumps(repr(value), ensure_ascii=False)
+        if len(text) > self.max_field_chars:
+            return json.dumps(text[:self.max_field_chars] + "...", ensure_ascii=False)
+        return text
+
+    def emit(self, event: str, **fields: Any):
+        if self.stream is None and not self.logger.isEnabledFor(logging.INFO):
+            return
+        line = "{" + ", ".join(
+            f"{json.dumps(key)}: {self._field(value)}" for key, value in {"event": event, **fields}.items()
+        ) + "}"
+        if self.stream is not None:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+        else:
+            self.logger.info(line)
+
+
+class RichConsoleSink(EventSink):
+    """Affichage console détaillé avec rich (usage CLI, ex: backend/main.py)"""
+
+    def __init__(self):
+        from rich.console import Console
+
+        self.console = Console()
+        self._progress = None
+        self._task = None
+
+    def _panel(self, *args, **kwargs):
+        from rich.panel import Panel
+
+        return Panel(*args, **kwargs)
+
+    def emit(self, event: str, **fields: Any):
+        handler = getattr(self, f"_on_{event}", None)
+        if handler is not None:
+            handler(**fields)
+
+    def _on_agent_initialized(self, name: str, model: str):
+        self.console.print(f"[bold green]Agent {name} initialized with model {model}[/bold green]")
+
+    def _on_task_started(self, task: str, max_steps: int):
+        from rich.progress import Progress, SpinnerColumn, TextColumn
+
+        self.console.print(self._panel(f"[bold blue]New Task[/bold blue]\n{task}"))
+        self._progress = Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            console=self.console
+        )
+        self._progress.start()
+        self._task = self._progress.add_task("[cyan]Processing...", total=max_steps)
+
+    def _on_step(self, step: int, max_steps: int):
+        if self._progress is not None:
+            self._progress.update(self._task, advance=1, description=f"[cyan]Step {step}/{max_steps}")
+
+    def _on_assistant_message(self, content: str):
+        self.console.print(self._panel(
+            content,
+            title="[bold purple]Assistant[/bold purple]",
+            border_style="purple"
+        ))
+
+    def _on_tool_call(self, tool_name: str, parameters: Any):
+        self.console.print(f"[bold yellow]Using tool[/bold yellow]: {tool_name}")
+        self.console.print(f"[dim]Parameters:[/dim] {parameters}")
+
+    def _on_tool_result(self, tool_name: str, result: Dict[str, Any]):
+        self.console.print(f"[bold green]Tool result for {tool_name}:[/bold green]")
+        self.console.print(self._panel(str(result), style="green"))
+
+    def _on_tool_error(self, tool_name: str, error: BaseException):
+        self.console.print(f"[bold red]Error while executing tool {tool_name}:[/bold red]")
+        self.console.print(self._panel(str(error), style="red"))
+        self._print_traceback(error)
+
+    def _on_task_completed(self):
+        self.console.print("[bold green]✓ Task completed successfully![/bold green]")
+
+    def _on_error(self, error: BaseException):
+        self.console.print("[bold red]General error:[/bold red]")
+        self.console.print(self._panel(str(error), style="red"))
+        self._print_traceback(error)
+
+    def _on_task_finished(self):
+        if self._progress is not None:
+            self._progress.stop()
+            self._progress = None
+
+    def _print_traceback(self, error: BaseException):
+        self.console.print("".join(traceback.format_exception(type(error), error, error.__traceback__)))
@@ -0,0 +1,90 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import time
+
+
+@dataclass
+class StreamedFunction:
+    name: str = ""
+    arguments: str = ""
+
+
+@dataclass
+class StreamedToolCall:
+    index: int
+    id: Optional[str] = None
+    type: str = "function"
+    function: StreamedFunction = field(default_factory=StreamedFunction)
+
+
+class StreamedMessage:
+    """Reconstruit le message de l'assistant à partir des chunks d'une réponse streamée.
+
+    Expose `content` et `tool_calls` comme le message d'une réponse non streamée,
+    et renvoie pour chaque chunk les événements `message_delta` / `tool_call_delta`.
+    Chronomètre aussi la réponse (attente côté fournisseur, premier token) pour les mesures.
+    """
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.content: Optional[str] = None
+        self._tool_calls: Dict[int, StreamedToolCall] = {}
+        # Usage de tokens, envoyé par certains fournisseurs dans le dernier chunk
+        self.usage: Optional[Any] = None
+        # Envoi de la requête, réception des en-têtes (retour de create()), premier delta
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.queued_at: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+
+    def mark_queued(self):
+        """create() a rendu la main : la suite est le temps de génération"""
+        self.queued_at = time.perf_counter()
+
+    @property
+    def tool_calls(self) -> Optional[List[StreamedToolCall]]:
+        if not self._tool_calls:
+            return None
+        return [self._tool_calls[index] for index in sorted(self._tool_calls)]
+
+    def add_chunk(self, chunk: Any) -> List[Dict[str, Any]]:
+        events = []
+        if getattr(chunk, "usage", None):
+            self.usage = chunk.usage
+        # Le dernier chunk peut ne contenir que l'usage
+        if not chunk.choices:
+            return events
+        delta = chunk.choices[0].delta
+
+        if delta.content:
+            self.content = (self.content or "") + delta.content
+            events.append({
+                'type': 'message_delta',
+                'data': {
+                    'role': 'assistant',
+                    'content': delta.content
+                }
+            })
+
+        for tool_call_delta in delta.tool_calls or []:
+            index = tool_call_delta.index if tool_call_delta.index is not None else len(self._tool_calls)
+            tool_call = self._tool_calls.setdefault(index, StreamedToolCall(index=index))
+            if tool_call_delta.id:
+                tool_call.id = tool_call_delta.id
+
+            arguments = ""
+            if tool_call_delta.function:
+                if tool_call_delta.function.name:
+                    tool_call.function.name += tool_call_delta.function.name
+                arguments = tool_call_delta.function.arguments or ""
+                tool_call.function.arguments += arguments
+
+            events.append({
+                'type': 'tool_call_delta',
+                'data': {
+                    'index': index,
+                    'tool_name': tool_call.function.name,
+                    'arguments_delta': arguments
+                }
+            })
+        if events and self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        return events
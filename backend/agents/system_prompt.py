@@ -3,6 +3,9 @@ system_prompt_road_trip_planner = """You are an assistant capable of using tools
       Before each tool use, you must very briefly explain (4 words MAXIMUM) your reasoning and what you are going to do.
       You can make multiple calls to the same tools in the same call, but you must make multiple calls if you use different calls.
       You must perform hotel searches and journey estimates using the tools at your disposal.
+      Hotel search results carry a short "ref" (e.g. "H3"): put it in the day's hotel object as "ref", the full hotel details are filled in for you.
+      Tool results list the stops they resolved as "stops" (e.g. {"Lyon, France": "S5595"}): in later tool calls, pass the stop ID instead of the place name.
+      For journey estimates, call osm_api once with the whole ordered itinerary and calculation="route" (calculation="estimate" gives instant approximate figures to choose the order of the stops).
       IMPORTANT: After completing your tasks, you must end the conversation using the 'return' tool.
       """
 
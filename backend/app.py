@@ -1,12 +1,16 @@
-from flask import Flask, request, jsonify, Response
+from flask import Flask, request, jsonify, Response, abort, send_file
 from flasgger import Swagger
 from backend.agents.agent import OpenAIAgent, Message, ToolCall
+from backend.agents.factory import AgentFactory
+from backend.agents.sinks import JsonLinesSink, NullSink
 from backend.tools.hotel_open import HotelToolOpen
 from backend.tools.maps_openstreetmap import OpenStreetMapTool
 from backend.tools.final_return import ReturnTool
 from backend.config.swagger_config import template, swagger_config
+from backend.utils.image_store import get_image_store
 import os
 import weave
+from functools import lru_cache
 from dotenv import load_dotenv
 import json
 from flask_cors import CORS
@@ -17,23 +21,38 @@ app = Flask(__name__)
 CORS(app)
 swagger = Swagger(app, template=template, config=swagger_config)
 
-weave.init("roadtrip-planner")
+# Traces Weave (WEAVE_PROJECT="" les désactive, ex: pour les tests)
+if os.getenv("WEAVE_PROJECT", "roadtrip-planner"):
+    weave.init(os.getenv("WEAVE_PROJECT", "roadtrip-planner"))
 
-@weave.op()
-def create_streaming_agent():
+@lru_cache(maxsize=None)
+def get_agent_factory() -> AgentFactory:
+    """Fabrique partagée : client LLM keep-alive, outils et pool d'exécution communs à toutes les requêtes"""
     use_together = True
-    return OpenAIAgent(
+    return AgentFactory(
         name="Road trip planner",
         tools=[
-            HotelToolOpen(),
+            HotelToolOpen(defer_images=True),
             OpenStreetMapTool(),
             ReturnTool()
         ],
         api_key=os.environ["TOGETHER_API_KEY"] if use_together else os.environ["API_KEY_OPENAI"],
         model="mistralai/Mixtral-8x7B-Instruct-v0.1" if use_together else "gpt-4o",
-        base_url="https://api.together.xyz/v1" if use_together else None
+        base_url="https://api.together.xyz/v1" if use_together else None,
+        agent_class=OpenAIAgent,
+        max_workers=int(os.getenv("TOOL_MAX_WORKERS", 8)),
+        # Nominatim tolère mal les rafales, on limite les appels simultanés
+        tool_concurrency={"hotel_searcher": 3, "osm_api": 2},
+        context_tokens=int(os.getenv("CONTEXT_TOKEN_BUDGET", 16000)),
+        stream=True,
+        # Pas de rendu console côté serveur ; AGENT_EVENT_LOG=1 active les logs JSON
+        sink=JsonLinesSink() if os.getenv("AGENT_EVENT_LOG") else NullSink()
     )
 
+@weave.op()
+def create_streaming_agent():
+    return get_agent_factory().create()
+
 @weave.op()
 def process_trip_request(data):
     agent = create_streaming_agent()
@@ -110,5 +129,33 @@ def plan_trip_stream():
         }
     )
 
+@app.route('/images/<name>', methods=['GET'])
+def get_image(name):
+    """Image générée (WebP), adressée par le hash de son contenu
+    ---
+    parameters:
+      - name: name
+        in: path
+        type: string
+        required: true
+        description: <digest>.webp ou miniature <digest>.w256.webp
+    responses:
+      200:
+        description: Image
+      206:
+        description: Partie de l'image (en-tête Range)
+      304:
+        description: Image inchangée (If-None-Match)
+      404:
+        description: Image inconnue
+    """
+    path = get_image_store().path(name)
+    if path is None:
+        abort(404)
+    # Le nom dépend du contenu : le fichier ne change jamais, l'ETag est le nom lui-même
+    response = send_file(path, mimetype='image/webp', conditional=True, etag=name, max_age=31536000)
+    response.cache_control.immutable = True
+    return response
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0')
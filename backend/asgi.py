@@ -0,0 +1,97 @@
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel
+from backend.agents.agent import AsyncOpenAIAgent
+from backend.agents.factory import AgentFactory
+from backend.agents.sinks import JsonLinesSink, NullSink
+from backend.tools.hotel_open import HotelToolOpen
+from backend.tools.maps_openstreetmap import OpenStreetMapTool
+from backend.tools.final_return import ReturnTool
+from backend.utils.image_store import get_image_store
+from dotenv import load_dotenv
+from functools import lru_cache
+import json
+import os
+
+# Serveur asyncio pour /plan-trip-stream : un seul event loop sert tous les trips en cours.
+# Optionnel : le déploiement (Dockerfile) sert toujours l'application Flask de backend.app.
+# Lancement : uvicorn backend.asgi:app --host 0.0.0.0 --port 8080
+
+load_dotenv()
+app = FastAPI(title="API de Planification de Road Trip")
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+
+class TripRequest(BaseModel):
+    start_location: str
+    end_location: str
+    duration: int
+
+
+@lru_cache(maxsize=None)
+def get_agent_factory() -> AgentFactory:
+    """Fabrique partagée : client LLM keep-alive, outils et pool d'exécution communs à toutes les requêtes"""
+    use_together = True
+    return AgentFactory(
+        name="Road trip planner",
+        tools=[
+            HotelToolOpen(defer_images=True),
+            OpenStreetMapTool(),
+            ReturnTool()
+        ],
+        api_key=os.environ["TOGETHER_API_KEY"] if use_together else os.environ["API_KEY_OPENAI"],
+        model="mistralai/Mixtral-8x7B-Instruct-v0.1" if use_together else "gpt-4o",
+        base_url="https://api.together.xyz/v1" if use_together else None,
+        agent_class=AsyncOpenAIAgent,
+        max_workers=int(os.getenv("TOOL_MAX_WORKERS", 8)),
+        # Nominatim tolère mal les rafales, on limite les appels simultanés
+        tool_concurrency={"hotel_searcher": 3, "osm_api": 2},
+        context_tokens=int(os.getenv("CONTEXT_TOKEN_BUDGET", 16000)),
+        stream=True,
+        # Pas de rendu console côté serveur ; AGENT_EVENT_LOG=1 active les logs JSON
+        sink=JsonLinesSink() if os.getenv("AGENT_EVENT_LOG") else NullSink()
+    )
+
+
+def create_async_agent() -> AsyncOpenAIAgent:
+    return get_agent_factory().create()
+
+
+@app.get("/")
+async def home():
+    return {'message': 'Bienvenue sur l\'API de planification de road trip'}
+
+
+@app.post("/plan-trip-stream")
+async def plan_trip_stream(data: TripRequest):
+    prompt = f"Plan a {data.duration} day road trip from {data.start_location} to {data.end_location}. Find hotels for each stop."
+
+    async def generate():
+        try:
+            async for event in create_async_agent().execute_task(prompt):
+                yield f"data: {json.dumps(event)}\n\n"
+        except Exception as e:
+            yield f"data: {json.dumps({'type': 'error', 'data': {'message': str(e)}})}\n\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'Connection': 'keep-alive'
+        }
+    )
+
+
+@app.get("/images/{name}")
+async def get_image(name: str):
+    """Image générée (WebP), comme la route Flask : nom dépendant du contenu, jamais modifié"""
+    path = get_image_store().path(name)
+    if path is None:
+        raise HTTPException(status_code=404)
+    return FileResponse(
+        path,
+        media_type="image/webp",
+        headers={"Cache-Control": "public, max-age=31536000, immutable", "ETag": f'"{name}"'}
+    )
@@ -1,6 +1,7 @@
 import logging
 
 from backend.agents.agent import OpenAIAgent
+from backend.agents.sinks import RichConsoleSink
 from backend.tools.hotel import HotelTool
 from backend.tools.maps import MapsTool
 from backend.tools.final_return import ReturnTool
@@ -44,7 +45,8 @@ agent = OpenAIAgent(
     model="gemini-2.0-pro-exp-02-05" if use_gemini else "gpt-4o",
     base_url="https://generativelanguage.googleapis.com/v1beta/openai/" if use_gemini else None,
     on_message=on_message,
-    on_tool_use=on_tool_use
+    on_tool_use=on_tool_use,
+    sink=RichConsoleSink()
 )
 
 # Exécution d'une tâcxhe
@@ -0,0 +1,256 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("openai")
+
+from backend.agents.agent import AsyncOpenAIAgent, OpenAIAgent
+from backend.tools.base_tool import BaseTool, ToolParameter, ParameterType
+from backend.tools.final_return import ReturnTool
+
+
+def tool_call(name, arguments):
+    return SimpleNamespace(function=SimpleNamespace(name=name, arguments=json.dumps(arguments)))
+
+
+def response(*tool_calls, content=None):
+    message = SimpleNamespace(content=content, tool_calls=list(tool_calls) or None)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def chunk(content=None, tool_calls=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+
+def tool_delta(index, name=None, arguments=None):
+    return SimpleNamespace(index=index, id=name and f"call_{index}", function=SimpleNamespace(name=name, arguments=arguments))
+
+
+# Deux appels d'outils dont les arguments arrivent entrelacés, coupés au milieu des chaînes
+SPLIT_TOOL_CALLS = [
+    chunk(content="Je cherche"),
+    chunk(tool_calls=[tool_delta(0, name="slow", arguments='{"val')]),
+    chunk(tool_calls=[tool_delta(1, name="fast", arguments='{"value": "Ly')]),
+    chunk(tool_calls=[tool_delta(0, arguments='ue": "Par'), tool_delta(1, arguments='on"}')]),
+    chunk(tool_calls=[tool_delta(0, arguments='is"}')]),
+]
+RETURN_CHUNKS = [chunk(tool_calls=[tool_delta(0, name="return", arguments='{"result": "{}"}')])]
+
+
+class FakeClient:
+    """Client OpenAI rejouant des réponses préparées ; garde les messages envoyés"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        response = self.responses.pop(0)
+        return iter(response) if kwargs.get("stream") else response
+
+
+class FakeAsyncClient(FakeClient):
+    async def create(self, **kwargs):
+        response = FakeClient.create(self, **kwargs)
+        if not kwargs.get("stream"):
+            return response
+
+        async def chunks():
+            for item in response:
+                yield item
+        return chunks()
+
+
+class WaitTool(BaseTool):
+    """Outil qui attend un événement avant de répondre"""
+
+    def __init__(self, name, event=None):
+        self.event = event
+        self.waited = None
+        super().__init__(name=name, description="Attend")
+
+    def _define_parameters(self):
+        return [ToolParameter(name="value", param_type=ParameterType.STRING, description="Valeur")]
+
+    def execute(self, **kwargs):
+        if self.event is not None:
+            self.waited = self.event.wait(5)
+        return {"value": kwargs["value"]}
+
+
+class FailingTool(WaitTool):
+    def execute(self, **kwargs):
+        raise RuntimeError("service unavailable")
+
+
+def make_agent(tools, responses, asynchronous=False, stream=False):
+    client = (FakeAsyncClient if asynchronous else FakeClient)(responses)
+    agent_class = AsyncOpenAIAgent if asynchronous else OpenAIAgent
+    return agent_class(name="test", tools=[*tools, ReturnTool()], api_key="test", client=client, stream=stream), client
+
+
+def run_async(agent, task, on_event=lambda event: None):
+    async def collect():
+        events = []
+        async for event in agent.execute_task(task):
+            on_event(event)
+            events.append(event)
+        return events
+    return asyncio.run(collect())
+
+
+def test_tool_results_are_streamed_as_they_finish_and_kept_in_call_order():
+    fast_reported = threading.Event()
+    slow = WaitTool("slow", fast_reported)
+    agent, client = make_agent([slow, WaitTool("fast")], [
+        response(tool_call("slow", {"value": "a"}), tool_call("fast", {"value": "b"})),
+        response(tool_call("return", {"result": "{}"})),
+    ])
+
+    results = []
+    for event in agent.execute_task("trip"):
+        if event["type"] == "tool_result":
+            results.append(event["data"]["tool_name"])
+            # "slow" ne se termine qu'une fois le résultat de "fast" reçu par le client
+            if event["data"]["tool_name"] == "fast":
+                fast_reported.set()
+
+    assert results == ["fast", "slow", "return"]
+    assert slow.waited is True
+    tool_messages = [message for message in client.requests[1]["messages"] if message["role"] == "function"]
+    assert [(message["name"], json.loads(message["content"])) for message in tool_messages] == [
+        ("slow", {"value": "a"}), ("fast", {"value": "b"})
+    ]
+
+
+def test_a_failing_tool_does_not_stop_the_others():
+    agent, client = make_agent([FailingTool("broken"), WaitTool("fast")], [
+        response(tool_call("broken", {"value": "a"}), tool_call("fast", {"value": "b"})),
+        response(tool_call("return", {"result": "{}"})),
+    ])
+
+    events = list(agent.execute_task("trip"))
+
+    errors = [event["data"] for event in events if event["type"] == "error"]
+    assert errors == [{"message": "service unavailable", "tool_name": "broken", "call_id": "call_1"}]
+    results = {event["data"]["tool_name"]: event["data"]["result"] for event in events if event["type"] == "tool_result"}
+    assert results["fast"] == {"value": "b"}
+    assert results["broken"] == {"error": "An error occurred: service unavailable"}
+    assert events[-1] == {"type": "final_result", "data": {}}
+    assert "service unavailable" in client.requests[1]["messages"][-2]["content"]
+
+
+def test_async_tool_results_are_streamed_as_they_finish_and_kept_in_call_order():
+    fast_reported = threading.Event()
+    slow = WaitTool("slow", fast_reported)
+    agent, client = make_agent([slow, WaitTool("fast")], [
+        response(tool_call("slow", {"value": "a"}), tool_call("fast", {"value": "b"})),
+        response(tool_call("return", {"result": "{}"})),
+    ], asynchronous=True)
+
+    def on_event(event):
+        if event["type"] == "tool_result" and event["data"]["tool_name"] == "fast":
+            fast_reported.set()
+
+    events = run_async(agent, "trip", on_event)
+
+    assert [event["data"]["tool_name"] for event in events if event["type"] == "tool_result"] == ["fast", "slow", "return"]
+    assert slow.waited is True
+    assert events[-1] == {"type": "final_result", "data": {}}
+    tool_messages = [message for message in client.requests[1]["messages"] if message["role"] == "function"]
+    assert [message["name"] for message in tool_messages] == ["slow", "fast"]
+
+
+def test_async_failing_tool_does_not_stop_the_others():
+    agent, client = make_agent([FailingTool("broken"), WaitTool("fast")], [
+        response(tool_call("broken", {"value": "a"}), tool_call("fast", {"value": "b"})),
+        response(tool_call("return", {"result": "{}"})),
+    ], asynchronous=True)
+
+    events = run_async(agent, "trip")
+
+    assert [event["data"]["tool_name"] for event in events if event["type"] == "error"] == ["broken"]
+    results = {event["data"]["tool_name"]: event["data"]["result"] for event in events if event["type"] == "tool_result"}
+    assert results["fast"] == {"value": "b"}
+    assert results["broken"] == {"error": "An error occurred: service unavailable"}
+    assert events[-1] == {"type": "final_result", "data": {}}
+
+
+def check_split_tool_calls(events):
+    types = [event["type"] for event in events]
+    assert types.index("message_delta") < types.index("tool_call_delta") < types.index("tool_call")
+    calls = [event["data"] for event in events if event["type"] == "tool_call"]
+    assert [(call["tool_name"], call["parameters"]) for call in calls[:2]] == [
+        ("slow", {"value": "Paris"}), ("fast", {"value": "Lyon"})
+    ]
+    results = {event["data"]["tool_name"]: event["data"]["result"] for event in events if event["type"] == "tool_result"}
+    assert results["slow"] == {"value": "Paris"} and results["fast"] == {"value": "Lyon"}
+    assert events[-1] == {"type": "final_result", "data": {}}
+
+
+def test_streamed_tool_calls_are_reassembled_before_execution():
+    agent, client = make_agent([WaitTool("slow"), WaitTool("fast")], [SPLIT_TOOL_CALLS, RETURN_CHUNKS], stream=True)
+
+    events = list(agent.execute_task("trip"))
+
+    check_split_tool_calls(events)
+    assert client.requests[0]["stream"] is True
+    assert client.requests[1]["messages"][2] == {"role": "assistant", "content": "Je cherche"}
+
+
+def test_async_streamed_tool_calls_are_reassembled_before_execution():
+    agent, _ = make_agent(
+        [WaitTool("slow"), WaitTool("fast")], [SPLIT_TOOL_CALLS, RETURN_CHUNKS], asynchronous=True, stream=True
+    )
+
+    check_split_tool_calls(run_async(agent, "trip"))
+
+
+def test_async_calls_waiting_for_their_tool_do_not_hold_global_slots():
+    other_ran = threading.Event()
+    waited = []
+
+    class LimitedTool(WaitTool):
+        def execute(self, **kwargs):
+            waited.append(other_ran.wait(5))
+            return {"value": kwargs["value"]}
+
+    class SignalTool(WaitTool):
+        def execute(self, **kwargs):
+            other_ran.set()
+            return {"value": kwargs["value"]}
+
+    client = FakeAsyncClient([
+        response(tool_call("limited", {"value": "a"}), tool_call("limited", {"value": "b"}), tool_call("other", {"value": "c"})),
+        response(tool_call("return", {"result": "{}"})),
+    ])
+    agent = AsyncOpenAIAgent(
+        name="test", tools=[LimitedTool("limited"), SignalTool("other"), ReturnTool()], api_key="test", client=client,
+        max_workers=2, tool_concurrency={"limited": 1}
+    )
+
+    events = run_async(agent, "trip")
+
+    # Le second appel de "limited" attend sa place sans bloquer "other"
+    assert waited == [True, True]
+    assert events[-1] == {"type": "final_result", "data": {}}
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_streamed_usage_is_requested_and_reported(asynchronous):
+    # Avec include_usage, le fournisseur termine le stream par un chunk sans choix portant l'usage
+    usage_chunk = SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=12, completion_tokens=3))
+    agent, client = make_agent([], [RETURN_CHUNKS + [usage_chunk]], asynchronous=asynchronous, stream=True)
+
+    events = run_async(agent, "trip") if asynchronous else list(agent.execute_task("trip"))
+
+    assert client.requests[0]["stream_options"] == {"include_usage": True}
+    metrics = [event["data"] for event in events if event["type"] == "metrics" and event["data"]["kind"] == "llm"]
+    assert metrics[0]["prompt_tokens"] == 12 and metrics[0]["completion_tokens"] == 3
+    assert events[-1] == {"type": "final_result", "data": {}}
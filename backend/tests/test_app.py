@@ -0,0 +1,54 @@
+import importlib
+
+import pytest
+
+pytest.importorskip("flasgger")
+pytest.importorskip("flask_cors")
+pytest.importorskip("weave")
+
+from backend.tests.test_image_store import png
+from backend.utils.image_store import ImageStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ImageStore(tmp_path / "images", processes=0)
+
+
+@pytest.fixture
+def client(monkeypatch, store):
+    monkeypatch.setenv("WEAVE_PROJECT", "")
+    app = importlib.import_module("backend.app")
+    monkeypatch.setattr(app, "get_image_store", lambda: store)
+    return app.app.test_client()
+
+
+def test_stored_images_are_served_as_immutable_webp(client, store):
+    digest = store.put(png("red"))
+
+    response = client.get(f"/images/{digest}.webp")
+    thumbnail = client.get(f"/images/{digest}.w256.webp")
+    revalidated = client.get(f"/images/{digest}.webp", headers={"If-None-Match": f'"{digest}.webp"'})
+
+    assert response.status_code == 200
+    assert response.mimetype == "image/webp"
+    assert response.data == (store.root / f"{digest}.webp").read_bytes()
+    assert "immutable" in response.headers["Cache-Control"]
+    assert "max-age=31536000" in response.headers["Cache-Control"]
+    assert thumbnail.status_code == 200
+    assert revalidated.status_code == 304
+
+
+def test_unknown_images_are_not_found(client, store):
+    assert client.get(f"/images/{'0' * 64}.webp").status_code == 404
+    assert client.get(f"/images/{ImageStore.digest(b'missing')}.w256.webp").status_code == 404
+
+
+def test_paths_outside_the_store_are_rejected(client, store, tmp_path):
+    (tmp_path / "secret.webp").write_bytes(b"secret")
+    digest = store.put(png("blue"))
+
+    for name in ("..%2Fsecret.webp", "../secret.webp", "%2E%2E%2Fsecret.webp", f"{digest}.webp%00", f"..%2Fimages%2F{digest}.webp", "secret.webp"):
+        response = client.get(f"/images/{name}")
+        assert response.status_code == 404, name
+        assert b"secret" not in response.data
@@ -0,0 +1,30 @@
+import asyncio
+import threading
+
+from backend.tools.base_tool import BaseTool, ToolParameter, ParameterType
+
+
+class EchoTool(BaseTool):
+    def __init__(self):
+        super().__init__(name="echo", description="Renvoie ses paramètres")
+
+    def _define_parameters(self):
+        return [
+            ToolParameter(
+                name="text",
+                param_type=ParameterType.STRING,
+                description="Texte à renvoyer",
+            )
+        ]
+
+    def execute(self, **kwargs):
+        return {"text": kwargs["text"], "thread": threading.get_ident()}
+
+
+def test_aexecute_offloads_sync_tools_to_a_thread():
+    tool = EchoTool()
+
+    result = asyncio.run(tool.aexecute(text="Lyon"))
+
+    assert result["text"] == "Lyon"
+    assert result["thread"] != threading.get_ident()
@@ -0,0 +1,208 @@
+import asyncio
+import os
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+requests = pytest.importorskip("requests")
+
+from backend.utils.cassette import Cassette, CassetteMiss
+from backend.utils.http_client import HttpClient
+from backend.utils.rate_limit import RateLimiter
+
+MESSAGES = [{"role": "user", "content": "Paris -> Lyon ?"}]
+
+
+def completion(content):
+    return {
+        "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "test",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}]
+    }
+
+
+def chunk(content, finish_reason=None):
+    return {
+        "id": "chatcmpl-1", "object": "chat.completion.chunk", "created": 0, "model": "test",
+        "choices": [{"index": 0, "finish_reason": finish_reason, "delta": {"content": content}}]
+    }
+
+
+class FakeCompletions:
+    """chat.completions d'un client OpenAI : une réponse (ou liste de chunks) par appel"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+class FakeAsyncCompletions(FakeCompletions):
+    async def create(self, **kwargs):
+        response = FakeCompletions.create(self, **kwargs)
+        if not kwargs.get("stream"):
+            return response
+
+        async def chunks():
+            for item in response:
+                yield item
+        return chunks()
+
+
+class FakeClient:
+    def __init__(self, completions):
+        self.chat = type("Chat", (), {"completions": completions})()
+
+
+def http_client(handler):
+    return HttpClient(retries=0, backoff=0, rate_limiter=RateLimiter({}), transport=httpx.MockTransport(handler))
+
+
+class FakeAdapter(requests.adapters.BaseAdapter):
+    """Transport requests sans réseau"""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"lat": "45.76"}'
+        response.encoding = "utf-8"
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def test_http_client_requests_are_replayed_without_network(tmp_path):
+    path = str(tmp_path / "cassette.json")
+    sent = []
+
+    def handler(request):
+        sent.append(str(request.url))
+        return httpx.Response(200, json={"routes": [{"distance": 465000}]})
+
+    with Cassette(path, mode="record"):
+        recorded = http_client(handler).get("https://osrm.example/route", params={"steps": "false"})
+    with Cassette(path, mode="replay"):
+        replayed = http_client(handler).get("https://osrm.example/route", params={"steps": "false"})
+
+    assert sent == ["https://osrm.example/route?steps=false"]
+    assert replayed.status_code == recorded.status_code == 200
+    assert replayed.json() == {"routes": [{"distance": 465000}]}
+
+
+def test_requests_calls_are_replayed_without_network(tmp_path):
+    path = str(tmp_path / "cassette.json")
+    adapter = FakeAdapter()
+    session = requests.Session()
+    session.mount("https://", adapter)
+
+    with Cassette(path, mode="record"):
+        session.get("https://nominatim.example/search", params={"q": "Lyon"})
+    with Cassette(path, mode="replay"):
+        response = session.get("https://nominatim.example/search", params={"q": "Lyon"})
+
+    assert adapter.sent == 1
+    assert response.json() == {"lat": "45.76"}
+    assert response.url == "https://nominatim.example/search?q=Lyon"
+
+
+def test_changed_requests_miss_the_cassette(tmp_path):
+    path = str(tmp_path / "cassette.json")
+    handler = lambda request: httpx.Response(200, json={})
+
+    with Cassette(path, mode="record"):
+        http_client(handler).post("https://places.example/search", json={"textQuery": "Lyon"})
+    with Cassette(path, mode="replay"), pytest.raises(CassetteMiss):
+        http_client(handler).post("https://places.example/search", json={"textQuery": "Grenoble"})
+
+
+def test_repeated_requests_are_replayed_in_recorded_order(tmp_path):
+    path = str(tmp_path / "cassette.json")
+    statuses = iter([503, 200])
+
+    with Cassette(path, mode="record"):
+        first = [http_client(lambda request: httpx.Response(next(statuses))).get("https://osrm.example/table").status_code
+                 for _ in range(2)]
+    with Cassette(path, mode="replay"):
+        client = http_client(lambda request: httpx.Response(500))
+        replayed = [client.get("https://osrm.example/table").status_code for _ in range(2)]
+        with pytest.raises(CassetteMiss):
+            client.get("https://osrm.example/table")
+
+    assert first == replayed == [503, 200]
+
+
+def test_llm_calls_are_replayed_sync_async_and_streamed(tmp_path):
+    openai_types = pytest.importorskip("openai.types.chat")
+    ChatCompletion, ChatCompletionChunk = openai_types.ChatCompletion, openai_types.ChatCompletionChunk
+    path = str(tmp_path / "cassette.json")
+    sync = FakeCompletions([
+        ChatCompletion.model_validate(completion("Bonjour")),
+        [ChatCompletionChunk.model_validate(chunk("Bon")), ChatCompletionChunk.model_validate(chunk("jour", "stop"))],
+    ])
+    asynchronous = FakeAsyncCompletions([ChatCompletion.model_validate(completion("Salut"))])
+
+    async def ask(client, **kwargs):
+        return await client.chat.completions.create(**kwargs)
+
+    with Cassette(path, mode="record") as cassette:
+        cassette.wrap_llm_client(FakeClient(sync))
+        cassette.wrap_llm_client(FakeClient(asynchronous))
+        sync.create(model="test", messages=MESSAGES)
+        list(sync.create(model="test", messages=MESSAGES, stream=True))
+        asyncio.run(asynchronous.create(model="test", messages=MESSAGES, temperature=0))
+
+    replay = Cassette(path, mode="replay")
+    with replay:
+        client = replay.wrap_llm_client(FakeClient(FakeCompletions([])))
+        async_client = replay.wrap_llm_client(FakeClient(FakeAsyncCompletions([])))
+        message = client.chat.completions.create(model="test", messages=MESSAGES)
+        streamed = client.chat.completions.create(model="test", messages=MESSAGES, stream=True)
+        answer = asyncio.run(ask(async_client, model="test", messages=MESSAGES, temperature=0))
+        with pytest.raises(CassetteMiss):
+            client.chat.completions.create(model="test", messages=MESSAGES + MESSAGES)
+
+    assert message.choices[0].message.content == "Bonjour"
+    assert "".join(part.choices[0].delta.content for part in streamed) == "Bonjour"
+    assert answer.choices[0].message.content == "Salut"
+    assert sync.calls == 2 and asynchronous.calls == 1
+
+
+def test_llm_client_is_restored_after_the_cassette(tmp_path):
+    pytest.importorskip("openai")
+    completions = FakeCompletions([completion("Bonjour")])
+    client = FakeClient(completions)
+
+    with pytest.raises(RuntimeError):
+        Cassette(str(tmp_path / "cassette.json"), mode="record").wrap_llm_client(client)
+    with Cassette(str(tmp_path / "cassette.json"), mode="record") as cassette:
+        cassette.wrap_llm_client(client)
+        assert "create" in vars(completions)
+
+    # Le client (partagé par la fabrique d'agents) n'enregistre plus rien hors du bloc
+    assert "create" not in vars(completions)
+    assert client.chat.completions.create(model="test", messages=MESSAGES) == completion("Bonjour")
+
+
+def test_bench_runs_use_temporary_caches(monkeypatch):
+    pytest.importorskip("dotenv")
+    pytest.importorskip("google_images_search")
+    from backend.utils.bench import isolated_caches
+    from backend.utils.places_cache import get_places_search
+
+    monkeypatch.setenv("PLACES_CACHE_PATH", "/nonexistent/places.sqlite")
+    with isolated_caches() as directory:
+        assert os.environ["PLACES_CACHE_PATH"].startswith(directory)
+        search = get_places_search()
+    assert os.environ["PLACES_CACHE_PATH"] == "/nonexistent/places.sqlite"
+    assert not os.path.exists(directory)
+    assert get_places_search.cache_info().currsize == 0
+    assert search.cache is not None
@@ -0,0 +1,92 @@
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+from backend.agents.context import ContextBudget, summarize_tool_result
+
+
+@dataclass
+class Message:
+    role: str
+    content: str
+    name: Optional[str] = None
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def make_conversation(n_results, hotels_per_result=20):
+    messages = [
+        Message(role="system", content="system prompt"),
+        Message(role="user", content="Plan a trip"),
+    ]
+    for i in range(n_results):
+        messages.append(Message(role="assistant", content=f"search {i}"))
+        hotels = [{"name": f"Hotel {i}-{j}", "address": "Rue " * 5} for j in range(hotels_per_result)]
+        messages.append(Message(role="function", name="hotel_searcher", content=json.dumps({"hotels": hotels})))
+    return messages
+
+
+def test_conversation_under_budget_is_unchanged():
+    messages = make_conversation(2)
+    budget = ContextBudget(max_tokens=10_000, tokenizer=count_words)
+
+    assert budget.fit(messages) == messages
+
+
+def test_old_tool_results_are_summarized_first():
+    messages = make_conversation(6)
+    budget = ContextBudget(max_tokens=1200, keep_recent=2, tokenizer=count_words)
+
+    fitted = budget.fit(messages)
+
+    assert fitted[:2] == messages[:2]
+    assert fitted[-2:] == messages[-2:]
+    assert len(fitted) == len(messages)
+    assert json.loads(fitted[3].content)["elided"] is True
+    assert sum(budget.count(message) for message in fitted) <= 1200
+    # L'historique d'origine n'est pas modifié
+    assert "elided" not in messages[3].content
+
+
+def test_elision_is_sticky_between_steps():
+    messages = make_conversation(6)
+    budget = ContextBudget(max_tokens=1200, keep_recent=2, tokenizer=count_words)
+    first = budget.fit(messages)
+
+    messages.append(Message(role="assistant", content="done"))
+    second = budget.fit(messages)
+
+    assert second[3].content == first[3].content
+
+
+def test_oldest_messages_are_dropped_when_summaries_are_not_enough():
+    messages = make_conversation(6)
+    budget = ContextBudget(max_tokens=150, keep_recent=2, tokenizer=count_words)
+
+    fitted = budget.fit(messages)
+
+    assert fitted[:2] == messages[:2]
+    assert fitted[-2:] == messages[-2:]
+    assert len(fitted) < len(messages)
+
+
+def test_summary_keeps_item_names():
+    content = json.dumps({"hotels": [{"name": "Hôtel Europe"}, {"name": "B&B"}]})
+
+    summary = json.loads(summarize_tool_result(content))
+
+    assert summary["summary"] == "hotels: 2 items (Hôtel Europe, B&B)"
+
+
+def test_summary_keeps_refs_and_stop_ids():
+    hotels = [{"ref": f"H{i}", "name": f"Hôtel {i}", "address": "Rue de la République, Lyon " * 3} for i in range(1, 21)]
+    content = json.dumps({"hotels": hotels, "stops": {"Lyon, France": "S5595"}}, ensure_ascii=False)
+
+    summary = json.loads(summarize_tool_result(content, max_chars=50))
+
+    assert summary["summary"] == "hotels: 20 items"
+    assert summary["refs"] == {f"H{i}": f"Hôtel {i}" for i in range(1, 21)}
+    assert summary["stops"] == {"Lyon, France": "S5595"}
+    assert len(json.dumps(summary)) < len(content)
@@ -0,0 +1,34 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from backend.utils.estimate import estimate_legs, estimate_matrix, haversine_matrix
+
+PARIS = (48.8566, 2.3522)
+LYON = (45.7640, 4.8357)
+MARSEILLE = (43.2965, 5.3698)
+
+
+def test_haversine_matrix_is_symmetric_with_known_distances():
+    matrix = haversine_matrix([PARIS[0], LYON[0]], [PARIS[1], LYON[1]])
+
+    assert matrix.shape == (2, 2)
+    assert matrix[0, 0] == 0
+    assert matrix[0, 1] == pytest.approx(391500, rel=0.01)
+    assert matrix[1, 0] == matrix[0, 1]
+
+
+def test_road_estimates_are_close_to_real_trips():
+    distances, durations = estimate_matrix([PARIS, LYON, MARSEILLE])
+
+    # Paris -> Lyon : ~465 km et ~4 h 30 par la route
+    assert distances[0, 1] == pytest.approx(465000, rel=0.15)
+    assert durations[0, 1] == pytest.approx(4.5 * 3600, rel=0.2)
+
+
+def test_legs_match_the_matrix_diagonal():
+    distances, durations = estimate_legs([PARIS, LYON, MARSEILLE], mode="cycling")
+    matrix_distances, _ = estimate_matrix([PARIS, LYON, MARSEILLE], mode="cycling")
+
+    assert distances == pytest.approx([matrix_distances[0, 1], matrix_distances[1, 2]])
+    assert durations[0] == pytest.approx(distances[0] / (16 / 3.6))
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from backend.agents.executor import ToolExecutor
+
+
+def test_results_are_yielded_as_they_complete():
+    executor = ToolExecutor(max_workers=4)
+    delays = [0.2, 0.05, 0.1]
+    calls = [("tool", lambda d=d: time.sleep(d) or d) for d in delays]
+
+    order = [index for index, _ in executor.run_all(calls)]
+
+    assert order == [1, 2, 0]
+    executor.shutdown()
+
+
+def test_calls_run_concurrently():
+    executor = ToolExecutor(max_workers=4)
+    calls = [("tool", lambda: time.sleep(0.2)) for _ in range(4)]
+
+    start = time.perf_counter()
+    list(executor.run_all(calls))
+
+    assert time.perf_counter() - start < 0.6
+    executor.shutdown()
+
+
+def test_per_tool_limit_is_enforced():
+    executor = ToolExecutor(max_workers=8, per_tool_limits={"limited": 2})
+    lock = threading.Lock()
+    running = {"current": 0, "peak": 0}
+
+    def work():
+        with lock:
+            running["current"] += 1
+            running["peak"] = max(running["peak"], running["current"])
+        time.sleep(0.05)
+        with lock:
+            running["current"] -= 1
+
+    list(executor.run_all([("limited", work) for _ in range(6)]))
+
+    assert running["peak"] == 2
+    executor.shutdown()
+
+
+def test_waiting_calls_do_not_hold_pool_threads():
+    executor = ToolExecutor(max_workers=2, per_tool_limits={"limited": 1})
+    release = threading.Event()
+
+    limited = [executor.submit("limited", release.wait, 5) for _ in range(3)]
+    # Les deux appels en attente de "limited" n'occupent pas le second thread
+    other = executor.submit("other", lambda: "done")
+
+    assert other.result(timeout=2) == "done"
+    assert not any(future.done() for future in limited)
+    release.set()
+    assert [future.result(timeout=2) for future in limited] == [True, True, True]
+    executor.shutdown()
+
+
+def test_cancelled_waiting_calls_are_skipped():
+    executor = ToolExecutor(max_workers=2, per_tool_limits={"limited": 1})
+    release = threading.Event()
+    calls = []
+
+    first = executor.submit("limited", release.wait, 5)
+    cancelled = executor.submit("limited", calls.append, "cancelled")
+    last = executor.submit("limited", calls.append, "last")
+
+    assert cancelled.cancel()
+    release.set()
+    last.result(timeout=2)
+    assert first.result() is True
+    assert calls == ["last"]
+    executor.shutdown()
+
+
+def test_exceptions_are_kept_on_the_future():
+    executor = ToolExecutor(max_workers=2)
+
+    def boom():
+        raise ValueError("boom")
+
+    (index, future), = list(executor.run_all([("tool", boom)]))
+
+    assert index == 0
+    assert isinstance(future.exception(), ValueError)
+    executor.shutdown()
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("openai")
+
+from backend.agents.agent import AsyncOpenAIAgent
+from backend.agents.clients import get_llm_client
+from backend.agents.factory import AgentFactory
+from backend.tests.test_agent import FakeAsyncClient, WaitTool, response, tool_call
+from backend.tools.final_return import ReturnTool
+
+
+class CountingTool(WaitTool):
+    """Outil qui mesure le nombre maximal d'appels simultanés"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+
+    def execute(self, **kwargs):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        return {"value": kwargs["value"]}
+
+
+def make_factory(tools, **kwargs):
+    return AgentFactory(name="test", tools=[*tools, ReturnTool()], api_key="key", model="test", base_url="https://llm.example/v1", **kwargs)
+
+
+def test_agents_share_the_factory_resources():
+    factory = make_factory([WaitTool("search")])
+
+    first, second = factory.create(), factory.create()
+
+    assert first is not second
+    assert first.registry is second.registry is factory.registry
+    assert first.executor is second.executor is factory.executor
+    assert first.client is second.client is get_llm_client("key", "https://llm.example/v1")
+
+
+def test_clients_are_rebuilt_when_the_configuration_changes():
+    factory = make_factory([WaitTool("search")])
+    client = factory.create().client
+
+    factory.api_key = "rotated"
+
+    assert factory.create().client is not client
+    assert factory.create().client is get_llm_client("rotated", "https://llm.example/v1")
+    assert get_llm_client("key", "https://other.example/v1") is not client
+    assert get_llm_client("key", "https://llm.example/v1", asynchronous=True) is not client
+
+
+def test_async_tool_limits_are_shared_by_the_agents_of_a_factory():
+    tool = CountingTool("search")
+    factory = make_factory([tool], agent_class=AsyncOpenAIAgent, tool_concurrency={"search": 1})
+
+    def agent():
+        client = FakeAsyncClient([
+            response(tool_call("search", {"value": "a"}), tool_call("search", {"value": "b"})),
+            response(tool_call("return", {"result": "{}"})),
+        ])
+        return factory.create(client=client)
+
+    async def run(agent):
+        return [event async for event in agent.execute_task("trip")]
+
+    async def main():
+        return await asyncio.gather(run(agent()), run(agent()))
+
+    runs = asyncio.run(main())
+
+    assert all(events[-1] == {"type": "final_result", "data": {}} for events in runs)
+    assert tool.peak == 1
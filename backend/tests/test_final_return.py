@@ -0,0 +1,34 @@
+import json
+
+from backend.agents.run_context import RunContext, use_run_context
+from backend.tools.final_return import ReturnTool
+
+
+def test_hotel_refs_are_resolved_to_full_records():
+    context = RunContext()
+    ref = context.add_record("H", {
+        "name": "Slo Living Hostel",
+        "address": "Slo Living Hostel, Rue Bonnefoi, Voltaire, Lyon, France",
+        "maps_link": "https://www.openstreetmap.org/way/3305697821",
+        "image_link": "https://example.com/slo.jpg"
+    })
+    trip = {"days": [{"dayNumber": 1, "hotel": {"ref": ref.lower(), "name": "Slo", "stars": 2}}]}
+
+    with use_run_context(context):
+        result = ReturnTool().execute(result=json.dumps(trip))
+
+    assert ref == "H1"
+    assert result["result"]["days"][0]["hotel"] == {
+        "name": "Slo Living Hostel",
+        "address": "Slo Living Hostel, Rue Bonnefoi, Voltaire, Lyon, France",
+        "stars": 2,
+        "image": "https://example.com/slo.jpg"
+    }
+
+
+def test_without_run_context_the_result_is_unchanged():
+    trip = {"days": [{"hotel": {"ref": "H1", "name": "Slo"}}]}
+
+    result = ReturnTool().execute(result=json.dumps(trip))
+
+    assert result["result"] == trip
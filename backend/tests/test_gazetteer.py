@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from backend.utils.gazetteer import Gazetteer, normalize_name
+
+CITIES = [
+    # geonameid, name, asciiname, alternatenames, lat, lon, class, code, country, cc2, admin1-4, population
+    ("2988507", "Paris", "Paris", "", "48.85341", "2.3488", "P", "PPLC", "FR", "", "11", "75", "", "", "2138551"),
+    ("4717560", "Paris", "Paris", "", "33.66094", "-95.55551", "P", "PPLS", "US", "", "TX", "", "", "", "24171"),
+    ("2996944", "Lyon", "Lyon", "", "45.74846", "4.84671", "P", "PPLA", "FR", "", "84", "69", "", "", "522969"),
+    ("2980291", "Saint-Étienne", "Saint-Etienne", "", "45.43389", "4.39", "P", "PPLA2", "FR", "", "84", "42", "", "", "171057"),
+    ("2995469", "Marseille", "Marseille", "", "43.29695", "5.38107", "P", "PPLA", "FR", "", "93", "13", "", "", "870731"),
+    ("3017382", "France", "France", "", "46.0", "2.0", "A", "PCLI", "FR", "", "00", "", "", "", "66987244"),
+]
+
+
+@pytest.fixture(scope="module")
+def gazetteer(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("gazetteer")
+    dump = directory / "cities.txt"
+    dump.write_text("\n".join("\t".join(row + ("", "", "Europe/Paris", "2024-01-01")) for row in CITIES) + "\n", encoding="utf-8")
+    countries = directory / "countryInfo.txt"
+    countries.write_text("#ISO\tISO3\tISO-Numeric\tfips\tCountry\nFR\tFRA\t250\tFR\tFrance\nUS\tUSA\t840\tUS\tUnited States\n", encoding="utf-8")
+    regions = directory / "admin1CodesASCII.txt"
+    regions.write_text("FR.11\tÎle-de-France\tIle-de-France\t3012874\nUS.TX\tTexas\tTexas\t4736286\n", encoding="utf-8")
+    output = directory / "cities.gaz"
+    Gazetteer.build(str(dump), str(output), str(countries), str(regions))
+    return Gazetteer(str(output))
+
+
+def test_names_are_normalized():
+    assert normalize_name("Saint-Étienne") == "saint etienne"
+
+
+def test_exact_lookup_prefers_the_most_populated_city(gazetteer):
+    assert gazetteer.lookup("Paris") == (48.85341, 2.3488)
+    assert gazetteer.lookup("Paris, United States") == (33.66094, -95.55551)
+    assert gazetteer.lookup("paris, fr") == (48.85341, 2.3488)
+    assert gazetteer.lookup("Paris, USA") == (33.66094, -95.55551)
+
+
+def test_region_hints_select_the_matching_city(gazetteer):
+    assert gazetteer.lookup("Paris, Texas") == (33.66094, -95.55551)
+    assert gazetteer.lookup("Paris, TX") == (33.66094, -95.55551)
+    assert gazetteer.lookup("Paris, Texas, United States") == (33.66094, -95.55551)
+    assert gazetteer.lookup("Paris, Ile-de-France, France") == (48.85341, 2.3488)
+
+
+def test_unknown_hints_are_left_to_nominatim(gazetteer):
+    assert gazetteer.lookup("Paris, Narnia") is None
+    assert gazetteer.lookup("Paris, Narnia, France") is None
+    assert gazetteer.lookup("Paris, Texas, France") is None
+
+
+def test_fuzzy_and_accent_insensitive_lookup(gazetteer):
+    assert gazetteer.lookup("saint etienne") == (45.43389, 4.39)
+    assert gazetteer.lookup("Marseile") == (43.29695, 5.38107)
+    assert gazetteer.search("Ly")[0].name == "Lyon"
+
+
+def test_addresses_and_unknown_places_are_left_to_nominatim(gazetteer):
+    assert gazetteer.lookup("10 rue de Rivoli, Paris") is None
+    assert gazetteer.lookup("Atlantis") is None
+    # Seuls les lieux habités (classe P) sont indexés
+    assert gazetteer.lookup("France") is None
+
+
+def test_common_lookups_are_fast(gazetteer):
+    start = time.perf_counter()
+    for _ in range(1000):
+        gazetteer.lookup("Lyon, France")
+    assert (time.perf_counter() - start) / 1000 < 0.001
@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import pytest
+
+from backend.utils.generation_cache import GenerationCache, generate_batch, generation_key
+
+
+def test_key_ignores_case_and_spacing_but_not_parameters():
+    key = generation_key("dall-e-2", "Lyon old town at sunset", "256x256", "standard")
+
+    assert generation_key("dall-e-2", "  lyon old  town at sunset ", "256x256", "standard") == key
+    assert generation_key("dall-e-2", "Lyon old town at sunset", "512x512", "standard") != key
+    assert generation_key("imagen-3.0-generate-002", "Lyon old town at sunset", "256x256", "standard") != key
+
+
+def test_results_persist_across_instances(tmp_path):
+    path = str(tmp_path / "generations.sqlite")
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return {"urls": ["https://img/1"]}
+
+    assert GenerationCache(path).get_or_generate("k", generate) == {"urls": ["https://img/1"]}
+    assert GenerationCache(path).get_or_generate("k", generate) == {"urls": ["https://img/1"]}
+    assert len(calls) == 1
+
+
+def test_expired_or_invalid_entries_are_regenerated():
+    cache = GenerationCache(":memory:")
+    cache.set("expired", {"urls": ["old"]}, ttl=-1)
+    cache.set("evicted", {"digest": "gone"})
+
+    assert cache.get_or_generate("expired", lambda: {"urls": ["new"]}) == {"urls": ["new"]}
+    assert cache.get_or_generate("evicted", lambda: {"digest": "new"}, is_valid=lambda value: value["digest"] != "gone") == {"digest": "new"}
+
+
+def test_concurrent_identical_requests_share_one_generation():
+    cache = GenerationCache(":memory:")
+    calls = []
+    lock = threading.Lock()
+
+    def generate():
+        with lock:
+            calls.append(1)
+        time.sleep(0.1)
+        return {"urls": ["https://img/1"]}
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(lambda _: cache.get_or_generate("k", generate), range(5)))
+
+    assert results == [{"urls": ["https://img/1"]}] * 5
+    assert len(calls) == 1
+
+
+def test_errors_are_not_cached():
+    cache = GenerationCache(":memory:")
+
+    def fail():
+        raise RuntimeError("content policy")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_generate("k", fail)
+    assert cache.get_or_generate("k", lambda: {"urls": ["ok"]}) == {"urls": ["ok"]}
+
+
+def test_batch_runs_prompts_in_parallel_and_isolates_errors():
+    def generate(prompt):
+        time.sleep(0.1)
+        if prompt == "bad":
+            raise ValueError("rejected")
+        return {"image_path": f"images/{prompt}.webp"}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        images = generate_batch(generate, ["lyon", "bad", "annecy", "nice"], pool)
+
+    assert time.perf_counter() - start < 0.3
+    assert images[0] == {"prompt": "lyon", "image_path": "images/lyon.webp"}
+    assert images[1] == {"prompt": "bad", "error": "An error occurred: rejected"}
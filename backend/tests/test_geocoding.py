@@ -0,0 +1,62 @@
+import pytest
+
+pytest.importorskip("httpx")
+
+from backend.utils.geocoding import Geocoder, normalize_query
+
+
+class FakeGeocoder(Geocoder):
+    def __init__(self, places, **kwargs):
+        super().__init__(**kwargs)
+        self.places = places
+        self.searches = []
+
+    def _search(self, query):
+        self.searches.append(query)
+        return self.places.get(normalize_query(query))
+
+
+def test_queries_are_normalized():
+    assert normalize_query("  Paris ,France. ") == normalize_query("paris, france") == "paris, france"
+
+
+def test_hits_and_misses_are_cached(tmp_path):
+    geocoder = FakeGeocoder({"paris": (48.85, 2.35)}, cache_path=str(tmp_path / "geo.sqlite"))
+
+    assert geocoder.geocode("Paris") == (48.85, 2.35)
+    assert geocoder.geocode(" PARIS ") == (48.85, 2.35)
+    assert geocoder.geocode("Atlantis") is None
+    assert geocoder.geocode("atlantis") is None
+
+    assert geocoder.searches == ["Paris", "Atlantis"]
+
+
+def test_store_is_shared_across_geocoders(tmp_path):
+    path = str(tmp_path / "geo.sqlite")
+    FakeGeocoder({"lyon": (45.76, 4.83)}, cache_path=path).geocode("Lyon")
+
+    other = FakeGeocoder({}, cache_path=path)
+
+    assert other.geocode("Lyon") == (45.76, 4.83)
+    assert other.searches == []
+
+
+def test_expired_entries_are_refreshed():
+    geocoder = FakeGeocoder({"marseille": (43.3, 5.37)}, cache_path=None, ttl=-1)
+
+    geocoder.geocode("Marseille")
+    geocoder.geocode("Marseille")
+
+    assert len(geocoder.searches) == 2
+
+
+def test_gazetteer_resolves_cities_before_nominatim():
+    class Gazetteer:
+        def lookup(self, query):
+            return (45.75, 4.85) if normalize_query(query) == "lyon" else None
+
+    geocoder = FakeGeocoder({"10 rue de la paix, paris": (48.87, 2.33)}, cache_path=None, gazetteer=Gazetteer())
+
+    assert geocoder.geocode("Lyon") == (45.75, 4.85)
+    assert geocoder.geocode("10 rue de la Paix, Paris") == (48.87, 2.33)
+    assert geocoder.searches == ["10 rue de la Paix, Paris"]
@@ -0,0 +1,121 @@
+import io
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+pytest.importorskip("google_images_search")
+httpx = pytest.importorskip("httpx")
+
+from backend.agents.run_context import RunContext, use_run_context
+from backend.tests.test_poi_index import REGION
+from backend.tools.hotel_open import HotelToolOpen
+from backend.utils.http_client import HttpClient
+from backend.utils.image_search import ImageLookup
+from backend.utils.poi_index import LodgingIndex
+from backend.utils.rate_limit import RateLimiter
+
+LYON = (45.76, 4.835)
+
+
+class FakeGeocoder:
+    def geocode(self, location):
+        return LYON
+
+
+@pytest.fixture
+def tool(monkeypatch):
+    monkeypatch.setattr("backend.tools.hotel_open.get_geocoder", lambda: FakeGeocoder())
+
+    def unreachable(request):
+        raise AssertionError(f"unexpected request to {request.url}")
+
+    client = HttpClient(retries=0, rate_limiter=RateLimiter({}), transport=httpx.MockTransport(unreachable))
+    monkeypatch.setattr("backend.tools.hotel_open.get_http_client", lambda: client)
+    tool = HotelToolOpen(lodging_index=LodgingIndex.from_osm_xml(io.BytesIO(REGION)), defer_images=True)
+    tool.images = ImageLookup(lambda query: f"https://img.example/{query.replace(' ', '_')}.jpg")
+    return tool
+
+
+def test_hotels_come_from_the_local_index_without_nominatim(tool):
+    result = tool.execute(location="Lyon, France")
+
+    assert sorted(hotel["name"] for hotel in result["hotels"]) == ["Chez Marie", "Hotel Bellecour", "Motel Sud"]
+    bellecour = next(hotel for hotel in result["hotels"] if hotel["name"] == "Hotel Bellecour")
+    assert bellecour["address"] == "Hotel Bellecour, Place Bellecour, Lyon"
+    assert bellecour["maps_link"] == "https://www.openstreetmap.org/node/1"
+    assert bellecour["image_link"] == "https://img.example/Hotel_Bellecour.jpg"
+
+
+def test_empty_index_areas_fall_back_to_nominatim(tool, monkeypatch):
+    client = HttpClient(retries=0, rate_limiter=RateLimiter({}), transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, json=[{"display_name": "Hotel Nord, Lille", "osm_type": "node", "osm_id": 9}])
+    ))
+    monkeypatch.setattr("backend.tools.hotel_open.get_http_client", lambda: client)
+    monkeypatch.setattr(FakeGeocoder, "geocode", lambda self, location: (50.63, 3.06))
+
+    result = tool.execute(location="Lille, France")
+
+    assert [hotel["name"] for hotel in result["hotels"]] == ["Hotel Nord"]
+
+
+def test_deferred_images_are_patched_into_the_result(tool):
+    release = threading.Event()
+    tool.images = ImageLookup(lambda query: release.wait(5) and f"https://img.example/{len(query)}.jpg")
+    context = RunContext()
+
+    with use_run_context(context, "call_1"):
+        result = tool.execute(location="Lyon, France")
+
+    assert all(hotel["image_link"] == "" for hotel in result["hotels"])
+    assert context.pop_completed() == []
+    release.set()
+    context.wait_deferred(timeout=5)
+    patches = sorted(context.pop_completed(), key=lambda patch: patch["path"])
+    assert [patch["path"] for patch in patches] == [["hotels", index, "image_link"] for index in range(3)]
+    assert {patch["call_id"] for patch in patches} == {"call_1"}
+    # Le résultat (et donc l'enregistrement retrouvé par sa référence) est complété
+    assert [hotel["image_link"] for hotel in result["hotels"]] == [patch["value"] for patch in patches]
+    assert context.pop_completed() == []
+
+
+def test_failed_image_searches_still_resolve_their_patch(tool):
+    class BrokenLookup:
+        def __init__(self):
+            self.futures = []
+
+        def submit(self, query):
+            future = Future()
+            self.futures.append(future)
+            return future
+
+    tool.images = BrokenLookup()
+    context = RunContext()
+
+    with use_run_context(context, "call_1"):
+        result = tool.execute(location="Lyon, France")
+    tool.images.futures[0].set_exception(RuntimeError("quota exceeded"))
+    tool.images.futures[1].cancel()
+    tool.images.futures[2].set_result("https://img.example/ok.jpg")
+    context.wait_deferred(timeout=1)
+
+    patches = sorted(context.pop_completed(), key=lambda patch: patch["path"])
+    assert [patch["value"] for patch in patches] == ["", "", "https://img.example/ok.jpg"]
+    assert [hotel["image_link"] for hotel in result["hotels"]] == ["", "", "https://img.example/ok.jpg"]
+
+
+def test_compact_results_reference_the_full_hotels(tool):
+    context = RunContext()
+
+    with use_run_context(context, "call_1"):
+        result = tool.execute(location="Lyon, France")
+        compact = tool.compact(result)
+
+    assert [hotel["ref"] for hotel in compact["hotels"]] == ["H1", "H2", "H3"]
+    for short, hotel in zip(compact["hotels"], result["hotels"]):
+        assert context.get_record(short["ref"]) is hotel
+        assert short["name"] == hotel["name"]
+        assert "maps_link" not in short and "image_link" not in short
+    assert compact["stops"] == result["stops"]
+    # Hors d'une exécution de l'agent, pas de référence
+    assert "ref" not in tool.compact(result)["hotels"][0]
@@ -0,0 +1,151 @@
+import time
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from backend.agents.metrics import ToolCallMetrics, measure_tool_call
+from backend.utils.circuit_breaker import CircuitBreaker
+from backend.utils.http_client import CircuitOpenError, HttpClient
+from backend.utils.rate_limit import RateLimiter
+
+
+def make_client(handler, **kwargs):
+    kwargs.setdefault("backoff", 0)
+    return HttpClient(rate_limiter=RateLimiter({}), transport=httpx.MockTransport(handler), **kwargs)
+
+
+def test_transient_errors_are_retried_for_get():
+    statuses = iter([503, 502, 200])
+    client = make_client(lambda request: httpx.Response(next(statuses), json={"ok": True}))
+
+    response = client.get("https://osrm.example/route")
+
+    assert response.status_code == 200
+    stats = client.stats()["osrm.example"]
+    assert stats["requests"] == 3
+    assert stats["retries"] == 2
+    assert stats["errors"] == 2
+
+
+def test_retries_stop_after_the_limit():
+    client = make_client(lambda request: httpx.Response(503), retries=1)
+
+    assert client.get("https://osrm.example/route").status_code == 503
+    assert client.stats()["osrm.example"]["requests"] == 2
+
+
+def test_post_is_retried_only_when_the_request_was_not_sent():
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(500)
+
+    client = make_client(handler)
+
+    assert client.post("https://places.example/search", json={"q": "hotel"}).status_code == 500
+    assert calls == ["POST", "POST"]
+
+
+def test_read_timeouts_raise_after_retries():
+    def handler(request):
+        raise httpx.ReadTimeout("slow", request=request)
+
+    client = make_client(handler, retries=2)
+
+    with pytest.raises(httpx.ReadTimeout):
+        client.get("https://nominatim.example/search")
+    assert client.stats()["nominatim.example"]["requests"] == 3
+
+
+def test_requests_are_attributed_to_the_running_tool():
+    client = make_client(lambda request: httpx.Response(200, content=b"0123456789"))
+    metrics = ToolCallMetrics("osm_api")
+
+    with measure_tool_call(metrics):
+        client.get("https://osrm.example/route", params={"overview": "false"})
+
+    assert [(call.host, call.status, call.bytes) for call in metrics.http] == [("osrm.example", 200, 10)]
+    assert client.stats()["osrm.example"]["bytes_received"] == 10
+
+
+def test_open_circuit_fails_fast_then_probes_after_the_timeout():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.host)
+        raise httpx.ConnectError("down", request=request)
+
+    client = make_client(handler, retries=0, failure_threshold=2, reset_timeout=0.1)
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            client.get("https://osrm.example/route")
+
+    with pytest.raises(CircuitOpenError):
+        client.get("https://osrm.example/route")
+    assert len(calls) == 2
+    assert client.stats()["osrm.example"]["circuit"] == "open"
+
+    time.sleep(0.15)
+    with pytest.raises(httpx.ConnectError):
+        client.get("https://osrm.example/route")
+    assert len(calls) == 3
+
+
+def test_half_open_circuit_lets_a_single_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_failed_requests_move_to_the_mirror():
+    def handler(request):
+        if request.url.host == "router.example":
+            raise httpx.ConnectError("down", request=request)
+        return httpx.Response(200, json={"url": str(request.url)})
+
+    client = make_client(handler, mirrors={"https://router.example/route/v1/car": ["https://mirror.example/routed-car/route/v1/driving"]})
+
+    response = client.get("https://router.example/route/v1/car/2.35,48.85;4.83,45.76", params={"overview": "false"})
+
+    assert response.json()["url"] == "https://mirror.example/routed-car/route/v1/driving/2.35,48.85;4.83,45.76?overview=false"
+    assert client.endpoints("https://router.example/table/v1/car/1,2") == ["https://router.example/table/v1/car/1,2"]
+
+
+def test_slow_requests_are_hedged_to_the_mirror():
+    def handler(request):
+        if request.url.host == "slow.example":
+            time.sleep(0.5)
+        return httpx.Response(200, text=request.url.host)
+
+    client = make_client(handler, hedge_after=0.05, mirrors={"https://slow.example": ["https://fast.example"]})
+
+    start = time.perf_counter()
+    response = client.get("https://slow.example/search")
+
+    assert response.text == "fast.example"
+    assert time.perf_counter() - start < 0.3
+    assert client.stats()["slow.example"]["hedges"] == 1
+
+
+def test_hosts_without_mirror_are_not_hedged_against_themselves():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.host)
+        time.sleep(0.1)
+        return httpx.Response(200)
+
+    client = make_client(handler, hedge_after=0.01, mirrors={})
+
+    client.get("https://nominatim.example/search")
+
+    assert calls == ["nominatim.example"]
+    assert client.stats()["nominatim.example"]["hedges"] == 0
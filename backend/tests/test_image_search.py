@@ -0,0 +1,56 @@
+import threading
+import time
+
+from backend.utils.image_search import ImageLookup
+
+
+def test_lookups_run_concurrently_and_are_cached():
+    searches = []
+
+    def search(query):
+        searches.append(query)
+        time.sleep(0.1)
+        return f"https://img/{query}"
+
+    images = ImageLookup(search, max_workers=6)
+    start = time.perf_counter()
+    urls = images.lookup_many([f"Hotel {i}" for i in range(6)])
+
+    assert time.perf_counter() - start < 0.3
+    assert urls[2] == "https://img/Hotel 2"
+    assert images.lookup_many(["  hotel 2 "]) == ["https://img/Hotel 2"]
+    assert len(searches) == 6
+
+
+def test_identical_inflight_lookups_are_shared():
+    release = threading.Event()
+    calls = []
+
+    def search(query):
+        calls.append(query)
+        release.wait(1)
+        return "https://img/x"
+
+    images = ImageLookup(search)
+    first = images.submit("Hotel Europe")
+    second = images.submit("hotel europe")
+    release.set()
+
+    assert first is second
+    assert first.result() == "https://img/x"
+    assert calls == ["Hotel Europe"]
+
+
+def test_failed_lookups_are_not_cached():
+    attempts = []
+
+    def search(query):
+        attempts.append(query)
+        if len(attempts) == 1:
+            raise RuntimeError("quota exceeded")
+        return "https://img/ok"
+
+    images = ImageLookup(search)
+
+    assert images.submit("Hotel").result() == ""
+    assert images.submit("Hotel").result() == "https://img/ok"
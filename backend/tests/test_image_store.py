@@ -0,0 +1,49 @@
+from io import BytesIO
+
+from PIL import Image
+
+from backend.utils.image_store import ImageStore
+
+
+def png(color, size=(600, 400)) -> bytes:
+    output = BytesIO()
+    Image.new("RGB", size, color).save(output, format="PNG")
+    return output.getvalue()
+
+
+def test_images_are_stored_by_content_with_thumbnails(tmp_path):
+    store = ImageStore(tmp_path, processes=0)
+
+    digest = store.put(png("red"))
+
+    assert digest == ImageStore.digest(png("red"))
+    assert store.put(png("red")) == digest
+    assert sorted(path.name for path in tmp_path.iterdir()) == [f"{digest}.w256.webp", f"{digest}.webp"]
+    with Image.open(store.path(f"{digest}.w256.webp")) as thumbnail:
+        assert thumbnail.format == "WEBP"
+        assert thumbnail.size == (256, 171)
+    assert store.path("../secret.webp") is None
+
+
+def test_encoding_runs_in_process_pool(tmp_path):
+    store = ImageStore(tmp_path, processes=1)
+    try:
+        digests = [store.put_async(png(color)).result(timeout=30) for color in ("red", "blue")]
+    finally:
+        store.close()
+
+    assert all(store.path(f"{digest}.webp") for digest in digests)
+
+
+def test_least_recently_used_images_are_evicted(tmp_path):
+    store = ImageStore(tmp_path, processes=0)
+    red, blue = store.put(png("red")), store.put(png("blue"))
+    store.max_bytes = store.total_bytes
+    store.path(f"{red}.webp")
+
+    green = store.put(png("green"))
+
+    assert red in store and green in store
+    assert blue not in store
+    assert not (tmp_path / f"{blue}.webp").exists()
+    assert ImageStore(tmp_path, processes=0).total_bytes == store.total_bytes
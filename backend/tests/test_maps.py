@@ -0,0 +1,75 @@
+import pytest
+
+pytest.importorskip("googlemaps")
+pytest.importorskip("dotenv")
+
+from backend.tools.maps import MapsTool
+
+KM = {("Paris", "Lyon"): 465, ("Lyon", "Marseille"): 315, ("Lyon", "Paris"): 465, ("Paris", "Marseille"): 775}
+
+
+class FakeClient:
+    def __init__(self, fail_origin=None):
+        self.calls = []
+        self.fail_origin = fail_origin
+
+    def distance_matrix(self, origins, destinations, mode):
+        self.calls.append((len(origins), len(destinations)))
+        if self.fail_origin in origins:
+            return {"status": "OVER_QUERY_LIMIT"}
+
+        def element(origin, destination):
+            km = KM.get((origin, destination), KM.get((destination, origin), 0 if origin == destination else None))
+            if km is None:
+                return {"status": "ZERO_RESULTS"}
+            return {"status": "OK", "distance": {"text": f"{km} km", "value": km * 1000},
+                    "duration": {"text": f"{km // 100} hours", "value": km * 36}}
+
+        return {
+            "status": "OK",
+            "origin_addresses": [f"{o}, France" for o in origins],
+            "destination_addresses": [f"{d}, France" for d in destinations],
+            "rows": [{"elements": [element(o, d) for d in destinations]} for o in origins]
+        }
+
+
+def test_all_pairs_come_from_one_request():
+    client = FakeClient()
+    tool = MapsTool(client=client)
+
+    result = tool.execute(list_of_locations=["Paris", "Lyon", "Marseille"])
+
+    assert client.calls == [(2, 2)]
+    assert result["Paris to Lyon"] == {"origin": "Paris, France", "destination": "Lyon, France", "distance": "465 km", "duration": "4 hours"}
+    assert result["Lyon to Marseille"]["distance"] == "315 km"
+    assert "matrix" not in result
+
+
+def test_full_matrix_is_optional():
+    tool = MapsTool(client=FakeClient())
+
+    result = tool.execute(list_of_locations=["Paris", "Lyon", "Paris"], full_matrix=True)
+
+    assert result["matrix"]["locations"] == ["Paris", "Lyon"]
+    assert result["matrix"]["distances"] == [[0, 465000], [465000, 0]]
+    assert result["Lyon to Paris"]["distance"] == "465 km"
+
+
+def test_requests_are_split_at_element_limits():
+    client = FakeClient()
+    tool = MapsTool(client=client)
+
+    tool.execute(list_of_locations=[f"Town {i}" for i in range(30)], full_matrix=True)
+
+    assert client.calls == [(4, 25), (4, 5)] * 7 + [(2, 25), (2, 5)]
+    assert all(o * d <= 100 for o, d in client.calls)
+
+
+def test_a_failed_block_only_affects_its_pairs():
+    tool = MapsTool(client=FakeClient(fail_origin="Paris"))
+    tool._blocks = lambda n_origins, n_destinations: [(range(i, i + 1), range(n_destinations)) for i in range(n_origins)]
+
+    result = tool.execute(list_of_locations=["Paris", "Lyon", "Marseille"])
+
+    assert result["Paris to Lyon"] == {"error": "API request failed: OVER_QUERY_LIMIT"}
+    assert result["Lyon to Marseille"]["distance"] == "315 km"
@@ -0,0 +1,132 @@
+import os
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("numpy")
+
+from backend.tools.maps_openstreetmap import OpenStreetMapTool
+from backend.utils.road_graph import RoadGraph
+
+COORDINATES = {"Paris": (2.35, 48.85), "Lyon": (4.83, 45.76), "Marseille": (5.37, 43.3)}
+
+
+class FakeOsmTool(OpenStreetMapTool):
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = responses
+        self.calls = []
+
+    def _get_coordinates(self, location):
+        if location not in COORDINATES:
+            raise ValueError(f"Location not found: {location}")
+        return COORDINATES[location]
+
+    def _osrm(self, service, coordinates, mode, params):
+        self.calls.append((service, len(coordinates)))
+        return self.responses[service]
+
+
+def test_route_mode_returns_every_leg_from_one_request():
+    tool = FakeOsmTool({"route": {"code": "Ok", "routes": [{
+        "distance": 775000, "duration": 27000,
+        "legs": [{"distance": 465000, "duration": 16200}, {"distance": 310000, "duration": 10800}]
+    }]}})
+
+    result = tool.execute(list_of_locations=["Paris", "Lyon", "Marseille"], calculation="route")
+
+    assert tool.calls == [("route", 3)]
+    assert result["Paris to Lyon"]["distance"] == "465.0 km"
+    assert result["Lyon to Marseille"]["duration"] == "3 hours 0 mins"
+    assert result["total"]["distance"] == "775.0 km"
+
+
+def test_matrix_mode_returns_all_pairs():
+    tool = FakeOsmTool({"table": {
+        "code": "Ok",
+        "distances": [[0, 465000], [465000, 0]],
+        "durations": [[0, 16200], [16200, 0]]
+    }})
+
+    result = tool.execute(list_of_locations=["Paris", "Lyon"], calculation="matrix")
+
+    assert tool.calls == [("table", 2)]
+    assert result["durations"][0][1] == 16200
+    assert tool.compact(result)["duration_min"] == [[0, 270], [270, 0]]
+
+
+def test_unknown_location_is_reported():
+    tool = FakeOsmTool({})
+
+    result = tool.execute(list_of_locations=["Paris", "Atlantis"], calculation="route")
+
+    assert result == {"error": "An error occurred: Location not found: Atlantis"}
+
+
+def test_local_road_graph_answers_without_osrm():
+    graph = RoadGraph.from_osm_xml(os.path.join(os.path.dirname(__file__), "data", "small_region.osm"))
+    tool = OpenStreetMapTool(road_graph=graph)
+    tool._get_coordinates = lambda location: {"A": (4.8301, 45.7501), "B": (4.8499, 45.7699)}[location]
+
+    result = tool.execute(list_of_locations=["A", "B", "A"], calculation="route")
+
+    assert result["A to B"]["distance"] == "3.8 km"
+    assert result["total"]["distance"] == "7.6 km"
+
+
+def test_estimate_mode_needs_no_network():
+    tool = FakeOsmTool({})
+
+    result = tool.execute(list_of_locations=["Paris", "Lyon"], calculation="estimate")
+
+    assert tool.calls == []
+    assert result["estimated"] is True
+    assert 350000 < result["distances"][0][1] < 600000
+
+
+def test_osrm_failure_falls_back_to_the_estimate(monkeypatch):
+    import httpx
+    from backend.utils.http_client import HttpClient
+    from backend.utils.rate_limit import RateLimiter
+
+    def unreachable(request):
+        raise httpx.ConnectError("OSRM down", request=request)
+
+    client = HttpClient(retries=0, rate_limiter=RateLimiter({}), transport=httpx.MockTransport(unreachable))
+    monkeypatch.setattr("backend.tools.maps_openstreetmap.get_http_client", lambda: client)
+    tool = OpenStreetMapTool()
+    tool._get_coordinates = lambda location: COORDINATES[location]
+
+    result = tool.execute(list_of_locations=["Paris", "Lyon"])
+
+    assert result["Paris to Lyon"]["estimated"] is True
+    assert tool.compact(result)["Paris to Lyon"].startswith("~")
+
+
+def test_locations_are_geocoded_once_per_run_and_reported_as_stops(monkeypatch):
+    from backend.agents.run_context import RunContext, use_run_context
+
+    geocoded = []
+
+    class FakeGeocoder:
+        def geocode(self, location):
+            geocoded.append(location)
+            lon, lat = COORDINATES[location]
+            return lat, lon
+
+    class RoutingTool(OpenStreetMapTool):
+        def _osrm(self, service, coordinates, mode, params):
+            return self._estimate(service, coordinates, mode)
+
+    monkeypatch.setattr("backend.tools.maps_openstreetmap.get_geocoder", lambda: FakeGeocoder())
+    tool = RoutingTool()
+
+    with use_run_context(RunContext()):
+        first = tool.execute(list_of_locations=["Paris", "Lyon"], calculation="route")
+        second = tool.execute(list_of_locations=["S7282", "Marseille"])
+
+    assert geocoded == ["Paris", "Lyon", "Marseille"]
+    assert first["stops"] == {"Paris": "S9963", "Lyon": "S7282"}
+    assert second["stops"] == {"Marseille": "S2732"}
+    assert tool.compact(second)["stops"] == {"Marseille": "S2732"}
+    assert "S7282 to Marseille" in tool.compact(second)
@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+
+import pytest
+
+from backend.agents.metrics import (
+    HttpCallMetrics, LlmCallMetrics, RunMetrics, ToolCallMetrics, instrumented_session, measure_tool_call,
+    record_http_call
+)
+
+
+def test_http_calls_are_attributed_to_the_running_tool():
+    metrics = ToolCallMetrics("osm_api")
+
+    record_http_call("https://router.project-osrm.org/route", "get", 200, 0.5, 10)
+    with measure_tool_call(metrics):
+        record_http_call("https://nominatim.openstreetmap.org/search?q=Paris", "get", 200, 0.25, 100)
+
+    assert [call.host for call in metrics.http] == ["nominatim.openstreetmap.org"]
+    assert metrics.to_dict()["http_s"] == 0.25
+    assert metrics.seconds >= 0
+
+
+def test_attribution_follows_the_context_into_worker_threads():
+    metrics = ToolCallMetrics("hotel_searcher")
+
+    with measure_tool_call(metrics), ThreadPoolExecutor(max_workers=1) as pool:
+        context = contextvars.copy_context()
+        pool.submit(context.run, record_http_call, "https://example.org/", "get", 200, 0.1, 1).result()
+
+    assert len(metrics.http) == 1
+
+
+def test_summary_aggregates_llm_tools_and_hosts():
+    run = RunMetrics()
+    run.add_llm_call(LlmCallMetrics(step=1, seconds=1.0, prompt_tokens=100, completion_tokens=20))
+    run.add_llm_call(LlmCallMetrics(step=2, seconds=2.0, prompt_tokens=150))
+    for _ in range(2):
+        run.add_tool_call(ToolCallMetrics(
+            "osm_api", seconds=0.5, http=[HttpCallMetrics("router.project-osrm.org", "GET", 200, 0.25, 50)]
+        ))
+
+    summary = run.summary()
+
+    assert summary["llm"] == {"calls": 2, "total_s": 3.0, "prompt_tokens": 250, "completion_tokens": 20}
+    assert summary["tools"] == {"osm_api": {"calls": 2, "total_s": 1.0}}
+    assert summary["http"]["router.project-osrm.org"] == {"calls": 2, "total_s": 0.5, "bytes": 100}
+
+
+def test_http_client_responses_and_failures_are_recorded_through_its_hooks():
+    httpx = pytest.importorskip("httpx")
+    from backend.utils.http_client import HttpClient
+    from backend.utils.rate_limit import RateLimiter
+
+    def handler(request):
+        if request.url.host == "down.example":
+            raise httpx.ConnectError("down", request=request)
+        return httpx.Response(200, content=b"0123456789")
+
+    client = HttpClient(retries=0, rate_limiter=RateLimiter({}), transport=httpx.MockTransport(handler))
+    metrics = ToolCallMetrics("osm_api")
+
+    with measure_tool_call(metrics):
+        client.get("https://osrm.example/route")
+        with pytest.raises(httpx.ConnectError):
+            client.post("https://down.example/search")
+
+    assert [(call.host, call.method, call.status, call.bytes) for call in metrics.http] == [
+        ("osrm.example", "GET", 200, 10), ("down.example", "POST", None, 0)
+    ]
+
+
+def test_requests_are_only_measured_through_an_instrumented_session():
+    requests = pytest.importorskip("requests")
+
+    class FakeAdapter(requests.adapters.BaseAdapter):
+        def send(self, request, **kwargs):
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b"{}"
+            response.url = request.url
+            response.request = request
+            return response
+
+        def close(self):
+            pass
+
+    metrics = ToolCallMetrics("maps")
+    with measure_tool_call(metrics):
+        for session in (instrumented_session(), requests.Session()):
+            session.mount("https://", FakeAdapter())
+            session.get("https://maps.example/distancematrix/json")
+
+    assert [(call.host, call.status, call.bytes) for call in metrics.http] == [("maps.example", 200, 2)]
@@ -0,0 +1,88 @@
+import pytest
+
+pytest.importorskip("httpx")
+
+from backend.utils.gazetteer import Gazetteer
+from backend.utils.places_cache import PlacesCache, PlacesSearch, geohash, neighbour_cells
+
+HOTELS = ["hotel", "lodging"]
+FIELDS = "places.displayName,places.id"
+
+
+class FakePlacesSearch(PlacesSearch):
+    def __init__(self, cache):
+        super().__init__(cache=cache, api_key="test")
+        self.calls = []
+
+    def _post(self, method, payload, field_mask):
+        self.calls.append(method)
+        if method == "searchText":
+            return {"places": [{"location": {"latitude": 45.76, "longitude": 4.83}}]}
+        center = payload["locationRestriction"]["circle"]["center"]
+        return {"places": [{"id": f"{center['latitude']:.3f}", "displayName": {"text": "Hotel"}}]}
+
+
+def test_geohash_matches_reference_values():
+    assert geohash(48.8566, 2.3522, 5) == "u09tv"
+    assert geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert len(set(neighbour_cells(48.8566, 2.3522))) == 9
+
+
+def test_nearby_searches_reuse_overlapping_cells():
+    search = FakePlacesSearch(PlacesCache(":memory:"))
+
+    first = search.nearby(45.7640, 4.8357, HOTELS, FIELDS, 5)
+    # ~2 km plus loin, dans une cellule voisine
+    nearby = search.nearby(45.7800, 4.8500, HOTELS, FIELDS, 5)
+    far = search.nearby(45.1885, 5.7245, HOTELS, FIELDS, 5)
+    search.nearby(45.7640, 4.8357, ["museum"], FIELDS, 5)
+
+    assert nearby == first
+    assert far != first
+    # Lyon, Grenoble, puis Lyon avec d'autres types
+    assert search.calls == ["searchNearby"] * 3
+
+
+def test_known_locations_skip_search_text(tmp_path):
+    cache = PlacesCache(str(tmp_path / "places.sqlite"))
+    search = FakePlacesSearch(cache)
+
+    assert search.locate("Lyon, France") == (45.76, 4.83)
+    assert FakePlacesSearch(PlacesCache(str(tmp_path / "places.sqlite"))).locate(" lyon,  france") == (45.76, 4.83)
+    assert search.calls == ["searchText"]
+
+
+def test_region_qualified_names_do_not_reuse_another_city(tmp_path, monkeypatch):
+    rows = [
+        ("2988507", "Paris", "Paris", "", "48.85341", "2.3488", "P", "PPLC", "FR", "", "11", "", "", "", "2138551"),
+        ("4717560", "Paris", "Paris", "", "33.66094", "-95.55551", "P", "PPLS", "US", "", "TX", "", "", "", "24171"),
+    ]
+    dump = tmp_path / "cities.txt"
+    dump.write_text("\n".join("\t".join(row) for row in rows) + "\n", encoding="utf-8")
+    regions = tmp_path / "admin1CodesASCII.txt"
+    regions.write_text("FR.11\tÎle-de-France\tIle-de-France\t3012874\nUS.TX\tTexas\tTexas\t4736286\n", encoding="utf-8")
+    Gazetteer.build(str(dump), str(tmp_path / "cities.gaz"), regions_path=str(regions))
+    monkeypatch.setattr("backend.utils.places_cache.get_gazetteer", lambda: Gazetteer(str(tmp_path / "cities.gaz")))
+    search = FakePlacesSearch(PlacesCache(":memory:"))
+
+    paris = search.locate("Paris")
+    texas = search.locate("Paris, Texas")
+    search.nearby(*paris, HOTELS, FIELDS, 5)
+    hotels = search.nearby(*texas, HOTELS, FIELDS, 5)
+
+    assert texas == (33.66094, -95.55551)
+    assert geohash(*texas) != geohash(*paris)
+    assert hotels[0]["id"] == "33.661"
+    assert search.calls == ["searchNearby", "searchNearby"]
+    # Région inconnue : searchText plutôt qu'une autre ville du même nom
+    assert search.locate("Paris, Narnia") == (45.76, 4.83)
+    assert search.calls[-1] == "searchText"
+
+
+def test_expired_results_are_searched_again():
+    search = FakePlacesSearch(PlacesCache(":memory:", ttl=-1))
+
+    search.nearby(45.7640, 4.8357, HOTELS, FIELDS, 5)
+    search.nearby(45.7640, 4.8357, HOTELS, FIELDS, 5)
+
+    assert search.calls == ["searchNearby", "searchNearby"]
@@ -0,0 +1,58 @@
+import io
+import time
+
+from backend.utils.poi_index import LodgingIndex, LodgingPOI
+
+REGION = b"""<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="45.7600" lon="4.8350">
+    <tag k="tourism" v="hotel"/><tag k="name" v="Hotel Bellecour"/><tag k="stars" v="4"/>
+    <tag k="addr:street" v="Place Bellecour"/><tag k="addr:city" v="Lyon"/>
+  </node>
+  <node id="2" lat="45.7700" lon="4.8500"><tag k="tourism" v="guest_house"/><tag k="name" v="Chez Marie"/></node>
+  <node id="3" lat="45.7650" lon="4.8400"><tag k="amenity" v="cafe"/><tag k="name" v="Cafe"/></node>
+  <node id="4" lat="45.7500" lon="4.8200"/>
+  <node id="5" lat="45.7510" lon="4.8210"/>
+  <node id="6" lat="45.7500" lon="4.8220"/>
+  <way id="7"><nd ref="4"/><nd ref="5"/><nd ref="6"/><tag k="tourism" v="motel"/><tag k="name" v="Motel Sud"/></way>
+  <node id="8" lat="43.2965" lon="5.3698"><tag k="tourism" v="hotel"/><tag k="name" v="Hotel Vieux Port"/></node>
+</osm>
+"""
+
+
+def test_lodgings_are_extracted_from_nodes_and_ways():
+    index = LodgingIndex.from_osm_xml(io.BytesIO(REGION))
+
+    by_name = {poi.name: poi for poi in index.pois}
+    assert sorted(by_name) == ["Chez Marie", "Hotel Bellecour", "Hotel Vieux Port", "Motel Sud"]
+    assert by_name["Hotel Bellecour"].stars == 4
+    assert by_name["Hotel Bellecour"].address == "Place Bellecour, Lyon"
+    assert by_name["Motel Sud"].osm_type == "way"
+    assert abs(by_name["Motel Sud"].latitude - 45.7503) < 1e-3
+
+
+def test_radius_and_nearest_queries():
+    index = LodgingIndex.from_osm_xml(io.BytesIO(REGION))
+
+    around_lyon = [poi.name for poi, _ in index.within_radius(45.76, 4.835, 30000)]
+    nearest = index.nearest(45.7501, 4.8211, k=2)
+
+    assert sorted(around_lyon) == ["Chez Marie", "Hotel Bellecour", "Motel Sud"]
+    assert [poi.name for poi, _ in nearest] == ["Motel Sud", "Hotel Bellecour"]
+    assert index.nearest(43.3, 5.37, k=1)[0][0].name == "Hotel Vieux Port"
+
+
+def test_queries_stay_fast_on_a_large_index(tmp_path):
+    pois = [
+        LodgingPOI("node", i, f"Hotel {i}", "hotel", 43 + (i % 500) * 0.01, 1 + (i // 500) * 0.01)
+        for i in range(50000)
+    ]
+    index = LodgingIndex(pois)
+    path = str(tmp_path / "lodging.json")
+    index.save(path)
+    index = LodgingIndex.load(path)
+
+    start = time.perf_counter()
+    results = index.within_radius(45.0, 1.5, 5000, limit=6)
+    assert time.perf_counter() - start < 0.05
+    assert len(results) == 6
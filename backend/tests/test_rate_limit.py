@@ -0,0 +1,44 @@
+import threading
+import time
+
+from backend.utils.rate_limit import RateLimiter, SqliteTokenBucket, TokenBucket
+
+
+def test_burst_within_capacity_does_not_wait():
+    bucket = TokenBucket(rate=10, capacity=3)
+
+    waits = [bucket.acquire() for _ in range(3)]
+
+    assert waits == [0.0, 0.0, 0.0]
+    assert bucket.acquire() > 0
+
+
+def test_concurrent_callers_are_spaced_by_the_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+    start = time.perf_counter()
+
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 1 jeton immédiat, puis 4 espacés de 50 ms
+    assert time.perf_counter() - start >= 0.19
+
+
+def test_unconfigured_hosts_are_not_limited():
+    limiter = RateLimiter(limits={"nominatim.openstreetmap.org": (10, 1)})
+
+    assert limiter.acquire("https://router.project-osrm.org/route/v1/car/1,2;3,4") == 0.0
+    assert limiter.acquire("https://nominatim.openstreetmap.org/search") == 0.0
+    assert limiter.acquire("nominatim.openstreetmap.org") > 0
+
+
+def test_sqlite_buckets_share_their_budget(tmp_path):
+    path = str(tmp_path / "limits.sqlite")
+    first = SqliteTokenBucket(path, "nominatim.openstreetmap.org", rate=1, capacity=1)
+    second = SqliteTokenBucket(path, "nominatim.openstreetmap.org", rate=1, capacity=1)
+
+    assert first._reserve(1) == 0.0
+    assert second._reserve(1) > 0.9
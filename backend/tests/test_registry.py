@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from backend.tools.base_tool import BaseTool, ToolParameter, ParameterType
+from backend.tools.registry import ToolRegistry, ToolArgumentError
+
+
+class RouteTool(BaseTool):
+    def __init__(self):
+        super().__init__(name="route", description="Calcule un trajet")
+
+    def _define_parameters(self):
+        return [
+            ToolParameter(
+                name="list_of_locations",
+                param_type=ParameterType.LIST,
+                description="Étapes",
+            ),
+            ToolParameter(
+                name="mode",
+                param_type=ParameterType.STRING,
+                description="Mode de transport",
+                required=False,
+                default="driving",
+                constraints={"choices": ["driving", "walking"]}
+            ),
+            ToolParameter(
+                name="days",
+                param_type=ParameterType.INTEGER,
+                description="Nombre de jours",
+                required=False,
+                constraints={"min": 1, "max": 30}
+            ),
+        ]
+
+    def execute(self, **kwargs):
+        return kwargs
+
+
+@pytest.fixture
+def registry():
+    return ToolRegistry([RouteTool()])
+
+
+def test_schema_serialization_is_stable(registry):
+    other = ToolRegistry([RouteTool()])
+
+    assert registry.schemas_json == other.schemas_json
+    assert json.loads(registry.schemas_json) == registry.schemas
+    assert registry.schemas[0]["function"]["parameters"]["required"] == ["list_of_locations"]
+
+
+def test_arguments_are_coerced_and_defaulted(registry):
+    arguments = registry.validate("route", '{"list_of_locations": "[\\"Paris\\", \\"Lyon\\"]", "days": "3"}')
+
+    assert arguments == {"list_of_locations": ["Paris", "Lyon"], "days": 3, "mode": "driving"}
+
+
+def test_invalid_arguments_are_reported_together(registry):
+    with pytest.raises(ToolArgumentError) as excinfo:
+        registry.validate("route", {"mode": "flying", "days": 0})
+
+    assert excinfo.value.to_dict()["invalid_arguments"] == [
+        {"parameter": "list_of_locations", "message": "missing required parameter"},
+        {"parameter": "mode", "message": "must be one of ['driving', 'walking']"},
+        {"parameter": "days", "message": "must be >= 1"},
+    ]
+
+
+def test_unknown_tool_and_malformed_json_are_rejected(registry):
+    with pytest.raises(ToolArgumentError):
+        registry.validate("teleport", {})
+    with pytest.raises(ToolArgumentError):
+        registry.validate("route", '{"list_of_locations": [')
+
+
+def test_booleans_are_not_integers(registry):
+    with pytest.raises(ToolArgumentError):
+        registry.validate("route", {"list_of_locations": ["Paris"], "days": True})
+
+
+def test_undeclared_arguments_only_reach_tools_accepting_kwargs(registry):
+    from backend.tools.final_return import ReturnTool
+
+    arguments = registry.validate("route", {"list_of_locations": ["Paris"], "note": "scenic"})
+    strict = ToolRegistry([ReturnTool()])
+    result = strict.validate("return", {"result": "{}", "summary": "done"})
+
+    assert arguments["note"] == "scenic"
+    assert result == {"result": "{}"}
+    assert "error" not in strict["return"].execute(**result)
@@ -0,0 +1,81 @@
+import heapq
+import os
+
+import pytest
+
+from backend.utils.road_graph import RoadGraph
+
+REGION = os.path.join(os.path.dirname(__file__), "data", "small_region.osm")
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return RoadGraph.from_osm_xml(REGION, profile="car")
+
+
+def dijkstra(graph, source, target):
+    distances = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        distance, u = heapq.heappop(heap)
+        if u == target:
+            return distance
+        if distance > distances[u]:
+            continue
+        for e in range(graph.offsets[u], graph.offsets[u + 1]):
+            v = graph.targets[e]
+            candidate = distance + graph.times[e]
+            if candidate < distances.get(v, float("inf")):
+                distances[v] = candidate
+                heapq.heappush(heap, (candidate, v))
+    return None
+
+
+def test_graph_keeps_only_drivable_roads(graph):
+    # 25 nœuds de la grille + 2 nœuds isolés ; le chemin piéton est ignoré
+    assert graph.node_count == 27
+    # 10 rues de 4 tronçons (une à sens unique) + 1 tronçon isolé, en arcs orientés
+    assert graph.edge_count == (9 * 4 + 1) * 2 + 4
+
+
+def test_bidirectional_astar_matches_dijkstra(graph):
+    for source in range(0, graph.node_count, 3):
+        for target in range(graph.node_count):
+            expected = dijkstra(graph, source, target)
+            path = graph.shortest_path(source, target)
+            if expected is None:
+                assert path is None
+            else:
+                assert path[0] == pytest.approx(expected, rel=1e-6)
+                assert path[2][0] == source and path[2][-1] == target
+
+
+def test_oneway_streets_are_respected(graph):
+    west = graph.nearest_node(45.770, 4.830)
+    east = graph.nearest_node(45.770, 4.850)
+
+    forward = graph.shortest_path(west, east)
+    backward = graph.shortest_path(east, west)
+
+    # Le retour fait le détour par la rue parallèle (2 x ~555 m)
+    assert backward[1] == pytest.approx(forward[1] + 2 * 556, rel=0.01)
+
+
+def test_route_between_points(graph):
+    route = graph.route((45.7501, 4.8301), (45.7699, 4.8499))
+
+    # Trajet en L sur la grille : 4 x 556 m + 4 x 389 m
+    assert route["distance"] == pytest.approx(3780, rel=0.01)
+    assert route["duration"] > 0
+    assert graph.route((45.75, 4.83), (45.90, 5.00)) is None
+
+
+def test_save_and_load_roundtrip(graph, tmp_path):
+    path = str(tmp_path / "region.graph")
+    graph.save(path)
+
+    loaded = RoadGraph.load(path)
+
+    assert loaded.profile == "car"
+    assert list(loaded.targets) == list(graph.targets)
+    assert loaded.shortest_path(0, 20)[0] == pytest.approx(graph.shortest_path(0, 20)[0])
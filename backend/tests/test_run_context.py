@@ -0,0 +1,112 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+import time
+
+from backend.agents.run_context import RunContext, current_call_id, resolve_stop, stop_id, stop_refs, use_run_context
+
+
+def test_records_get_short_refs():
+    context = RunContext()
+
+    ref = context.add_record("H", {"name": "Hotel Europe"})
+
+    assert ref == "H1"
+    assert context.get_record(" h1 ") == {"name": "Hotel Europe"}
+
+
+def test_deferred_values_are_reported_once_with_their_call_id():
+    context = RunContext()
+    future = Future()
+
+    with use_run_context(context, "call_3"):
+        assert current_call_id() == "call_3"
+        context.defer(["hotels", 0, "image_link"], future)
+
+    assert context.pop_completed() == []
+    future.set_result("https://img/1")
+    context.wait_deferred(timeout=1)
+
+    assert context.pop_completed() == [{"call_id": "call_3", "path": ["hotels", 0, "image_link"], "value": "https://img/1"}]
+    assert context.pop_completed() == []
+    assert current_call_id() is None
+
+
+def test_stops_are_resolved_once_per_run_and_found_by_id():
+    context = RunContext()
+    calls = []
+
+    def resolve(location):
+        calls.append(location)
+        return (45.76, 4.83) if location.startswith("Lyon") else None
+
+    stop = context.resolve_stop("Lyon, France", resolve)
+
+    assert (stop.id, stop.latitude) == ("S5595", 45.76)
+    assert context.resolve_stop("lyon,  france", resolve) is stop
+    assert context.resolve_stop("s5595", resolve) is stop
+    assert context.resolve_stop("S7", resolve) is None
+    assert context.resolve_stop("Atlantis", resolve) is None
+    assert calls == ["Lyon, France", "Atlantis"]
+
+
+def test_concurrent_tools_share_one_resolution():
+    context = RunContext()
+    calls = []
+
+    def resolve(location):
+        calls.append(location)
+        time.sleep(0.1)
+        return (43.3, 5.37)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        stops = list(pool.map(lambda _: context.resolve_stop("Marseille", resolve), range(4)))
+
+    assert len(calls) == 1
+    assert {stop.id for stop in stops} == {stop_id("Marseille")}
+
+
+def test_stop_ids_do_not_depend_on_completion_order():
+    def resolve_in_order(first, second):
+        """Résout deux lieux en parallèle, first terminant avant second"""
+        context = RunContext()
+        first_done = threading.Event()
+
+        def resolve(location):
+            if location == second:
+                first_done.wait(5)
+            return (45.0, 5.0)
+
+        def run(location):
+            stop = context.resolve_stop(location, resolve)
+            if location == first:
+                first_done.set()
+            return stop
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            stops = list(pool.map(run, ["Paris", "Lyon"]))
+        return {stop.name: stop.id for stop in stops}
+
+    assert resolve_in_order("Paris", "Lyon") == resolve_in_order("Lyon", "Paris") == {"Paris": "S9963", "Lyon": "S7282"}
+
+
+def test_stop_refs_report_known_stops_of_the_current_run():
+    context = RunContext()
+
+    assert resolve_stop("Nice", lambda location: (43.7, 7.26)).id is None
+    with use_run_context(context):
+        resolve_stop("Nice", lambda location: (43.7, 7.26))
+        assert stop_refs(["Nice", "S7219", "Paris"]) == {"Nice": "S7219"}
+    assert stop_refs(["Nice"]) == {}
+
+
+def test_colliding_stops_keep_the_first_id_within_a_run():
+    # "Stop 43" et "Stop 185" ont le même identifiant à 4 chiffres
+    assert stop_id("Stop 43") == stop_id("Stop 185") == "S2137"
+
+    def ids(order):
+        context = RunContext()
+        return {name: context.resolve_stop(name, lambda location: (45.0, 5.0)).id for name in order}
+
+    assert ids(["Stop 43", "Stop 185"]) == {"Stop 43": "S2137", "Stop 185": "S82137"}
+    # Les identifiants ne valent que pour le trip : l'ordre des résolutions décide du plus court
+    assert ids(["Stop 185", "Stop 43"]) == {"Stop 185": "S2137", "Stop 43": "S52137"}
@@ -0,0 +1,33 @@
+import io
+import json
+
+from backend.agents.sinks import JsonLinesSink, NullSink
+
+
+def test_null_sink_ignores_events():
+    assert NullSink().emit("tool_result", tool_name="hotel_searcher", result={"hotels": []}) is None
+
+
+def test_json_lines_sink_writes_one_object_per_event():
+    stream = io.StringIO()
+    sink = JsonLinesSink(stream=stream, max_field_chars=20)
+
+    sink.emit("step", step=1, max_steps=40)
+    sink.emit("tool_result", tool_name="hotel_searcher", result={"hotels": ["x" * 50]})
+    sink.emit("error", error=ValueError("boom"))
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert lines[0] == {"event": "step", "step": 1, "max_steps": 40}
+    assert lines[1]["result"].endswith("...")
+    assert lines[2]["error"] == {"type": "ValueError", "message": "boom"}
+
+
+def test_json_lines_sink_falls_back_to_repr_for_unserializable_values():
+    stream = io.StringIO()
+    sink = JsonLinesSink(stream=stream)
+
+    sink.emit("tool_result", tool_name="flight_searcher", result={"departure": {1, 2}})
+
+    line = json.loads(stream.getvalue())
+    assert line["tool_name"] == "flight_searcher"
+    assert line["result"] == "{'departure': {1, 2}}"
@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+from backend.agents.streaming import StreamedMessage
+
+
+def make_chunk(content=None, tool_calls=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def make_tool_delta(index, id=None, name=None, arguments=None):
+    return SimpleNamespace(
+        index=index,
+        id=id,
+        function=SimpleNamespace(name=name, arguments=arguments)
+    )
+
+
+def test_content_deltas_are_assembled():
+    message = StreamedMessage()
+
+    events = message.add_chunk(make_chunk(content="Search "))
+    events += message.add_chunk(make_chunk(content="hotels"))
+
+    assert message.content == "Search hotels"
+    assert message.tool_calls is None
+    assert [event["type"] for event in events] == ["message_delta", "message_delta"]
+    assert events[1]["data"]["content"] == "hotels"
+
+
+def test_tool_call_deltas_are_assembled_in_index_order():
+    message = StreamedMessage()
+    chunks = [
+        make_chunk(tool_calls=[make_tool_delta(0, id="call_0", name="hotel_searcher", arguments="")]),
+        make_chunk(tool_calls=[make_tool_delta(1, id="call_1", name="osm_api", arguments='{"list_of')]),
+        make_chunk(tool_calls=[make_tool_delta(0, arguments='{"location": "Lyon"}')]),
+        make_chunk(tool_calls=[make_tool_delta(1, arguments='_locations": ["Paris", "Lyon"]}')]),
+    ]
+
+    events = []
+    for chunk in chunks:
+        events += message.add_chunk(chunk)
+
+    assert message.content is None
+    assert [call.function.name for call in message.tool_calls] == ["hotel_searcher", "osm_api"]
+    assert message.tool_calls[0].function.arguments == '{"location": "Lyon"}'
+    assert message.tool_calls[1].id == "call_1"
+    assert events[2] == {
+        'type': 'tool_call_delta',
+        'data': {
+            'index': 0,
+            'tool_name': 'hotel_searcher',
+            'arguments_delta': '{"location": "Lyon"}'
+        }
+    }
+
+
+def test_usage_only_chunks_are_ignored():
+    message = StreamedMessage()
+
+    assert message.add_chunk(SimpleNamespace(choices=[], usage=None)) == []
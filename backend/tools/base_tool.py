@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+import asyncio
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 from enum import Enum
@@ -137,3 +138,19 @@ class BaseTool(ABC):
     def execute(self, **kwargs) -> Dict[str, Any]:
         """Exécute l'outil avec les paramètres validés"""
         pass
+
+    def compact(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Projection compacte du résultat envoyée au modèle.
+
+        Le résultat complet de execute reste celui envoyé au client ; par défaut
+        le modèle reçoit le même.
+        """
+        return result
+
+    async def aexecute(self, **kwargs) -> Dict[str, Any]:
+        """Version asynchrone de execute.
+
+        Par défaut l'exécution synchrone est déportée dans un thread ; les outils
+        nativement asynchrones peuvent surcharger cette méthode.
+        """
+        return await asyncio.to_thread(self.execute, **kwargs)
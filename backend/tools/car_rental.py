@@ -1,6 +1,6 @@
 from backend.tools.base_tool import BaseTool, ToolParameter, ParameterType
+from backend.utils.http_client import get_http_client
 from typing import List, Dict, Any
-import requests
 import json
 import os
 from datetime import datetime
@@ -57,7 +57,7 @@ class CarHireSearchTool(BaseTool):
             }
         }
 
-        response = requests.post(url, headers=headers, json=payload)
+        response = get_http_client().post(url, headers=headers, json=payload)
         response.raise_for_status()
         return response.json()
 
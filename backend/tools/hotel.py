@@ -1,28 +1,31 @@
+from backend.agents.run_context import resolve_stop, stop_refs
 from backend.tools.base_tool import BaseTool
 from backend.tools.base_tool import ToolParameter
 from backend.tools.base_tool import ParameterType
+from backend.utils.places_cache import PlacesError, PlacesSearch, get_places_search
 from typing import List, Dict, Any
-import requests
-import json
-import os
 from dotenv import load_dotenv
+import logging
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class HotelTool(BaseTool):
-    def __init__(self):
+    def __init__(self, places: PlacesSearch = None):
         super().__init__(
             name="hotel_searcher",
             description="Recherche d'hôtels sur Booking.com et renvoie les n premiers résultats",
         )
+        self.places = places or get_places_search()
 
     def _define_parameters(self) -> List[ToolParameter]:
         return [
             ToolParameter(
                 name="location",
                 param_type=ParameterType.STRING,
-                description="Loalisation de l'hôtel",
+                description="Loalisation de l'hôtel (ou identifiant d'étape, ex: \"S5595\")",
                 required=True
             ),
             ToolParameter(
@@ -30,6 +33,18 @@ class HotelTool(BaseTool):
                 param_type=ParameterType.INTEGER,
                 description="Nombre de résultats à renvoyer",
                 required=False,
+            ),
+            ToolParameter(
+                name="latitude",
+                param_type=ParameterType.FLOAT,
+                description="Latitude of the location, if already known (skips geocoding)",
+                required=False
+            ),
+            ToolParameter(
+                name="longitude",
+                param_type=ParameterType.FLOAT,
+                description="Longitude of the location, if already known (skips geocoding)",
+                required=False
             )
         ]
 
@@ -39,67 +54,44 @@ class HotelTool(BaseTool):
             location = kwargs["location"]
             nb_results = int(kwargs.get("nb_results", 5))
             
-             # Get location coordinates
-            url = "https://places.googleapis.com/v1/places:searchText"
-            payload = {
-                "textQuery": location,
-                "maxResultCount": nb_results
-            }
-            headers = {
-                "Content-Type": "application/json",
-                "X-Goog-Api-Key": os.getenv('GOOGLE_API_KEY'),
-                "X-Goog-FieldMask": "places.displayName,places.formattedAddress,places.location"
-            }
-            response = requests.post(url, headers=headers, data=json.dumps(payload))
-            response.raise_for_status()
-            location_data = response.json()
-            #print(f"Location search response: {json.dumps(location_data, indent=2)}")
-
-            if not location_data.get('places'):
-                return {"error": "No places found for this location"}
-            
-            latitude = location_data['places'][0]['location']['latitude']
-            longitude = location_data['places'][0]['location']['longitude']
-            #print(f"Using coordinates: lat={latitude}, long={longitude}")
+            # Coordonnées fournies, ou étape du trip (géocodée une seule fois par trip :
+            # gazetteer local, cache, puis searchText)
+            if kwargs.get("latitude") is not None and kwargs.get("longitude") is not None:
+                latitude, longitude = float(kwargs["latitude"]), float(kwargs["longitude"])
+            else:
+                stop = resolve_stop(location, self.places.locate)
+                if stop is None:
+                    return {"error": "No places found for this location"}
+                latitude, longitude = stop.latitude, stop.longitude
 
             # Search hotels
-            url = "https://places.googleapis.com/v1/places:searchNearby"
-            payload = {
-                "includedTypes": ['hotel', 'lodging', 'bed_and_breakfast', 'motel', 'farmstay', "guest_house"],
-                "maxResultCount": nb_results,
-                "locationRestriction": {
-                    "circle": {
-                        "center": {"latitude": latitude, "longitude": longitude},
-                        "radius": 30000.0
-                    }
-                }
-            }
-            headers = {
-                "Content-Type": "application/json",
-                "X-Goog-Api-Key": os.getenv('GOOGLE_API_KEY'),
-                "X-Goog-FieldMask": "places.displayName,places.formattedAddress,places.id"
-            }
-            response = requests.post(url, headers=headers, data=json.dumps(payload))
-            if response.status_code != 200:
-                return {"error": f"Hotel search failed: {response.text}"}
-                
-            hotels_data = response.json()
-            #print(f"Hotels search response: {json.dumps(hotels_data, indent=2)}")
+            try:
+                places = self.places.nearby(
+                    latitude,
+                    longitude,
+                    types=['hotel', 'lodging', 'bed_and_breakfast', 'motel', 'farmstay', "guest_house"],
+                    field_mask="places.displayName,places.formattedAddress,places.id",
+                    max_results=nb_results
+                )
+            except PlacesError as e:
+                return {"error": f"Hotel search failed: {str(e)}"}
 
             # Format hotels inline: output name, address, and Google Maps link
             formatted_hotels = []
-            if hotels_data.get('places'):
-                for place in hotels_data['places']:
-                    maps_link = f"https://www.google.com/maps/place/?q=place_id:{place['id']}"
-                    formatted_hotels.append({
-                        "name": place['displayName']['text'],
-                        "address": place['formattedAddress'],
-                        "maps_link": maps_link
-                    })
+            for place in places:
+                maps_link = f"https://www.google.com/maps/place/?q=place_id:{place['id']}"
+                formatted_hotels.append({
+                    "name": place['displayName']['text'],
+                    "address": place['formattedAddress'],
+                    "maps_link": maps_link
+                })
             output= {
                 "hotels": formatted_hotels
             }
-            print(f"Réaponse du tool: {output}")
+            refs = stop_refs([location])
+            if refs:
+                output["stops"] = refs
+            logger.debug("Tool response: %s", output)
             return output
 
         except (ValueError, TypeError) as e:
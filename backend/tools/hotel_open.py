@@ -1,67 +1,85 @@
 from backend.tools.base_tool import BaseTool, ToolParameter, ParameterType
-from typing import List, Dict, Any
-import requests
-import time
+from backend.agents.run_context import current_run_context, resolve_stop, stop_refs
+from backend.utils.geocoding import get_geocoder
+from backend.utils.http_client import get_http_client
+from backend.utils.poi_index import LodgingIndex, get_lodging_index
+from backend.utils.image_search import ImageLookup
+from concurrent.futures import Future
+from typing import List, Dict, Any, Optional
+import threading
 from math import cos, radians
 from dotenv import load_dotenv
 import os
+import logging
 from google_images_search import GoogleImagesSearch
 # Chargement des variables d'environnement
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class HotelToolOpen(BaseTool):
-    def __init__(self):
+    def __init__(self, lodging_index: Optional[LodgingIndex] = None, defer_images: bool = False):
         super().__init__(
             name="hotel_searcher",
             description="Search for hotels on OpenStreetMap and return the first n results",
         )
         self.nominatim_endpoint = "https://nominatim.openstreetmap.org"
+        # Index local des hébergements (LODGING_INDEX_PATH) ; sinon recherche Nominatim
+        self.lodging_index = lodging_index if lodging_index is not None else get_lodging_index()
+        self.search_radius_m = 30000
+        # Recherches d'images en parallèle, en cache par nom d'hôtel
+        self.images = ImageLookup(lambda query: self.get_image_url(query))
+        # En mode différé, le résultat est renvoyé sans attendre les images, qui arrivent
+        # ensuite en événements tool_result_patch
+        self.defer_images = defer_images
+        self._image_clients = threading.local()
 
     def _define_parameters(self) -> List[ToolParameter]:
         return [
             ToolParameter(
                 name="location",
                 param_type=ParameterType.STRING,
-                description="Localisation de l'hôtel, met le nom de la ville et le pays",
+                description="Localisation de l'hôtel, met le nom de la ville et le pays (ou l'identifiant d'étape, ex: \"S5595\")",
                 required=True
             )
         ]
 
     def _get_coordinates(self, location: str) -> tuple:
-        """Obtenir les coordonnées d'une localisation via Nominatim."""
-        headers = {
-            'User-Agent': 'HotelSearchTool/1.0'
-        }
-        params = {
-            'q': location,
-            'format': 'json',
-            'limit': 1
-        }
-        
-        response = requests.get(
-            f"{self.nominatim_endpoint}/search",
-            headers=headers,
-            params=params
-        )
-        response.raise_for_status()
-        
-        data = response.json()
-        if not data:
+        """Coordonnées (lat, lon) d'une localisation ou d'une étape, géocodée une seule fois par trip."""
+        stop = resolve_stop(location, get_geocoder().geocode)
+        if stop is None:
             raise ValueError(f"Aucun lieu trouvé pour: {location}")
-            
-        return float(data[0]['lat']), float(data[0]['lon'])
+        return stop.latitude, stop.longitude
+
+    def _search_local_hotels(self, latitude: float, longitude: float, nb_results: int) -> List[Dict]:
+        """Hôtels de l'index local dans le rayon de recherche, au format des réponses Nominatim."""
+        return [
+            {
+                'display_name': ", ".join(filter(None, [poi.name, poi.address])),
+                'osm_type': poi.osm_type,
+                'osm_id': poi.osm_id,
+                'lat': poi.latitude,
+                'lon': poi.longitude
+            }
+            for poi, _ in self.lodging_index.within_radius(latitude, longitude, self.search_radius_m, nb_results)
+        ]
 
     def _search_hotels(self, latitude: float, longitude: float, nb_results: int) -> List[Dict]:
         """
-        Rechercher les hôtels autour d'un point via Nominatim en utilisant une viewbox.
-        La viewbox est calculée pour un rayon d'environ 30 km.
+        Rechercher les hôtels autour d'un point : index local si disponible, sinon Nominatim
+        en utilisant une viewbox calculée pour un rayon d'environ 30 km.
         """
+        if self.lodging_index is not None:
+            hotels = self._search_local_hotels(latitude, longitude, nb_results)
+            if hotels:
+                return hotels
+
         headers = {
             'User-Agent': 'HotelSearchTool/1.0'
         }
         # Calcul du décalage en degrés pour 30 km (approximativement)
-        delta_lat = 30000 / 111000  # environ 0.27 degré
-        delta_lon = 30000 / (111000 * cos(radians(latitude)))
+        delta_lat = self.search_radius_m / 111000  # environ 0.27 degré
+        delta_lon = self.search_radius_m / (111000 * cos(radians(latitude)))
         
         min_lat = latitude - delta_lat
         max_lat = latitude + delta_lat
@@ -77,7 +95,7 @@ class HotelToolOpen(BaseTool):
             'bounded': 1,  # Restreint la recherche à la viewbox
         }
         
-        response = requests.get(
+        response = get_http_client().get(
             f"{self.nominatim_endpoint}/search",
             headers=headers,
             params=params
@@ -86,7 +104,10 @@ class HotelToolOpen(BaseTool):
         return response.json()
 
     def get_image_url(self,query: str) -> str:
-        gis = GoogleImagesSearch(os.getenv("GOOGLE_API_KEY"), os.getenv("CUSTOM_SEARCH_ENGINE_ID"))
+        # Un client par thread : GoogleImagesSearch garde les résultats de la dernière recherche
+        gis = getattr(self._image_clients, "gis", None)
+        if gis is None:
+            gis = self._image_clients.gis = GoogleImagesSearch(os.getenv("GOOGLE_API_KEY"), os.getenv("CUSTOM_SEARCH_ENGINE_ID"))
 
         _search_params = {
             'q': query,
@@ -113,7 +134,6 @@ class HotelToolOpen(BaseTool):
             
             # Obtenir les coordonnées de la localisation
             latitude, longitude = self._get_coordinates(location)
-            time.sleep(1)  # Respect de la politique d'utilisation de Nominatim
             
             # Rechercher les hôtels dans la zone délimitée
             hotels_data = self._search_hotels(latitude, longitude, nb_results)
@@ -122,31 +142,83 @@ class HotelToolOpen(BaseTool):
             # Formater les résultats
             formatted_hotels = []
             for hotel in hotels_data:
-                place= place = hotel.get('display_name', '').split(',')[0]
-                url_image = self.get_image_url(place)
                 osm_id = hotel.get('osm_id', '')
                 formatted_hotels.append({
                     "name": hotel.get('display_name', '').split(',')[0],
                     "address": hotel.get('display_name', ''),
-                    "maps_link": f"https://www.openstreetmap.org/way/{osm_id}",
-                    "image_link": url_image
+                    "maps_link": f"https://www.openstreetmap.org/{hotel.get('osm_type', 'way')}/{osm_id}",
+                    "image_link": ""
                 })
+            self._add_images(formatted_hotels)
 
             output = {
                 "hotels": formatted_hotels
             }
-            print(f"Tool response: {output}")
+            refs = stop_refs([location])
+            if refs:
+                output["stops"] = refs
+            logger.debug("Tool response: %s", output)
             return output
 
         except ValueError as e:
-            import traceback
-            traceback.print_exc()
+            logger.debug("Hotel search failed", exc_info=True)
             return {"error": f"Error: {str(e)}"}
         except Exception as e:
-            import traceback
-            traceback.print_exc()
+            logger.warning("Hotel search failed", exc_info=True)
             return {"error": str(e)}
 
+    def _add_images(self, hotels: List[Dict[str, Any]]):
+        """Lance les recherches d'images en parallèle ; en mode différé, n'attend que celles déjà en cache."""
+        futures = [self.images.submit(hotel["name"]) for hotel in hotels]
+        context = current_run_context()
+        for index, (hotel, future) in enumerate(zip(hotels, futures)):
+            if not self.defer_images or context is None or future.done():
+                hotel["image_link"] = future.result()
+                continue
+
+            # L'hôtel (aussi conservé dans le contexte via sa référence) est complété avant
+            # que la valeur ne soit signalée à l'agent
+            patched = Future()
+
+            def fill(done, hotel=hotel, patched=patched):
+                # Recherche annulée ou en échec : l'hôtel garde son lien vide, la valeur est tout de même signalée
+                try:
+                    hotel["image_link"] = done.result()
+                except BaseException:
+                    logger.warning("Image search failed for %r", hotel["name"], exc_info=True)
+                patched.set_result(hotel["image_link"])
+
+            future.add_done_callback(fill)
+            context.defer(["hotels", index, "image_link"], patched)
+
+    def _short_address(self, address: str) -> str:
+        """Garde la rue et la ville d'une adresse Nominatim (sans le nom de l'hôtel)."""
+        parts = [part.strip() for part in address.split(',')]
+        short = ", ".join(parts[1:4]) if len(parts) > 1 else address
+        return short[:80]
+
+    def compact(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Projection envoyée au modèle : nom, adresse courte et référence courte (ex: "H3").
+        Les liens et images restent dans le résultat complet, retrouvé par le ReturnTool via la référence.
+        """
+        if "hotels" not in result:
+            return result
+
+        context = current_run_context()
+        hotels = []
+        for hotel in result["hotels"]:
+            compact_hotel = {
+                "name": hotel.get("name", "")[:60],
+                "address": self._short_address(hotel.get("address", ""))
+            }
+            if context is not None:
+                compact_hotel = {"ref": context.add_record("H", hotel), **compact_hotel}
+            hotels.append(compact_hotel)
+        if result.get("stops"):
+            return {"hotels": hotels, "stops": result["stops"]}
+        return {"hotels": hotels}
+
 if __name__ == "__main__":
     # Création d'une instance du HotelToolOpen
     hotel_tool = HotelToolOpen()
@@ -1,4 +1,6 @@
 from backend.tools.base_tool import BaseTool, ToolParameter, ParameterType
+from backend.utils.generation_cache import GenerationCache, generate_batch, generation_key, get_generation_cache
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 from openai import OpenAI
 import os
@@ -6,13 +8,19 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Les URLs renvoyées par OpenAI expirent au bout d'une heure
+URL_TTL = 55 * 60
+
 class ImageGeneratorTool(BaseTool):
-    def __init__(self):
+    def __init__(self, cache: GenerationCache = None, max_workers: int = 4):
         super().__init__(
             name="image_generator",
             description="Generates images using DALL-E 3 based on text descriptions"
         )
         self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.model = "dall-e-2"
+        self.cache = cache or get_generation_cache()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-generation")
 
     def _define_parameters(self) -> List[ToolParameter]:
         return [
@@ -20,7 +28,13 @@ class ImageGeneratorTool(BaseTool):
                 name="prompt",
                 param_type=ParameterType.STRING,
                 description="Text description of the image to generate",
-                required=True
+                required=False
+            ),
+            ToolParameter(
+                name="prompts",
+                param_type=ParameterType.LIST,
+                description="Several image descriptions, generated in parallel",
+                required=False
             ),
             ToolParameter(
                 name="size",
@@ -45,9 +59,31 @@ class ImageGeneratorTool(BaseTool):
             )
         ]
 
+    def _request(self, prompt: str, size: str, quality: str, n: int) -> Dict[str, Any]:
+        response = self.client.images.generate(
+            model=self.model,
+            prompt=prompt,
+            size=size,
+            quality=quality,
+            n=n,
+        )
+        return {"urls": [image.url for image in response.data]}
+
+    def _generate(self, prompt: str, size: str, quality: str, n: int) -> Dict[str, Any]:
+        """Images du prompt, depuis le cache ou générées (une seule fois pour des appels simultanés)"""
+        key = generation_key(self.model, prompt, size, quality, n=n)
+        urls = self.cache.get_or_generate(key, lambda: self._request(prompt, size, quality, n), ttl=URL_TTL)["urls"]
+        return {
+            "result": f"Generated {len(urls)} image(s)",
+            "images_url": urls[-1] if n == 1 else urls
+        }
+
     def execute(self, **kwargs) -> Dict[str, Any]:
         try:
-            prompt = kwargs["prompt"]
+            prompt = kwargs.get("prompt")
+            prompts = kwargs.get("prompts") or []
+            if not prompt and not prompts:
+                return {"error": "Either prompt or prompts is required"}
             size = kwargs.get("size", "256x256")
             quality = kwargs.get("quality", "standard")
             n = min(max(1, kwargs.get("n", 1)), 10)  # Ensure n is between 1 and 10
@@ -61,27 +97,16 @@ class ImageGeneratorTool(BaseTool):
             if quality not in ["standard", "hd"]:
                 return {"error": "Invalid quality. Must be 'standard' or 'hd'"}
 
-            response = self.client.images.generate(
-                model="dall-e-2",
-                prompt=prompt,
-                size=size,
-                quality=quality,
-                n=n,
-            )
-
-            # Format the response
-            generated_images = [
-                {
-                    "url": image.url,
-                    "revised_prompt": image.revised_prompt if hasattr(image, 'revised_prompt') else None
+            if prompts:
+                batch = ([prompt] if prompt else []) + prompts
+                images = generate_batch(lambda p: self._generate(p, size, quality, n), batch, self._pool)
+                generated = sum(1 for image in images if "error" not in image)
+                return {
+                    "result": f"Generated images for {generated}/{len(batch)} prompt(s)",
+                    "images": images
                 }
-                for image in response.data
-            ]
 
-            return {
-                "result": f"Generated {len(generated_images)} image(s)",
-                "images_url": generated_images.pop()["url"] if n == 1 else [img["url"] for img in generated_images]
-            }
+            return self._generate(prompt, size, quality, n)
 
         except Exception as e:
             return {"error": f"An error occurred: {str(e)}"}
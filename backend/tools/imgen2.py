@@ -2,26 +2,27 @@ from backend.tools.base_tool import BaseTool, ToolParameter, ParameterType
 from typing import List, Dict, Any
 from google import genai
 from google.genai import types
-from PIL import Image
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 import os
 from dotenv import load_dotenv
-import base64
-import uuid
-from pathlib import Path
+
+from backend.utils.generation_cache import GenerationCache, generate_batch, generation_key, get_generation_cache
+from backend.utils.image_store import ImageStore, get_image_store
 
 load_dotenv()
 
 class ImageGeneratorTool(BaseTool):
-    def __init__(self):
+    def __init__(self, store: ImageStore = None, cache: GenerationCache = None, max_workers: int = 4):
         super().__init__(
             name="image_generator",
             description="Generates images using Google's Imagen model"
         )
         self.client = genai.Client(api_key=os.getenv('GEMINI_API_KEY'))
-        # Create images directory if it doesn't exist
-        self.images_dir = Path(__file__).parent.parent.parent / "images"
-        self.images_dir.mkdir(parents=True, exist_ok=True)
+        # Images adressées par contenu, servies par l'API sous /images/
+        self.store = store or get_image_store()
+        self.model = 'imagen-3.0-generate-002'
+        self.cache = cache or get_generation_cache()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-generation")
 
     def _define_parameters(self) -> List[ToolParameter]:
         return [
@@ -29,38 +30,63 @@ class ImageGeneratorTool(BaseTool):
                 name="prompt",
                 param_type=ParameterType.STRING,
                 description="Text description of the image to generate",
-                required=True
+                required=False
+            ),
+            ToolParameter(
+                name="prompts",
+                param_type=ParameterType.LIST,
+                description="Several image descriptions, generated in parallel",
+                required=False
             ),
         ]
 
-    def execute(self, **kwargs) -> Dict[str, Any]:
-        try:
-            prompt = kwargs["prompt"]
-
-            response = self.client.models.generate_images(
-                model='imagen-3.0-generate-002',
-                prompt=prompt,
-                config=types.GenerateImagesConfig(
-                    number_of_images=1,
-                )
+    def _request(self, prompt: str) -> Dict[str, Any]:
+        response = self.client.models.generate_images(
+            model=self.model,
+            prompt=prompt,
+            config=types.GenerateImagesConfig(
+                number_of_images=1,
             )
+        )
 
-            # Generate unique filename and save image
-            filename = f"{uuid.uuid4()}.png"
-            image_path = self.images_dir / filename
-            
-            # Save the generated image
-            generated_image = response.generated_images[0]
-            image = Image.open(BytesIO(generated_image.image.image_bytes))
-            image.save(image_path)
-
-            # Get relative path from project root
-            relative_path = f"images/{filename}"
-
-            return {
-                "result": "Generated 1 image",
-                "image_path": relative_path
+        # Encodage WebP et miniatures dans le pool de processus du stockage
+        generated_image = response.generated_images[0]
+        return {"digest": self.store.put(generated_image.image.image_bytes)}
+
+    def _generate(self, prompt: str) -> Dict[str, Any]:
+        """Image du prompt, depuis le cache ou générée (une seule fois pour des appels simultanés)"""
+        digest = self.cache.get_or_generate(
+            generation_key(self.model, prompt),
+            lambda: self._request(prompt),
+            # L'image a pu être évincée du stockage depuis
+            is_valid=lambda value: value["digest"] in self.store
+        )["digest"]
+        return {
+            "result": "Generated 1 image",
+            "image_path": f"images/{self.store.filename(digest)}",
+            "thumbnails": {
+                str(size): f"images/{self.store.filename(digest, size)}"
+                for size in self.store.thumbnail_sizes
             }
+        }
+
+    def execute(self, **kwargs) -> Dict[str, Any]:
+        try:
+            prompt = kwargs.get("prompt")
+            prompts = kwargs.get("prompts") or []
+            if not prompt and not prompts:
+                return {"error": "Either prompt or prompts is required"}
+
+            if prompts:
+                batch = ([prompt] if prompt else []) + prompts
+                images = generate_batch(self._generate, batch, self._pool)
+                generated = sum(1 for image in images if "error" not in image)
+                return {
+                    "result": f"Generated {generated}/{len(batch)} image(s)",
+                    "images": images
+                }
+
+            return self._generate(prompt)
 
         except Exception as e:
             return {"error": f"An error occurred: {str(e)}"}
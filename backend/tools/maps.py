@@ -1,17 +1,27 @@
 import googlemaps
 from backend.tools.base_tool import BaseTool, ToolParameter, ParameterType
-from typing import List, Dict, Any
+from backend.agents.metrics import instrumented_session
+from typing import List, Dict, Any, Optional, Tuple
 import os
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Limites de l'API Distance Matrix par requête
+MAX_ORIGINS = 25
+MAX_DESTINATIONS = 25
+MAX_ELEMENTS = 100
+
 class MapsTool(BaseTool):
-    def __init__(self):
+    def __init__(self, client: Optional[googlemaps.Client] = None):
         super().__init__(
             name="maps_api",
             description="Tool that returns distances and travel durations between origins and destinations using the Google Maps API."
         )
+        # Un seul client pour toutes les requêtes (session HTTP keep-alive), créé au premier appel
+        self._client = client
+        self._client_lock = threading.Lock()
 
     def _define_parameters(self) -> List[ToolParameter]:
         return [
@@ -28,59 +38,119 @@ class MapsTool(BaseTool):
                 description="Travel mode (e.g., 'driving', 'walking', 'transit', 'bicycling')",
                 required=False,
                 default="driving"
+            ),
+            ToolParameter(
+                name="full_matrix",
+                param_type=ParameterType.BOOLEAN,
+                description="Also return distances and durations between every pair of locations",
+                required=False,
+                default=False
             )
         ]
 
+    def _get_client(self) -> Optional[googlemaps.Client]:
+        with self._client_lock:
+            if self._client is None:
+                api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+                if api_key:
+                    # Session mesurée : les requêtes sont rattachées à l'appel d'outil en cours
+                    self._client = googlemaps.Client(key=api_key, timeout=30, requests_session=instrumented_session())
+            return self._client
+
+    def _blocks(self, n_origins: int, n_destinations: int) -> List[Tuple[range, range]]:
+        """Découpe origines × destinations en blocs respectant les limites par requête"""
+        destinations_per_block = min(n_destinations, MAX_DESTINATIONS)
+        origins_per_block = max(1, min(MAX_ORIGINS, MAX_ELEMENTS // destinations_per_block))
+        return [
+            (range(i, min(i + origins_per_block, n_origins)), range(j, min(j + destinations_per_block, n_destinations)))
+            for i in range(0, n_origins, origins_per_block)
+            for j in range(0, n_destinations, destinations_per_block)
+        ]
+
+    def _distance_matrix(self, origins: List[str], destinations: List[str], mode: str) -> Dict[Tuple[int, int], Dict[str, Any]]:
+        """
+        Éléments de la matrice origines × destinations, par (i, j), en aussi peu de requêtes que
+        possible. Un bloc en échec ne donne une erreur que pour ses propres paires.
+        """
+        client = self._get_client()
+        elements = {}
+        for origin_range, destination_range in self._blocks(len(origins), len(destinations)):
+            try:
+                result = client.distance_matrix(
+                    origins=[origins[i] for i in origin_range],
+                    destinations=[destinations[j] for j in destination_range],
+                    mode=mode
+                )
+                error = None if result['status'] == 'OK' else f"API request failed: {result['status']}"
+            except Exception as e:
+                result, error = None, f"An error occurred: {str(e)}"
+
+            for row_index, i in enumerate(origin_range):
+                for column_index, j in enumerate(destination_range):
+                    if error:
+                        elements[i, j] = {"status": "ERROR", "error": error}
+                        continue
+                    elements[i, j] = {
+                        **result['rows'][row_index]['elements'][column_index],
+                        "origin": result['origin_addresses'][row_index],
+                        "destination": result['destination_addresses'][column_index]
+                    }
+        return elements
+
     def execute(self, **kwargs) -> Dict[str, Any]:
         locations = kwargs.get("list_of_locations")  # Changed from "list of locations" to "list_of_locations"
         mode = kwargs.get("mode", "driving")
-        api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+        full_matrix = kwargs.get("full_matrix", False)
 
         # Input validation
-        if not locations or not api_key:
+        if not locations or self._get_client() is None:
             return {"error": "Missing required parameters: list_of_locations and api_key are required."}
 
         # Ensure locations is a list with at least two elements
         if not isinstance(locations, list) or len(locations) < 2:
             return {"error": "list_of_locations must be a list with at least two locations"}
 
-        dict_result = {}
-        # Process locations as pairs
-        for i in range(len(locations)-1):
-            origin = locations[i]
-            destination = locations[i+1]
+        # Une seule requête (par bloc) pour toutes les paires : origines et destinations dédoublonnées
+        if full_matrix:
+            origins = destinations = list(dict.fromkeys(locations))
+        else:
+            origins = list(dict.fromkeys(locations[:-1]))
+            destinations = list(dict.fromkeys(locations[1:]))
+        elements = self._distance_matrix(origins, destinations, mode)
 
-            try:
-                # Initialize the Google Maps client
-                gmaps = googlemaps.Client(key=api_key)
-                
-                # Get the distance matrix
-                result = gmaps.distance_matrix(
-                    origins=[origin],
-                    destinations=[destination],
-                    mode=mode
-                )
+        dict_result = {}
+        for origin, destination in zip(locations, locations[1:]):
+            element = elements[origins.index(origin), destinations.index(destination)]
+            if "error" in element:
+                dict_result[f"{origin} to {destination}"] = {"error": element["error"]}
+            elif element['status'] == 'OK':
+                dict_result[f"{origin} to {destination}"] = {
+                    'origin': element['origin'],
+                    'destination': element['destination'],
+                    'distance': element['distance']['text'],
+                    'duration': element['duration']['text'],
+                }
+            else:
+                dict_result[f"{origin} to {destination}"] = {
+                    "error": f"Route calculation failed: {element['status']}"
+                }
 
-                if result['status'] == 'OK':
-                    element = result['rows'][0]['elements'][0]
-                    if element['status'] == 'OK':
-                        formatted_result = {
-                            'origin': result['origin_addresses'][0],
-                            'destination': result['destination_addresses'][0],
-                            'distance': element['distance']['text'],
-                            'duration': element['duration']['text'],
-                        }
-                        dict_result[f"{origin} to {destination}"] = formatted_result
-                    else:
-                        dict_result[f"{origin} to {destination}"] = {
-                            "error": f"Route calculation failed: {element['status']}"
-                        }
-                else:
-                    return {"error": f"API request failed: {result['status']}"}
+        if full_matrix:
+            # Mètres et secondes ; None pour les paires sans itinéraire
+            def values(key):
+                return [
+                    [
+                        elements[i, j][key]['value'] if elements[i, j].get('status') == 'OK' else None
+                        for j in range(len(destinations))
+                    ]
+                    for i in range(len(origins))
+                ]
+            dict_result["matrix"] = {
+                "locations": origins,
+                "distances": values('distance'),
+                "durations": values('duration')
+            }
 
-            except Exception as e:
-                return {"error": f"An error occurred: {str(e)}"}
-        
         return dict_result
 
 # Example usage:
@@ -1,24 +1,39 @@
-import requests
+from backend.agents.run_context import resolve_stop, stop_refs
 from backend.tools.base_tool import BaseTool, ToolParameter, ParameterType
-from typing import List, Dict, Any
-import time
-from math import radians, sin, cos, sqrt, atan2
+from backend.utils.geocoding import get_geocoder
+from backend.utils.http_client import get_http_client
+from backend.utils.road_graph import RoadGraph, get_road_graph
+from backend.utils.estimate import estimate_legs, estimate_matrix
+from typing import List, Dict, Any, Optional
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# OSRM profile for each transport mode
+OSRM_PROFILES = {
+    'driving': 'car',
+    'walking': 'foot',
+    'cycling': 'bike'
+}
 
 class OpenStreetMapTool(BaseTool):
-    def __init__(self):
+    def __init__(self, road_graph: Optional[RoadGraph] = None):
         super().__init__(
             name="osm_api",
             description="Tool that returns distances and travel durations between origins and destinations using OpenStreetMap."
         )
-        self.nominatim_endpoint = "https://nominatim.openstreetmap.org/search"
-        self.osrm_endpoint = "https://router.project-osrm.org/route/v1"
+        self.osrm_endpoint = "https://router.project-osrm.org"
+        # Local road graph (ROAD_GRAPH_PATH); routes it cannot answer go to the OSRM server
+        self.road_graph = road_graph if road_graph is not None else get_road_graph()
 
     def _define_parameters(self) -> List[ToolParameter]:
         return [
             ToolParameter(
                 name="list_of_locations",
                 param_type=ParameterType.LIST,
-                description="List of locations to calculate distances from the origin",
+                description="List of locations (place names or stop IDs such as \"S5595\") to calculate distances from the origin",
                 required=True
             ),
             ToolParameter(
@@ -27,50 +42,154 @@ class OpenStreetMapTool(BaseTool):
                 description="Travel mode (e.g., 'driving', 'walking', 'cycling')",
                 required=False,
                 default="driving"
+            ),
+            ToolParameter(
+                name="calculation",
+                param_type=ParameterType.STRING,
+                description=(
+                    "'pairs': each consecutive pair separately; "
+                    "'route': all legs of the ordered itinerary in one request, plus the total; "
+                    "'matrix': distances and durations between every pair of locations; "
+                    "'estimate': like 'matrix' but instant, from straight-line distances (approximate)"
+                ),
+                required=False,
+                default="pairs",
+                constraints={"choices": ["pairs", "route", "matrix", "estimate"]}
             )
         ]
 
     def _get_coordinates(self, location: str) -> tuple:
-        """Get coordinates for a location using Nominatim."""
-        params = {
-            'q': location,
-            'format': 'json',
-            'limit': 1
-        }
-        headers = {
-            'User-Agent': 'OpenStreetMapTool/1.0'
-        }
-        
-        response = requests.get(self.nominatim_endpoint, params=params, headers=headers)
-        response.raise_for_status()
-        
-        data = response.json()
-        if not data:
+        """Get (lon, lat) coordinates for a location or stop ID, geocoded once per trip."""
+        stop = resolve_stop(location, get_geocoder().geocode)
+        if stop is None:
             raise ValueError(f"Location not found: {location}")
-            
-        return float(data[0]['lon']), float(data[0]['lat'])
+        return stop.longitude, stop.latitude
+
+    def _osrm(self, service: str, coordinates: List[tuple], mode: str, params: Dict[str, str]) -> Dict:
+        """Call an OSRM service ('route', 'table') for a list of (lon, lat) coordinates."""
+        profile = OSRM_PROFILES.get(mode, 'car')
+        if self.road_graph is not None and self.road_graph.profile == profile:
+            local_result = self._local_osrm(service, coordinates)
+            if local_result is not None:
+                return local_result
+
+        # Format coordinates for OSRM
+        coords = ";".join(f"{lon},{lat}" for lon, lat in coordinates)
+        url = f"{self.osrm_endpoint}/{service}/v1/{profile}/{coords}"
+
+        try:
+            response = get_http_client().get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+        except (httpx.HTTPError, ValueError):
+            logger.warning("OSRM %s request failed, using the straight-line estimate", service, exc_info=True)
+            return self._estimate(service, coordinates, mode)
+
+        # NoRoute: there is no possible route, so an estimate would be meaningless
+        if data.get('code') not in ('Ok', 'NoRoute'):
+            logger.warning("OSRM %s returned %s, using the straight-line estimate", service, data.get('code'))
+            return self._estimate(service, coordinates, mode)
+        return data
+
+    def _estimate(self, service: str, coordinates: List[tuple], mode: str) -> Dict:
+        """OSRM-shaped response from the great-circle estimator (flagged as estimated)."""
+        points = [(lat, lon) for lon, lat in coordinates]
+        if service == 'table':
+            distances, durations = estimate_matrix(points, mode)
+            return {'code': 'Ok', 'estimated': True, 'distances': distances.tolist(), 'durations': durations.tolist()}
+
+        distances, durations = estimate_legs(points, mode)
+        legs = [{'distance': float(d), 'duration': float(t)} for d, t in zip(distances, durations)]
+        return {'code': 'Ok', 'estimated': True, 'routes': [{
+            'distance': float(distances.sum()),
+            'duration': float(durations.sum()),
+            'legs': legs
+        }]}
+
+    def _local_osrm(self, service: str, coordinates: List[tuple]) -> Optional[Dict]:
+        """OSRM-shaped response computed on the local road graph, or None if a point cannot be routed."""
+        nodes = [self.road_graph.nearest_node(lat, lon) for lon, lat in coordinates]
+        if None in nodes:
+            return None
+
+        if service == 'route':
+            legs = []
+            for source, target in zip(nodes, nodes[1:]):
+                path = self.road_graph.shortest_path(source, target)
+                if path is None:
+                    return None
+                legs.append({'duration': path[0], 'distance': path[1]})
+            return {'code': 'Ok', 'routes': [{
+                'duration': sum(leg['duration'] for leg in legs),
+                'distance': sum(leg['distance'] for leg in legs),
+                'legs': legs
+            }]}
+
+        if service == 'table':
+            durations = [[0.0] * len(nodes) for _ in nodes]
+            distances = [[0.0] * len(nodes) for _ in nodes]
+            for i, source in enumerate(nodes):
+                for j, target in enumerate(nodes):
+                    if i != j:
+                        path = self.road_graph.shortest_path(source, target)
+                        durations[i][j] = path[0] if path else None
+                        distances[i][j] = path[1] if path else None
+            return {'code': 'Ok', 'durations': durations, 'distances': distances}
+        return None
 
     def _get_route(self, origin: tuple, destination: tuple, mode: str) -> Dict:
         """Get route information using OSRM."""
-        # Convert mode to OSRM profile
-        profile = {
-            'driving': 'car',
-            'walking': 'foot',
-            'cycling': 'bike'
-        }.get(mode, 'car')
+        return self._osrm('route', [origin, destination], mode, {'overview': 'false'})
 
-        # Format coordinates for OSRM
-        coords = f"{origin[0]},{origin[1]};{destination[0]},{destination[1]}"
-        url = f"{self.osrm_endpoint}/{profile}/{coords}"
-        
-        params = {
-            'overview': 'false'
+    def _get_all_coordinates(self, locations: List[str]) -> List[tuple]:
+        """Geocode every location (raises ValueError on the first unknown one)."""
+        return [self._get_coordinates(location) for location in locations]
+
+    def _format_leg(self, origin: str, destination: str, leg: Dict, estimated: bool = False) -> Dict[str, Any]:
+        formatted = {
+            'origin': origin,
+            'destination': destination,
+            'distance': self._format_distance(leg['distance']),
+            'duration': self._format_duration(leg['duration'])
         }
-        
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        
-        return response.json()
+        if estimated:
+            formatted['estimated'] = True
+        return formatted
+
+    def _execute_route(self, locations: List[str], mode: str) -> Dict[str, Any]:
+        """All legs of the ordered itinerary from a single multi-waypoint /route request."""
+        route_data = self._osrm('route', self._get_all_coordinates(locations), mode, {'overview': 'false'})
+        if route_data.get('code') != 'Ok':
+            return {"error": f"Route calculation failed: {route_data.get('code')}"}
+
+        route = route_data['routes'][0]
+        estimated = route_data.get('estimated', False)
+        dict_result = {}
+        for i, leg in enumerate(route['legs']):
+            origin, destination = locations[i], locations[i+1]
+            dict_result[f"{origin} to {destination}"] = self._format_leg(origin, destination, leg, estimated)
+        dict_result["total"] = self._format_leg(locations[0], locations[-1], route, estimated)
+        return dict_result
+
+    def _execute_matrix(self, locations: List[str], mode: str, estimate: bool = False) -> Dict[str, Any]:
+        """N×N distances (m) and durations (s) from a single /table request (or the estimator)."""
+        coordinates = self._get_all_coordinates(locations)
+        if estimate:
+            table = self._estimate('table', coordinates, mode)
+        else:
+            table = self._osrm('table', coordinates, mode, {'annotations': 'duration,distance'})
+        if table.get('code') != 'Ok':
+            return {"error": f"Matrix calculation failed: {table.get('code')}"}
+
+        # Pairs with no route are None
+        result = {
+            "locations": locations,
+            "distances": table.get('distances'),
+            "durations": table.get('durations')
+        }
+        if table.get('estimated'):
+            result["estimated"] = True
+        return result
 
     def _format_distance(self, meters: float) -> str:
         """Format distance in a human-readable format."""
@@ -88,8 +207,17 @@ class OpenStreetMapTool(BaseTool):
         return f"{int(minutes)} mins"
 
     def execute(self, **kwargs) -> Dict[str, Any]:
+        result = self._execute(**kwargs)
+        # Stop IDs, reusable in later calls
+        refs = stop_refs(kwargs.get("list_of_locations") or [])
+        if refs and "error" not in result:
+            result["stops"] = refs
+        return result
+
+    def _execute(self, **kwargs) -> Dict[str, Any]:
         locations = kwargs.get("list_of_locations")
         mode = kwargs.get("mode", "driving")
+        calculation = kwargs.get("calculation", "pairs")
 
         # Input validation
         if not locations:
@@ -97,6 +225,14 @@ class OpenStreetMapTool(BaseTool):
         if not isinstance(locations, list) or len(locations) < 2:
             return {"error": "list_of_locations must be a list with at least two locations"}
 
+        if calculation in ("route", "matrix", "estimate"):
+            try:
+                if calculation == "route":
+                    return self._execute_route(locations, mode)
+                return self._execute_matrix(locations, mode, estimate=calculation == "estimate")
+            except Exception as e:
+                return {"error": f"An error occurred: {str(e)}"}
+
         dict_result = {}
         
         # Process locations as pairs
@@ -107,7 +243,6 @@ class OpenStreetMapTool(BaseTool):
             try:
                 # Get coordinates for both locations
                 origin_coords = self._get_coordinates(origin)
-                time.sleep(1)  # Respect Nominatim's usage policy
                 dest_coords = self._get_coordinates(destination)
                 
                 # Get route information
@@ -115,13 +250,9 @@ class OpenStreetMapTool(BaseTool):
                 
                 if route_data.get('code') == 'Ok':
                     route = route_data['routes'][0]
-                    formatted_result = {
-                        'origin': origin,
-                        'destination': destination,
-                        'distance': self._format_distance(route['distance']),
-                        'duration': self._format_duration(route['duration'])
-                    }
-                    dict_result[f"{origin} to {destination}"] = formatted_result
+                    dict_result[f"{origin} to {destination}"] = self._format_leg(
+                        origin, destination, route, route_data.get('estimated', False)
+                    )
                 else:
                     dict_result[f"{origin} to {destination}"] = {
                         "error": "Route calculation failed"
@@ -131,11 +262,38 @@ class OpenStreetMapTool(BaseTool):
                 dict_result[f"{origin} to {destination}"] = {
                     "error": f"An error occurred: {str(e)}"
                 }
-            
-            time.sleep(1)  # Respect API rate limits
         
         return dict_result
 
+    def compact(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Model-facing projection: one short line per leg instead of a dict."""
+        if "durations" in result:
+            # Matrix: rounded km and minutes
+            return {
+                **({"estimated": True} if result.get("estimated") else {}),
+                **({"stops": result["stops"]} if result.get("stops") else {}),
+                "locations": result["locations"],
+                "distance_km": [
+                    [None if d is None else round(d / 1000, 1) for d in row]
+                    for row in result.get("distances") or []
+                ],
+                "duration_min": [
+                    [None if d is None else round(d / 60) for d in row]
+                    for row in result.get("durations") or []
+                ]
+            }
+
+        compact_result = {}
+        for leg, info in result.items():
+            if leg == "stops" or not isinstance(info, dict):
+                compact_result[leg] = info
+            elif "error" in info:
+                compact_result[leg] = f"error: {info['error']}"[:120]
+            else:
+                prefix = "~" if info.get("estimated") else ""
+                compact_result[leg] = f"{prefix}{info['distance']}, {info['duration']}"
+        return compact_result
+
 # Example usage:
 if __name__ == "__main__":
     tool = OpenStreetMapTool()
@@ -0,0 +1,230 @@
+from backend.tools.base_tool import BaseTool, ToolParameter, ParameterType
+from typing import Any, Callable, Dict, Iterable, List, Union
+import inspect
+import json
+
+# Sentinelle pour distinguer "absent" de None
+_MISSING = object()
+
+
+class ToolArgumentError(ValueError):
+    """Arguments d'un appel d'outil rejetés avant l'exécution de l'outil"""
+
+    def __init__(self, tool_name: str, errors: List[Dict[str, str]]):
+        self.tool_name = tool_name
+        self.errors = errors
+        details = "; ".join(f"{error['parameter']}: {error['message']}" for error in errors)
+        super().__init__(f"Invalid arguments for {tool_name}: {details}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Résultat structuré renvoyé au modèle à la place du résultat de l'outil"""
+        return {
+            "error": str(self),
+            "tool": self.tool_name,
+            "invalid_arguments": self.errors
+        }
+
+
+class _Invalid(Exception):
+    pass
+
+
+def _coerce_string(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    # Ex: le modèle passe directement l'objet JSON attendu sous forme de chaîne
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    raise _Invalid("expected a string")
+
+
+def _coerce_integer(value):
+    if isinstance(value, bool):
+        raise _Invalid("expected an integer")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+    raise _Invalid("expected an integer")
+
+
+def _coerce_float(value):
+    if isinstance(value, bool):
+        raise _Invalid("expected a number")
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            pass
+    raise _Invalid("expected a number")
+
+
+def _coerce_boolean(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    raise _Invalid("expected a boolean")
+
+
+def _decode_json(value, expected_type, message):
+    # Les modèles encodent parfois les listes/objets en chaîne JSON
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            raise _Invalid(message)
+    if not isinstance(value, expected_type):
+        raise _Invalid(message)
+    return value
+
+
+def _coerce_list(value):
+    return _decode_json(value, list, "expected an array")
+
+
+def _coerce_dict(value):
+    return _decode_json(value, dict, "expected an object")
+
+
+_COERCERS = {
+    ParameterType.STRING: _coerce_string,
+    ParameterType.INTEGER: _coerce_integer,
+    ParameterType.FLOAT: _coerce_float,
+    ParameterType.BOOLEAN: _coerce_boolean,
+    ParameterType.LIST: _coerce_list,
+    ParameterType.DICT: _coerce_dict,
+}
+
+
+def compile_parameter(param: ToolParameter) -> Callable[[Any], Any]:
+    """Compile un ToolParameter (type + contraintes) en une fonction de validation/coercition"""
+    coerce = _COERCERS[param.param_type]
+    constraints = param.constraints or {}
+    minimum = constraints.get("min")
+    maximum = constraints.get("max")
+    choices = constraints.get("choices")
+    choices_set = frozenset(choices) if choices is not None else None
+
+    if minimum is None and maximum is None and choices_set is None:
+        return coerce
+
+    def validate(value):
+        value = coerce(value)
+        if minimum is not None and value < minimum:
+            raise _Invalid(f"must be >= {minimum}")
+        if maximum is not None and value > maximum:
+            raise _Invalid(f"must be <= {maximum}")
+        if choices_set is not None and value not in choices_set:
+            raise _Invalid(f"must be one of {choices}")
+        return value
+
+    return validate
+
+
+class CompiledTool:
+    """Outil accompagné de son schéma figé et de ses validateurs précompilés"""
+
+    def __init__(self, tool: BaseTool):
+        self.tool = tool
+        self.name = tool.name
+        self.schema = tool.get_schema()
+        self._validators = [
+            (
+                param.name,
+                param.required,
+                param.default if param.default is not None else _MISSING,
+                compile_parameter(param)
+            )
+            for param in tool.parameters
+        ]
+        # Les arguments non déclarés ne sont transmis qu'aux outils qui acceptent **kwargs
+        self._declared = frozenset(param.name for param in tool.parameters)
+        self._accepts_extra = any(
+            param.kind is inspect.Parameter.VAR_KEYWORD
+            for param in inspect.signature(tool.execute).parameters.values()
+        )
+
+    def validate(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Renvoie les arguments convertis, ou lève ToolArgumentError.
+
+        Les arguments non déclarés sont transmis tels quels aux outils dont execute accepte
+        **kwargs, et ignorés pour les autres (ex: ReturnTool.execute(result)).
+        """
+        if self._accepts_extra:
+            validated = dict(arguments)
+        else:
+            validated = {name: value for name, value in arguments.items() if name in self._declared}
+        errors = []
+        for name, required, default, validator in self._validators:
+            value = arguments.get(name, _MISSING)
+            if value is _MISSING or value is None:
+                if required:
+                    errors.append({"parameter": name, "message": "missing required parameter"})
+                elif default is not _MISSING:
+                    validated[name] = default
+                continue
+            try:
+                validated[name] = validator(value)
+            except _Invalid as e:
+                errors.append({"parameter": name, "message": str(e)})
+        if errors:
+            raise ToolArgumentError(self.name, errors)
+        return validated
+
+
+class ToolRegistry:
+    """Registre des outils de l'agent.
+
+    Les schémas JSON sont construits une seule fois avec une sérialisation stable
+    (identique octet pour octet d'un appel à l'autre), et chaque appel d'outil est
+    validé localement avant exécution.
+    """
+
+    def __init__(self, tools: Iterable[BaseTool]):
+        self._compiled: Dict[str, CompiledTool] = {}
+        for tool in tools:
+            self._compiled[tool.name] = CompiledTool(tool)
+        self.tools: Dict[str, BaseTool] = {name: compiled.tool for name, compiled in self._compiled.items()}
+        self.schemas_json: str = json.dumps(
+            [compiled.schema for compiled in self._compiled.values()],
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":")
+        )
+        # Schémas relus depuis la sérialisation canonique : même ordre de clés à chaque requête
+        self.schemas: List[Dict[str, Any]] = json.loads(self.schemas_json)
+
+    def __contains__(self, tool_name: str) -> bool:
+        return tool_name in self._compiled
+
+    def __getitem__(self, tool_name: str) -> BaseTool:
+        return self.tools[tool_name]
+
+    def validate(self, tool_name: str, arguments: Union[str, Dict[str, Any], None]) -> Dict[str, Any]:
+        """Valide les arguments d'un appel (dict ou chaîne JSON brute du modèle)"""
+        compiled = self._compiled.get(tool_name)
+        if compiled is None:
+            raise ToolArgumentError(tool_name, [{
+                "parameter": "name",
+                "message": f"unknown tool, available tools: {list(self._compiled)}"
+            }])
+        if arguments is None or arguments == "":
+            arguments = {}
+        if isinstance(arguments, str):
+            try:
+                arguments = json.loads(arguments)
+            except ValueError as e:
+                raise ToolArgumentError(tool_name, [{"parameter": "arguments", "message": f"invalid JSON: {e}"}])
+        if not isinstance(arguments, dict):
+            raise ToolArgumentError(tool_name, [{"parameter": "arguments", "message": "expected a JSON object"}])
+        return compiled.validate(arguments)
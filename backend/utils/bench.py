@@ -0,0 +1,122 @@
+"""
+Benchmark hors ligne de la boucle de l'agent.
+
+Enregistrer une exécution réelle (LLM + HTTP) :
+    python -m backend.utils.bench --cassette cassettes/paris_marseille.json --record
+Rejouer sans réseau (avec ou sans les latences enregistrées) :
+    python -m backend.utils.bench --cassette cassettes/paris_marseille.json --runs 5 [--latency]
+"""
+from backend.agents.agent import OpenAIAgent
+from backend.agents.context import ContextBudget
+from backend.tools.hotel_open import HotelToolOpen
+from backend.tools.maps_openstreetmap import OpenStreetMapTool
+from backend.tools.final_return import ReturnTool
+from backend.utils.cassette import Cassette
+from backend.utils.generation_cache import get_generation_cache
+from backend.utils.geocoding import get_geocoder
+from backend.utils.image_store import get_image_store
+from backend.utils.places_cache import get_places_search
+from collections import Counter
+from contextlib import contextmanager
+from dotenv import load_dotenv
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+load_dotenv()
+
+
+def create_agent(api_key: str) -> OpenAIAgent:
+    return OpenAIAgent(
+        name="Road trip planner",
+        tools=[
+            HotelToolOpen(),
+            OpenStreetMapTool(),
+            ReturnTool()
+        ],
+        api_key=api_key,
+        model="mistralai/Mixtral-8x7B-Instruct-v0.1",
+        base_url="https://api.together.xyz/v1",
+        stream=True,
+        context_budget=ContextBudget(max_tokens=int(os.getenv("CONTEXT_TOKEN_BUDGET", 16000)))
+    )
+
+
+@contextmanager
+def isolated_caches():
+    """
+    Caches persistants (géocodage, Places, générations, images) dans un répertoire temporaire :
+    chaque exécution part à froid et fait les mêmes appels que l'enregistrement, quel que soit
+    le contenu des caches de l'utilisateur.
+    """
+    getters = (get_geocoder, get_places_search, get_generation_cache, get_image_store)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = {
+            "GEOCODE_CACHE_PATH": os.path.join(directory, "geocode.sqlite"),
+            "PLACES_CACHE_PATH": os.path.join(directory, "places.sqlite"),
+            "GENERATION_CACHE_PATH": os.path.join(directory, "generations.sqlite"),
+            "IMAGE_STORE_DIR": os.path.join(directory, "images"),
+        }
+        saved = {name: os.environ.get(name) for name in paths}
+        os.environ.update(paths)
+        for getter in getters:
+            getter.cache_clear()
+        try:
+            yield directory
+        finally:
+            if get_image_store.cache_info().currsize:
+                get_image_store().close()
+            for getter in getters:
+                getter.cache_clear()
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+
+def run_once(cassette: Cassette, prompt: str, api_key: str) -> dict:
+    agent = create_agent(api_key)
+    start = time.perf_counter()
+    events = Counter()
+    with isolated_caches(), cassette:
+        cassette.wrap_llm_client(agent.client)
+        # La recherche d'images passe par googleapiclient, pas par requests
+        cassette.patch(HotelToolOpen, "get_image_url")
+        for event in agent.execute_task(prompt):
+            events[event["type"]] += 1
+    return {"seconds": time.perf_counter() - start, "events": dict(events)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cassette", required=True)
+    parser.add_argument("--record", action="store_true", help="Exécute les vrais appels et les enregistre")
+    parser.add_argument("--latency", action="store_true", help="Rejoue les latences enregistrées")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--prompt", default="Plan a 5 day road trip from Paris to Marseille. Find hotels for each stop.")
+    args = parser.parse_args()
+
+    if args.record:
+        api_key = os.environ["TOGETHER_API_KEY"]
+        runs = [run_once(Cassette(args.cassette, mode="record"), args.prompt, api_key)]
+    else:
+        runs = [
+            run_once(
+                Cassette(args.cassette, mode="replay", simulate_latency=args.latency, latency_scale=args.latency_scale),
+                args.prompt,
+                "replay"
+            )
+            for _ in range(args.runs)
+        ]
+
+    durations = [run["seconds"] for run in runs]
+    print(f"runs: {len(runs)}  events: {runs[-1]['events']}")
+    print(f"wall time: min {min(durations):.3f}s  median {statistics.median(durations):.3f}s  max {max(durations):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
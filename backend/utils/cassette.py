@@ -0,0 +1,346 @@
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import base64
+import functools
+import hashlib
+import inspect
+import json
+import threading
+import time
+
+import httpx
+import requests
+
+from backend.utils.http_client import HttpClient
+
+
+class CassetteMiss(LookupError):
+    """Aucune interaction enregistrée ne correspond à la requête rejouée"""
+
+
+def _fingerprint(kind: str, request: Dict[str, Any]) -> str:
+    payload = json.dumps([kind, request], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    Enregistre puis rejoue les appels LLM (chat.completions.create) et les échanges HTTP
+    sortants des outils (HttpClient partagé, et requests pour les bibliothèques tierces), pour mesurer l'agent sans réseau.
+
+    mode="record" : les appels réels sont exécutés et sauvegardés dans `path` à la sortie.
+    mode="replay" : les réponses sont servies depuis `path`, dans l'ordre d'enregistrement
+    pour une même requête. Avec simulate_latency=True, chaque réponse est retardée de sa
+    durée enregistrée (multipliée par latency_scale).
+
+    Usage :
+        cassette = Cassette("cassettes/trip.json", mode="replay")
+        with cassette:
+            cassette.wrap_llm_client(agent.client)
+            for event in agent.execute_task(prompt): ...
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = "replay",
+        simulate_latency: bool = False,
+        latency_scale: float = 1.0
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.simulate_latency = simulate_latency
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._interactions: List[Dict[str, Any]] = []
+        self._replay: Dict[str, deque] = defaultdict(deque)
+        self._stack: Optional[ExitStack] = None
+        if mode == "replay":
+            self.load()
+
+    # -- Stockage ---------------------------------------------------------
+
+    def load(self):
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        self._interactions = data["interactions"]
+        self._replay.clear()
+        for interaction in self._interactions:
+            self._replay[interaction["key"]].append(interaction)
+
+    def save(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "interactions": self._interactions}, f, ensure_ascii=False, indent=1)
+
+    def _record(self, kind: str, key: str, request: Dict[str, Any], response: Any, elapsed: float, error: Optional[Dict] = None):
+        with self._lock:
+            self._interactions.append({
+                "kind": kind,
+                "key": key,
+                "request": request,
+                "response": response,
+                "error": error,
+                "elapsed": elapsed
+            })
+
+    def _next(self, kind: str, key: str, request: Dict[str, Any], sleep: bool = True) -> Dict[str, Any]:
+        with self._lock:
+            queue = self._replay.get(key)
+            if not queue:
+                raise CassetteMiss(f"No recorded {kind} interaction for {json.dumps(request, default=str)[:200]}")
+            interaction = queue.popleft()
+        if sleep and self.simulate_latency:
+            time.sleep(interaction["elapsed"] * self.latency_scale)
+        return interaction
+
+    # -- Activation -------------------------------------------------------
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        self._stack.enter_context(_patched(requests.sessions.Session, "request", self._wrap_http))
+        self._stack.enter_context(_patched(HttpClient, "request", self._wrap_http_client))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        self._stack = None
+        if self.mode == "record":
+            self.save()
+        return False
+
+    def patch(self, owner: Any, attribute: str):
+        """Enregistre/rejoue une fonction arbitraire (ex: une recherche d'images hors `requests`).
+
+        Le résultat doit être sérialisable en JSON. Actif jusqu'à la sortie du bloc `with`.
+        """
+        skip_self = isinstance(owner, type)
+        self._stack.enter_context(_patched(
+            owner, attribute, lambda original: self._wrap_callable(original, skip_self)
+        ))
+
+    # -- LLM ----------------------------------------------------------------
+
+    def wrap_llm_client(self, client):
+        """Remplace client.chat.completions.create (client sync ou async) sur cette instance.
+
+        Le client est souvent partagé (cache de la fabrique d'agents) : create est restauré
+        à la sortie du bloc `with`.
+        """
+        if self._stack is None:
+            raise RuntimeError("wrap_llm_client must be called inside the cassette's with block")
+        completions = client.chat.completions
+        wrap = self._wrap_async_llm if inspect.iscoroutinefunction(completions.create) else self._wrap_llm
+        self._stack.enter_context(_patched(completions, "create", wrap))
+        return client
+
+    def _llm_request(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in kwargs.items() if key not in ("timeout", "extra_headers")}
+
+    def _wrap_llm(self, original: Callable):
+        @functools.wraps(original)
+        def create(**kwargs):
+            request = self._llm_request(kwargs)
+            key = _fingerprint("llm", request)
+            if self.mode == "replay":
+                return _restore_completion(self._next("llm", key, request), kwargs.get("stream", False))
+
+            start = time.perf_counter()
+            response = original(**kwargs)
+            if kwargs.get("stream"):
+                return self._record_stream(key, request, response, start)
+            self._record("llm", key, request, response.model_dump(), time.perf_counter() - start)
+            return response
+        return create
+
+    def _wrap_async_llm(self, original: Callable):
+        @functools.wraps(original)
+        async def create(**kwargs):
+            request = self._llm_request(kwargs)
+            key = _fingerprint("llm", request)
+            if self.mode == "replay":
+                interaction = self._next("llm", key, request, sleep=False)
+                if self.simulate_latency:
+                    await asyncio.sleep(interaction["elapsed"] * self.latency_scale)
+                restored = _restore_completion(interaction, kwargs.get("stream", False))
+                return _aiter(restored) if kwargs.get("stream") else restored
+
+            start = time.perf_counter()
+            response = await original(**kwargs)
+            if not kwargs.get("stream"):
+                self._record("llm", key, request, response.model_dump(), time.perf_counter() - start)
+                return response
+
+            async def record_chunks():
+                chunks = []
+                async for chunk in response:
+                    chunks.append(chunk.model_dump())
+                    yield chunk
+                self._record("llm", key, request, chunks, time.perf_counter() - start)
+            return record_chunks()
+        return create
+
+    def _record_stream(self, key, request, response, start):
+        chunks = []
+        for chunk in response:
+            chunks.append(chunk.model_dump())
+            yield chunk
+        self._record("llm", key, request, chunks, time.perf_counter() - start)
+
+    # -- HTTP ---------------------------------------------------------------
+
+    def _wrap_http(self, original: Callable):
+        cassette = self
+
+        @functools.wraps(original)
+        def request(session, method, url, *args, **kwargs):
+            prepared_url = requests.Request(method.upper(), url, params=kwargs.get("params")).prepare().url
+            body = kwargs.get("json") if kwargs.get("json") is not None else kwargs.get("data")
+            if isinstance(body, bytes):
+                body = body.decode("utf-8", "replace")
+            http_request = {"method": method.upper(), "url": prepared_url, "body": body}
+            key = _fingerprint("http", http_request)
+
+            if cassette.mode == "replay":
+                interaction = cassette._next("http", key, http_request)
+                if interaction["error"]:
+                    raise requests.ConnectionError(interaction["error"]["message"])
+                return _restore_response(interaction["response"], prepared_url)
+
+            start = time.perf_counter()
+            try:
+                response = original(session, method, url, *args, **kwargs)
+            except requests.RequestException as e:
+                cassette._record("http", key, http_request, None, time.perf_counter() - start,
+                                 error={"type": type(e).__name__, "message": str(e)})
+                raise
+            cassette._record("http", key, http_request, {
+                "status_code": response.status_code,
+                "headers": dict(response.headers),
+                "content": base64.b64encode(response.content).decode("ascii"),
+                "encoding": response.encoding
+            }, time.perf_counter() - start)
+            return response
+        return request
+
+    def _wrap_http_client(self, original: Callable):
+        """Une requête logique de HttpClient (nouvelles tentatives comprises) = une interaction"""
+        cassette = self
+
+        @functools.wraps(original)
+        def request(client, method, url, *args, **kwargs):
+            prepared_url = str(httpx.URL(url, params=kwargs.get("params")))
+            body = next((kwargs[name] for name in ("json", "data", "content") if kwargs.get(name) is not None), None)
+            if isinstance(body, bytes):
+                body = body.decode("utf-8", "replace")
+            http_request = {"method": method.upper(), "url": prepared_url, "body": body}
+            key = _fingerprint("http", http_request)
+
+            if cassette.mode == "replay":
+                interaction = cassette._next("http", key, http_request)
+                if interaction["error"]:
+                    raise httpx.ConnectError(interaction["error"]["message"])
+                return _restore_httpx_response(interaction["response"], method.upper(), prepared_url)
+
+            start = time.perf_counter()
+            try:
+                response = original(client, method, url, *args, **kwargs)
+            except httpx.HTTPError as e:
+                cassette._record("http", key, http_request, None, time.perf_counter() - start,
+                                 error={"type": type(e).__name__, "message": str(e)})
+                raise
+            cassette._record("http", key, http_request, {
+                "status_code": response.status_code,
+                "headers": dict(response.headers),
+                "content": base64.b64encode(response.content).decode("ascii"),
+                "encoding": response.encoding
+            }, time.perf_counter() - start)
+            return response
+        return request
+
+    # -- Fonctions arbitraires ------------------------------------------------
+
+    def _wrap_callable(self, original: Callable, skip_self: bool):
+        cassette = self
+        name = getattr(original, "__qualname__", repr(original))
+
+        @functools.wraps(original)
+        def call(*args, **kwargs):
+            # Pour une méthode patchée sur la classe, self ne fait pas partie de la clé
+            key_args = args[1:] if skip_self else args
+            call_request = {"function": name, "args": list(key_args), "kwargs": kwargs}
+            key = _fingerprint("call", call_request)
+            if cassette.mode == "replay":
+                return cassette._next("call", key, call_request)["response"]
+            start = time.perf_counter()
+            result = original(*args, **kwargs)
+            cassette._record("call", key, call_request, result, time.perf_counter() - start)
+            return result
+        return call
+
+
+class _patched:
+    """Remplace temporairement owner.attribute par wrapper(original)"""
+
+    def __init__(self, owner: Any, attribute: str, wrapper: Callable):
+        self.owner = owner
+        self.attribute = attribute
+        self.wrapper = wrapper
+
+    def __enter__(self):
+        self.original = getattr(self.owner, self.attribute)
+        # Attribut propre à l'objet, ou hérité de sa classe (méthode d'une instance)
+        self.own = self.attribute in getattr(self.owner, "__dict__", {})
+        setattr(self.owner, self.attribute, self.wrapper(self.original))
+
+    def __exit__(self, *exc_info):
+        if self.own:
+            setattr(self.owner, self.attribute, self.original)
+        else:
+            delattr(self.owner, self.attribute)
+        return False
+
+
+def _restore_completion(interaction: Dict[str, Any], stream: bool):
+    from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+    if stream:
+        return iter([ChatCompletionChunk.model_validate(chunk) for chunk in interaction["response"]])
+    return ChatCompletion.model_validate(interaction["response"])
+
+
+async def _aiter(iterable):
+    for item in iterable:
+        yield item
+
+
+def _restore_response(recorded: Dict[str, Any], url: str) -> requests.Response:
+    response = requests.Response()
+    response.status_code = recorded["status_code"]
+    response.headers = requests.structures.CaseInsensitiveDict(recorded["headers"])
+    # Le contenu enregistré est déjà décompressé
+    response.headers.pop("Content-Encoding", None)
+    response._content = base64.b64decode(recorded["content"])
+    response.encoding = recorded["encoding"]
+    response.url = url
+    return response
+
+
+def _restore_httpx_response(recorded: Dict[str, Any], method: str, url: str) -> httpx.Response:
+    headers = {
+        name: value for name, value in recorded["headers"].items()
+        # Le contenu enregistré est déjà décompressé
+        if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+    }
+    response = httpx.Response(
+        recorded["status_code"],
+        headers=headers,
+        content=base64.b64decode(recorded["content"]),
+        request=httpx.Request(method, url)
+    )
+    if recorded.get("encoding"):
+        response.encoding = recorded["encoding"]
+    return response
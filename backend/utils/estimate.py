@@ -0,0 +1,60 @@
+"""
+Estimation hors ligne des distances et durées de trajet à partir des distances orthodromiques.
+
+distance routière ≈ distance à vol d'oiseau × facteur de détour (circuity) ;
+durée ≈ distance routière / vitesse moyenne, la vitesse dépendant de la longueur du trajet
+(trajets courts en ville, trajets longs sur autoroute).
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+
+# Rapport distance routière / distance orthodromique ; valeurs usuelles mesurées sur
+# les réseaux européens et nord-américains (≈1.2 à 1.4 en voiture)
+CIRCUITY = {
+    "driving": 1.25,
+    "cycling": 1.27,
+    "walking": 1.25,
+}
+
+# Vitesse moyenne (km/h) selon la distance routière (km), interpolée linéairement
+SPEED_PROFILES = {
+    "driving": ([0, 10, 50, 200, 1000], [30, 50, 75, 100, 110]),
+    "cycling": ([0, 1000], [16, 16]),
+    "walking": ([0, 1000], [4.8, 4.8]),
+}
+
+
+def haversine_matrix(latitudes, longitudes) -> np.ndarray:
+    """Distances orthodromiques (m) entre tous les points : matrice N×N"""
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def estimate_road(great_circle_m, mode: str = "driving") -> Tuple[np.ndarray, np.ndarray]:
+    """(distances routières m, durées s) estimées à partir de distances orthodromiques"""
+    distances = np.asarray(great_circle_m, dtype=float) * CIRCUITY.get(mode, CIRCUITY["driving"])
+    breakpoints, speeds = SPEED_PROFILES.get(mode, SPEED_PROFILES["driving"])
+    speed_ms = np.interp(distances / 1000, breakpoints, speeds) / 3.6
+    return distances, distances / speed_ms
+
+
+def estimate_matrix(coordinates: List[Tuple[float, float]], mode: str = "driving") -> Tuple[np.ndarray, np.ndarray]:
+    """Matrices N×N (distances m, durées s) pour des points (lat, lon)"""
+    points = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+    return estimate_road(haversine_matrix(points[:, 0], points[:, 1]), mode)
+
+
+def estimate_legs(coordinates: List[Tuple[float, float]], mode: str = "driving") -> Tuple[np.ndarray, np.ndarray]:
+    """(distances m, durées s) de chaque étape d'un itinéraire ordonné de points (lat, lon)"""
+    points = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+    lat = np.radians(points[:, 0])
+    lon = np.radians(points[:, 1])
+    a = np.sin(np.diff(lat) / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2
+    return estimate_road(2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0))), mode)
@@ -0,0 +1,327 @@
+"""
+Géocodeur hors ligne des villes, à partir d'un export GeoNames (cities500.txt, cities15000.txt...).
+
+Construction du fichier (une fois) :
+    python -m backend.utils.gazetteer cities15000.txt cities.gaz --countries countryInfo.txt --regions admin1CodesASCII.txt
+Utilisation par le géocodeur partagé :
+    GAZETTEER_PATH=cities.gaz
+"""
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from math import log10
+from typing import Dict, List, Optional, Tuple
+import argparse
+import difflib
+import json
+import mmap
+import os
+import re
+import struct
+import unicodedata
+
+try:
+    from rapidfuzz import fuzz
+except ImportError:
+    fuzz = None
+
+_MAGIC = b"GAZETTR1"
+
+
+def normalize_name(name: str) -> str:
+    """Clé d'index : sans accents ni ponctuation, en minuscules ("Saint-Étienne" -> "saint etienne")"""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    text = re.sub(r"[^\w]+", " ", text)
+    return text.strip()
+
+
+def trigrams(key: str) -> List[str]:
+    padded = f"  {key} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def _similarity(a: str, b: str) -> float:
+    if fuzz is not None:
+        return fuzz.ratio(a, b)
+    return difflib.SequenceMatcher(None, a, b).ratio() * 100
+
+
+@dataclass
+class GazetteerEntry:
+    name: str
+    country: str
+    latitude: float
+    longitude: float
+    population: int
+    score: float = 0.0
+    # Subdivision de premier niveau (région, État...) : nom et code GeoNames ("Texas", "TX")
+    region: str = ""
+    region_code: str = ""
+
+
+class _StringColumn:
+    """Colonne de chaînes (blob utf-8 + offsets) indexable, utilisable avec bisect"""
+
+    def __init__(self, blob: memoryview, offsets: memoryview):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return bytes(self.blob[self.offsets[index]:self.offsets[index + 1]]).decode("utf-8")
+
+
+def _string_sections(values: List[str]) -> Tuple[bytes, array]:
+    offsets = array("q", [0])
+    blob = bytearray()
+    for value in values:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    return bytes(blob), offsets
+
+
+class Gazetteer:
+    """
+    Fichier colonnaire trié par nom normalisé, lu via mmap : recherche exacte et par préfixe
+    par dichotomie, recherche approchée via un index de trigrammes. Le classement combine la
+    similarité du nom (RapidFuzz si disponible) et la population.
+    """
+
+    def __init__(self, path: str, population_weight: float = 2.0, min_score: float = 88.0):
+        self.path = path
+        self.population_weight = population_weight
+        # Similarité minimale (0-100) pour résoudre un lieu sans passer par Nominatim
+        self.min_score = min_score
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        if bytes(view[:len(_MAGIC)]) != _MAGIC:
+            raise ValueError(f"Not a gazetteer file: {path}")
+        (header_size,) = struct.unpack("<I", view[len(_MAGIC):len(_MAGIC) + 4])
+        header = json.loads(bytes(view[len(_MAGIC) + 4:len(_MAGIC) + 4 + header_size]))
+        self.countries: Dict[str, str] = header["countries"]
+
+        sections = {}
+        for name, (offset, size, typecode) in header["sections"].items():
+            section = view[offset:offset + size]
+            sections[name] = section.cast(typecode) if typecode != "B" else section
+        self.keys = _StringColumn(sections["keys"], sections["key_offsets"])
+        self.names = _StringColumn(sections["names"], sections["name_offsets"])
+        self.country_codes = sections["countries"]
+        self.latitudes = sections["lat"]
+        self.longitudes = sections["lon"]
+        self.populations = sections["population"]
+        # Fichiers construits sans les régions : aucune indication de région ne correspond
+        self.regions = _StringColumn(sections["regions"], sections["region_offsets"]) if "regions" in sections else None
+        self.region_codes = _StringColumn(sections["region_codes"], sections["region_code_offsets"]) if "region_codes" in sections else None
+        self.trigram_keys = _StringColumn(sections["trigrams"], sections["trigram_offsets"])
+        self.posting_offsets = sections["posting_offsets"]
+        self.postings = sections["postings"]
+
+    # -- Construction -------------------------------------------------------
+
+    @staticmethod
+    def build(dump_path: str, output_path: str, countries_path: Optional[str] = None, regions_path: Optional[str] = None):
+        """Construit le fichier à partir d'un export GeoNames (lieux habités, classe P)"""
+        region_names = {}
+        if regions_path:
+            # admin1CodesASCII.txt : "US.TX<TAB>Texas<TAB>Texas<TAB>4736286"
+            with open(regions_path, encoding="utf-8") as f:
+                for line in f:
+                    columns = line.rstrip("\n").split("\t")
+                    if len(columns) > 1:
+                        region_names[columns[0]] = columns[1]
+
+        rows = []
+        with open(dump_path, encoding="utf-8") as f:
+            for line in f:
+                columns = line.rstrip("\n").split("\t")
+                if len(columns) < 15 or columns[6] != "P":
+                    continue
+                name, ascii_name = columns[1], columns[2]
+                region_code = columns[10]
+                region = region_names.get(f"{columns[8]}.{region_code}", "")
+                place = (name, columns[8], float(columns[4]), float(columns[5]), int(columns[14] or 0), region, region_code)
+                for key in {normalize_name(name), normalize_name(ascii_name)}:
+                    if key:
+                        rows.append((key, *place))
+        rows.sort(key=lambda row: (row[0], -row[5]))
+
+        countries = {}
+        if countries_path:
+            with open(countries_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.startswith("#"):
+                        continue
+                    columns = line.rstrip("\n").split("\t")
+                    if len(columns) > 4:
+                        countries[normalize_name(columns[4])] = columns[0]
+                        countries[normalize_name(columns[1])] = columns[0]
+
+        postings: Dict[str, List[int]] = {}
+        for index, row in enumerate(rows):
+            for trigram in set(trigrams(row[0])):
+                postings.setdefault(trigram, []).append(index)
+        trigram_list = sorted(postings)
+        posting_offsets = array("q", [0])
+        posting_values = array("i")
+        for trigram in trigram_list:
+            posting_values.extend(postings[trigram])
+            posting_offsets.append(len(posting_values))
+
+        keys_blob, key_offsets = _string_sections([row[0] for row in rows])
+        names_blob, name_offsets = _string_sections([row[1] for row in rows])
+        trigrams_blob, trigram_offsets = _string_sections(trigram_list)
+        regions_blob, region_offsets = _string_sections([row[6] for row in rows])
+        region_codes_blob, region_code_offsets = _string_sections([row[7] for row in rows])
+        sections = {
+            "keys": (keys_blob, "B"),
+            "key_offsets": (key_offsets, "q"),
+            "names": (names_blob, "B"),
+            "name_offsets": (name_offsets, "q"),
+            "countries": ("".join(row[2][:2].ljust(2) for row in rows).encode("ascii"), "B"),
+            "lat": (array("d", (row[3] for row in rows)), "d"),
+            "lon": (array("d", (row[4] for row in rows)), "d"),
+            "population": (array("q", (row[5] for row in rows)), "q"),
+            "regions": (regions_blob, "B"),
+            "region_offsets": (region_offsets, "q"),
+            "region_codes": (region_codes_blob, "B"),
+            "region_code_offsets": (region_code_offsets, "q"),
+            "trigrams": (trigrams_blob, "B"),
+            "trigram_offsets": (trigram_offsets, "q"),
+            "posting_offsets": (posting_offsets, "q"),
+            "postings": (posting_values, "i"),
+        }
+
+        # Tableaux dans l'ordre des octets de la machine : le fichier est lu tel quel via mmap
+        payloads = [
+            (name, values.tobytes() if isinstance(values, array) else values, typecode)
+            for name, (values, typecode) in sections.items()
+        ]
+
+        # L'en-tête est écrit avec une taille fixe pour connaître les offsets à l'avance
+        placeholder = {name: [0, len(data), typecode] for name, data, typecode in payloads}
+        header_size = len(json.dumps({"sections": placeholder, "countries": countries})) + 32 * len(payloads)
+        offset = len(_MAGIC) + 4 + header_size
+        layout = {}
+        for name, data, typecode in payloads:
+            offset += -offset % 8
+            layout[name] = [offset, len(data), typecode]
+            offset += len(data)
+        header = json.dumps({"sections": layout, "countries": countries}).encode("utf-8").ljust(header_size)
+
+        with open(output_path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(struct.pack("<I", header_size))
+            f.write(header)
+            for name, data, _ in payloads:
+                f.write(b"\0" * (layout[name][0] - f.tell()))
+                f.write(data)
+
+    # -- Requêtes -----------------------------------------------------------
+
+    def _entry(self, index: int, score: float = 0.0) -> GazetteerEntry:
+        return GazetteerEntry(
+            name=self.names[index],
+            country=bytes(self.country_codes[2 * index:2 * index + 2]).decode("ascii").strip(),
+            latitude=self.latitudes[index],
+            longitude=self.longitudes[index],
+            population=self.populations[index],
+            score=score,
+            region=self.regions[index] if self.regions is not None else "",
+            region_code=self.region_codes[index] if self.region_codes is not None else ""
+        )
+
+    def _prefix_range(self, prefix: str, limit: int) -> range:
+        start = bisect_left(self.keys, prefix)
+        end = start
+        while end < len(self.keys) and end - start < limit and self.keys[end].startswith(prefix):
+            end += 1
+        return range(start, end)
+
+    def _trigram_candidates(self, key: str, limit: int) -> List[int]:
+        counts: Counter = Counter()
+        for trigram in set(trigrams(key)):
+            position = bisect_left(self.trigram_keys, trigram)
+            if position < len(self.trigram_keys) and self.trigram_keys[position] == trigram:
+                counts.update(self.postings[self.posting_offsets[position]:self.posting_offsets[position + 1]])
+        return [index for index, _ in counts.most_common(limit)]
+
+    def search(self, name: str, country: Optional[str] = None, limit: int = 5) -> List[GazetteerEntry]:
+        """Villes les plus proches du nom, classées par similarité et population"""
+        key = normalize_name(name)
+        if not key:
+            return []
+        candidates = set(self._prefix_range(key, 64))
+        # Index de trigrammes seulement si le nom exact est inconnu (faute de frappe, variante)
+        if not any(self.keys[index] == key for index in candidates):
+            candidates.update(self._trigram_candidates(key, 64))
+
+        ranked = []
+        for index in candidates:
+            entry = self._entry(index)
+            if country and entry.country != country:
+                continue
+            similarity = _similarity(key, self.keys[index])
+            ranked.append((similarity + self.population_weight * log10(entry.population + 1), similarity, index))
+        ranked.sort(reverse=True)
+        return [self._entry(index, similarity) for _, similarity, index in ranked[:limit]]
+
+    def _country_code(self, hint: str) -> Optional[str]:
+        key = normalize_name(hint)
+        if key in self.countries:
+            return self.countries[key]
+        if len(key) == 2 and key.isalpha():
+            return key.upper()
+        return None
+
+    def _matches_hint(self, entry: GazetteerEntry, hint: str) -> bool:
+        """L'indication ("France", "FR", "Texas", "TX"...) désigne-t-elle le pays ou la région du lieu ?"""
+        key = normalize_name(hint)
+        if self._country_code(hint) == entry.country:
+            return True
+        return bool(key) and key in (normalize_name(entry.region), entry.region_code.casefold())
+
+    def lookup(self, query: str) -> Optional[Tuple[float, float]]:
+        """
+        (lat, lon) d'une requête "Ville" ou "Ville, [Région,] Pays", ou None si non résolue.
+        Chaque indication après la ville doit désigner le pays ou la région du lieu retenu :
+        une indication inconnue laisse la requête à Nominatim plutôt que de choisir une autre ville.
+        """
+        parts = [part.strip() for part in query.split(",") if part.strip()]
+        # Les adresses (numéros, rues...) restent pour Nominatim
+        if not parts or len(parts) > 3 or any(ch.isdigit() for ch in query):
+            return None
+        results = self.search(parts[0], limit=64)
+        for entry in results:
+            if entry.score >= self.min_score and all(self._matches_hint(entry, hint) for hint in parts[1:]):
+                return entry.latitude, entry.longitude
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_gazetteer() -> Optional[Gazetteer]:
+    """Gazetteer partagé (GAZETTEER_PATH), ou None"""
+    path = os.getenv("GAZETTEER_PATH")
+    return Gazetteer(path) if path else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construit un gazetteer à partir d'un export GeoNames")
+    parser.add_argument("dump")
+    parser.add_argument("output")
+    parser.add_argument("--countries", help="countryInfo.txt de GeoNames (noms de pays -> codes ISO)")
+    parser.add_argument("--regions", help="admin1CodesASCII.txt de GeoNames (noms des régions)")
+    args = parser.parse_args()
+
+    Gazetteer.build(args.dump, args.output, args.countries, args.regions)
+    print(f"{len(Gazetteer(args.output).keys)} names -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from backend.utils.geocoding import normalize_query
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "multimodal-agents", "generations.sqlite")
+
+
+def generation_key(model: str, prompt: str, size: Optional[str] = None, quality: Optional[str] = None, **extra) -> str:
+    """Clé d'une génération : deux prompts qui ne diffèrent que par la casse ou les espaces partagent leur résultat"""
+    payload = {"model": model, "prompt": normalize_query(prompt), "size": size, "quality": quality, **extra}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    Résultats de génération d'images (dicts JSON) stockés dans SQLite, partagés entre processus
+    (path=":memory:" pour un cache local).
+
+    Des demandes identiques simultanées sont regroupées : une seule génération est lancée et
+    son résultat est partagé. Les erreurs ne sont pas mises en cache.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS generation ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM generation WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO generation (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), None if ttl is None else time.time() + ttl)
+            )
+
+    def get_or_generate(
+        self,
+        key: str,
+        generate: Callable[[], Dict[str, Any]],
+        ttl: Optional[float] = None,
+        is_valid: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> Dict[str, Any]:
+        """
+        Résultat en cache, sinon généré (une seule fois pour des appels simultanés).
+        is_valid écarte une entrée dont la ressource a disparu (image supprimée du stockage...).
+        """
+        value = self.get(key)
+        if value is not None and (is_valid is None or is_valid(value)):
+            return value
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            # Une génération concurrente a pu se terminer entre-temps
+            value = self.get(key)
+            if value is None or (is_valid is not None and not is_valid(value)):
+                value = generate()
+                self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def generate_batch(
+    generate: Callable[[str], Dict[str, Any]],
+    prompts: List[str],
+    executor: ThreadPoolExecutor
+) -> List[Dict[str, Any]]:
+    """Génère les images de plusieurs prompts en parallèle ; une erreur n'affecte que son prompt"""
+    def run(prompt: str) -> Dict[str, Any]:
+        try:
+            return {"prompt": prompt, **generate(prompt)}
+        except Exception as e:
+            return {"prompt": prompt, "error": f"An error occurred: {str(e)}"}
+
+    # Le contexte est propagé (attribution des mesures HTTP à l'outil appelant)
+    futures = [executor.submit(contextvars.copy_context().run, run, prompt) for prompt in prompts]
+    return [future.result() for future in futures]
+
+
+@lru_cache(maxsize=None)
+def get_generation_cache() -> GenerationCache:
+    """Cache partagé par les outils de génération d'images (GENERATION_CACHE_PATH=":memory:" évite le disque)"""
+    return GenerationCache(os.getenv("GENERATION_CACHE_PATH", DEFAULT_CACHE_PATH))
@@ -0,0 +1,157 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Tuple
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from backend.utils.gazetteer import Gazetteer, get_gazetteer
+from backend.utils.http_client import get_http_client
+
+Coordinates = Tuple[float, float]
+# (coordonnées ou None si le lieu est introuvable, date d'expiration)
+Entry = Tuple[Optional[Coordinates], float]
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "multimodal-agents", "geocode.sqlite")
+
+
+def normalize_query(query: str) -> str:
+    """Clé de cache d'une requête : "  Paris,  France " et "paris, france" donnent la même clé"""
+    text = unicodedata.normalize("NFKC", str(query)).casefold()
+    text = re.sub(r"\s*,\s*", ", ", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" ,.")
+
+
+class GeocodeStore:
+    """Stockage SQLite des géocodages, partagé entre processus (path=":memory:" pour un cache local)"""
+
+    def __init__(self, path: str):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                " key TEXT PRIMARY KEY, value TEXT, expires_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM geocode WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        value = json.loads(row[0])
+        return (None if value is None else (value[0], value[1])), row[1]
+
+    def set(self, key: str, entry: Entry):
+        value, expires_at = entry
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO geocode (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(None if value is None else list(value)), expires_at)
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class Geocoder:
+    """
+    Géocodage Nominatim avec cache : LRU en mémoire devant un stockage SQLite persistant.
+    Avec un gazetteer, les noms de villes sont résolus localement, sans réseau.
+
+    Les lieux introuvables sont aussi mis en cache (negative_ttl), les erreurs réseau non.
+    Les coordonnées sont renvoyées en (lat, lon).
+    """
+
+    def __init__(
+        self,
+        cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+        ttl: float = 30 * 24 * 3600,
+        negative_ttl: float = 24 * 3600,
+        lru_size: int = 1024,
+        endpoint: str = "https://nominatim.openstreetmap.org/search",
+        user_agent: str = "MultimodalAIAgents/1.0",
+        gazetteer: Optional[Gazetteer] = None
+    ):
+        self.store = GeocodeStore(cache_path) if cache_path else None
+        self.gazetteer = gazetteer
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lru_size = lru_size
+        self.endpoint = endpoint
+        self.user_agent = user_agent
+        self._lru: "OrderedDict[str, Entry]" = OrderedDict()
+        self._lru_lock = threading.Lock()
+
+    def _lru_get(self, key: str) -> Optional[Entry]:
+        with self._lru_lock:
+            entry = self._lru.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                del self._lru[key]
+                return None
+            self._lru.move_to_end(key)
+            return entry
+
+    def _lru_set(self, key: str, entry: Entry):
+        with self._lru_lock:
+            self._lru[key] = entry
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def _search(self, query: str) -> Optional[Coordinates]:
+        response = get_http_client().get(
+            self.endpoint,
+            params={'q': query, 'format': 'json', 'limit': 1},
+            headers={'User-Agent': self.user_agent}
+        )
+        response.raise_for_status()
+        data = response.json()
+        if not data:
+            return None
+        return float(data[0]['lat']), float(data[0]['lon'])
+
+    def geocode(self, query: str) -> Optional[Coordinates]:
+        """Coordonnées (lat, lon) du lieu, ou None s'il est introuvable"""
+        key = normalize_query(query)
+        entry = self._lru_get(key)
+        if entry is None and self.gazetteer is not None:
+            value = self.gazetteer.lookup(query)
+            if value is not None:
+                entry = (value, time.time() + self.ttl)
+                self._lru_set(key, entry)
+        if entry is None and self.store is not None:
+            entry = self.store.get(key)
+            if entry is not None:
+                self._lru_set(key, entry)
+        if entry is not None:
+            return entry[0]
+
+        value = self._search(query)
+        entry = (value, time.time() + (self.ttl if value is not None else self.negative_ttl))
+        self._lru_set(key, entry)
+        if self.store is not None:
+            self.store.set(key, entry)
+        return value
+
+
+@lru_cache(maxsize=None)
+def get_geocoder() -> Geocoder:
+    """Géocodeur partagé par tous les outils du processus (GEOCODE_CACHE_PATH="" désactive le disque)"""
+    return Geocoder(
+        cache_path=os.getenv("GEOCODE_CACHE_PATH", DEFAULT_CACHE_PATH) or None,
+        gazetteer=get_gazetteer()
+    )
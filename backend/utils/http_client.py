@@ -0,0 +1,321 @@
+"""
+Client HTTP partagé par les outils : connexions keep-alive par hôte (HTTP/2 si le paquet h2
+est installé), délais de connexion et de lecture, nouvelles tentatives avec backoff
+exponentiel et gigue, compteurs par hôte.
+
+Chaque hôte a un disjoncteur (échec immédiat quand il est en panne). Un point d'accès peut
+avoir des miroirs, utilisés quand il est indisponible et pour les requêtes "couvertes" :
+une requête GET sans réponse au-delà du p95 de l'hôte est dupliquée, la première réponse
+valide l'emporte.
+
+Les limites de débit (rate_limit) sont appliquées à chaque tentative, et chaque requête est
+rattachée aux mesures de l'appel d'outil en cours.
+"""
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+
+import httpx
+
+from backend.agents.metrics import httpx_event_hooks, record_http_call
+from backend.utils.circuit_breaker import CircuitBreaker, LatencyTracker
+from backend.utils.rate_limit import RateLimiter, get_rate_limiter
+
+# Statuts transitoires : surcharge ou indisponibilité momentanée du serveur
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Erreurs survenues avant l'envoi de la requête : on peut réessayer quelle que soit la méthode
+_NOT_SENT = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Miroirs par préfixe d'URL. Les serveurs OSRM de la FOSSGIS ont un serveur par profil
+# (le profil de l'URL est ignoré par OSRM) : le préfixe inclut donc le profil.
+DEFAULT_MIRRORS = {
+    f"https://router.project-osrm.org/{service}/v1/{profile}": [
+        f"https://routing.openstreetmap.de/routed-{profile}/{service}/v1/driving"
+    ]
+    for service in ("route", "table")
+    for profile in ("car", "foot", "bike")
+}
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Le disjoncteur du point d'accès (ou de tous ses miroirs) coupe la requête"""
+
+
+_NOT_SENT += (CircuitOpenError,)
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@dataclass
+class HostStats:
+    requests: int = 0
+    retries: int = 0
+    errors: int = 0
+    hedges: int = 0
+    short_circuits: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["avg_ms"] = round(1000 * self.seconds / self.requests, 1) if self.requests else 0.0
+        return data
+
+
+class HttpClient:
+    """
+    Enveloppe d'un httpx.Client partagé (thread-safe).
+
+    Les méthodes idempotentes sont réessayées sur erreur réseau et statut transitoire
+    (RETRY_STATUSES) ; les autres seulement si la requête n'a pas pu partir, ou avec retry=True.
+    Chaque nouvelle tentative passe au point d'accès suivant (URL d'origine puis miroirs).
+
+    Les GET sont couverts après le p95 de l'hôte (hedge_after tant qu'il y a trop peu de
+    mesures), vers un miroir disponible ; sans miroir, la requête n'est pas dupliquée.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 15.0,
+        retries: int = 2,
+        backoff: float = 0.25,
+        max_backoff: float = 4.0,
+        http2: Optional[bool] = None,
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        keepalive_expiry: float = 30.0,
+        user_agent: str = "MultimodalAIAgents/1.0",
+        rate_limiter: Optional[RateLimiter] = None,
+        transport: Optional[httpx.BaseTransport] = None,
+        mirrors: Optional[Dict[str, List[str]]] = None,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        hedge_after: float = 1.0,
+        hedge_quantile: float = 0.95
+    ):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.mirrors: Dict[str, List[str]] = {}
+        for prefix, urls in (DEFAULT_MIRRORS if mirrors is None else mirrors).items():
+            self.configure_mirrors(prefix, urls)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.hedge_after = hedge_after
+        self.hedge_quantile = hedge_quantile
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_rate_limiter()
+        self._client = httpx.Client(
+            http2=_h2_available() if http2 is None else http2,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry
+            ),
+            headers={"User-Agent": user_agent},
+            follow_redirects=True,
+            transport=transport,
+            # Chaque réponse est rattachée aux mesures de l'appel d'outil en cours
+            event_hooks=httpx_event_hooks()
+        )
+        self._stats: Dict[str, HostStats] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+        self._lock = threading.Lock()
+        # Requêtes couvertes : la requête d'origine et son double tournent en parallèle
+        self._hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="http-hedge")
+
+    def configure_mirrors(self, prefix: str, urls: List[str]):
+        """Points d'accès de secours pour les URL commençant par prefix (liste vide : aucun)"""
+        self.mirrors[prefix.rstrip("/")] = [url.rstrip("/") for url in urls]
+
+    def endpoints(self, url: str) -> List[str]:
+        """L'URL puis ses équivalents sur les miroirs (préfixe le plus long)"""
+        for prefix in sorted(self.mirrors, key=len, reverse=True):
+            if url == prefix or url.startswith(prefix + "/") or url.startswith(prefix + "?"):
+                return [url] + [mirror + url[len(prefix):] for mirror in self.mirrors[prefix]]
+        return [url]
+
+    def _host_state(self, host: str):
+        with self._lock:
+            if host not in self._stats:
+                self._stats[host] = HostStats()
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self._latencies[host] = LatencyTracker()
+            return self._stats[host], self._breakers[host], self._latencies[host]
+
+    def _record(self, method: str, url: str, start: float, response: Optional[httpx.Response], retry: bool):
+        seconds = time.perf_counter() - start
+        stats, breaker, latencies = self._host_state(httpx.URL(url).host)
+        sent = len(response.request.content) if response is not None else 0
+        received = len(response.content) if response is not None else 0
+        failed = response is None or response.status_code >= 500
+        with self._lock:
+            stats.requests += 1
+            stats.retries += retry
+            stats.errors += failed
+            stats.bytes_sent += sent
+            stats.bytes_received += received
+            stats.seconds += seconds
+        if failed:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+            latencies.add(seconds)
+        # Les hooks httpx ne voient que les réponses : les échecs de transport sont rattachés ici
+        if response is None:
+            record_http_call(url, method, None, seconds, 0)
+
+    def _available(self, urls: List[str]) -> List[str]:
+        """Points d'accès dont le disjoncteur n'est pas ouvert"""
+        available = []
+        for url in urls:
+            stats, breaker, _ = self._host_state(httpx.URL(url).host)
+            if breaker.state != "open":
+                available.append(url)
+            else:
+                with self._lock:
+                    stats.short_circuits += 1
+        return available
+
+    def _send(self, method: str, url: str, retry: bool, kwargs: Dict[str, Any]) -> httpx.Response:
+        stats, breaker, _ = self._host_state(httpx.URL(url).host)
+        # En half_open, une seule requête d'essai passe
+        if not breaker.allow():
+            with self._lock:
+                stats.short_circuits += 1
+            raise CircuitOpenError(f"Circuit open for {httpx.URL(url).host}")
+        self.rate_limiter.acquire(url)
+        start = time.perf_counter()
+        try:
+            response = self._client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            self._record(method, url, start, None, retry)
+            raise
+        self._record(method, url, start, response, retry)
+        return response
+
+    def _hedge_delay(self, url: str) -> float:
+        _, _, latencies = self._host_state(httpx.URL(url).host)
+        quantile = latencies.percentile(self.hedge_quantile)
+        return max(0.05, quantile) if quantile is not None else self.hedge_after
+
+    def _hedged(self, method: str, urls: List[str], retry: bool, kwargs: Dict[str, Any]) -> httpx.Response:
+        """Envoie à urls[0] ; sans réponse après le p95, duplique vers le miroir urls[1]"""
+        def submit(url: str) -> Future:
+            # Le contexte est propagé (attribution des mesures HTTP à l'outil appelant)
+            return self._hedge_pool.submit(contextvars.copy_context().run, self._send, method, url, retry, kwargs)
+
+        primary = submit(urls[0])
+        done, _ = wait([primary], timeout=self._hedge_delay(urls[0]))
+        if done:
+            return primary.result()
+
+        stats, _, _ = self._host_state(httpx.URL(urls[0]).host)
+        with self._lock:
+            stats.hedges += 1
+        pending = {primary, submit(urls[1])}
+        first_error: Optional[Future] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None and future.result().status_code < 500:
+                    # La requête perdante se termine en arrière-plan, son résultat est ignoré
+                    return future.result()
+                first_error = first_error or future
+        return first_error.result()
+
+    def _delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+        if retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        # "Full jitter" : évite que des clients en échec réessaient tous au même instant
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def request(self, method: str, url: str, retry: Optional[bool] = None, hedge: Optional[bool] = None, **kwargs) -> httpx.Response:
+        """Envoie la requête (arguments de httpx.Client.request), avec nouvelles tentatives"""
+        method = method.upper()
+        retry = method in IDEMPOTENT_METHODS if retry is None else retry
+        hedge = method in ("GET", "HEAD") if hedge is None else hedge
+        endpoints = self.endpoints(url)
+        attempt = 0
+        while True:
+            available = self._available(endpoints)
+            if not available:
+                raise CircuitOpenError(f"Circuit open for {httpx.URL(url).host} and its mirrors")
+            # Chaque tentative commence par un autre point d'accès
+            shift = attempt % len(available)
+            targets = available[shift:] + available[:shift]
+            response = None
+            try:
+                # Une copie vers la même URL doublerait la charge d'un hôte déjà lent
+                if hedge and len(targets) > 1:
+                    response = self._hedged(method, targets, attempt > 0, kwargs)
+                else:
+                    response = self._send(method, targets[0], attempt > 0, kwargs)
+            except httpx.TransportError as e:
+                if attempt >= self.retries or not (retry or isinstance(e, _NOT_SENT)):
+                    raise
+            else:
+                # 429 : la requête a été refusée sans être traitée
+                retryable = retry or response.status_code == 429
+                if response.status_code not in RETRY_STATUSES or not retryable or attempt >= self.retries:
+                    return response
+            time.sleep(self._delay(attempt, response))
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Compteurs par hôte depuis le démarrage, état du disjoncteur et p95 des latences"""
+        with self._lock:
+            hosts = list(self._stats)
+        result = {}
+        for host in hosts:
+            stats, breaker, latencies = self._host_state(host)
+            p95 = latencies.percentile(0.95)
+            with self._lock:
+                result[host] = stats.to_dict()
+            result[host]["circuit"] = breaker.state
+            result[host]["p95_ms"] = round(1000 * p95, 1) if p95 is not None else None
+        return result
+
+    def close(self):
+        self._hedge_pool.shutdown(wait=False)
+        self._client.close()
+
+
+@lru_cache(maxsize=None)
+def get_http_client() -> HttpClient:
+    """
+    Client partagé par tout le processus (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_RETRIES).
+    HTTP_MIRRORS ajoute ou remplace des miroirs : {"https://nominatim.openstreetmap.org": ["https://..."]}
+    """
+    mirrors = dict(DEFAULT_MIRRORS)
+    mirrors.update(json.loads(os.getenv("HTTP_MIRRORS") or "{}"))
+    return HttpClient(
+        connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", 3)),
+        read_timeout=float(os.getenv("HTTP_READ_TIMEOUT", 15)),
+        retries=int(os.getenv("HTTP_RETRIES", 2)),
+        mirrors=mirrors
+    )
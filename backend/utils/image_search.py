@@ -0,0 +1,65 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List
+import contextvars
+import logging
+import threading
+
+from backend.utils.geocoding import normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+class ImageLookup:
+    """
+    Recherches d'images lancées en parallèle sur un pool de threads partagé.
+
+    Les résultats sont mis en cache par requête normalisée (LRU), et une requête déjà en
+    cours est partagée au lieu d'être relancée. Les erreurs de recherche ne sont pas mises
+    en cache et donnent une URL vide.
+    """
+
+    def __init__(self, search: Callable[[str], str], max_workers: int = 6, maxsize: int = 2048):
+        self._search = search
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-search")
+        self.maxsize = maxsize
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _run(self, key: str, query: str) -> str:
+        try:
+            url = self._search(query)
+        except Exception:
+            logger.warning("Image search failed for %r", query, exc_info=True)
+            with self._lock:
+                self._inflight.pop(key, None)
+            return ""
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._cache[key] = url
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return url
+
+    def submit(self, query: str) -> Future:
+        """Future de l'URL de l'image pour la requête (déjà résolue si elle est en cache)"""
+        key = normalize_query(query)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                future = Future()
+                future.set_result(self._cache[key])
+                return future
+            future = self._inflight.get(key)
+            if future is None:
+                # Le contexte est propagé (attribution des mesures HTTP à l'outil appelant)
+                context = contextvars.copy_context()
+                future = self._pool.submit(context.run, self._run, key, query)
+                self._inflight[key] = future
+            return future
+
+    def lookup_many(self, queries: List[str]) -> List[str]:
+        """URLs des images de toutes les requêtes, recherchées en parallèle"""
+        return [future.result() for future in [self.submit(query) for query in queries]]
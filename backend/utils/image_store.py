@@ -0,0 +1,211 @@
+"""
+Stockage des images générées, adressé par contenu : une image est identifiée par le SHA-256
+de ses octets d'origine, encodée en WebP (pleine taille + miniatures) et servie par l'API
+sous /images/<digest>.webp et /images/<digest>.w<taille>.webp.
+
+Les fichiers les moins récemment utilisés sont supprimés au-delà de max_bytes.
+"""
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import hashlib
+import os
+import re
+import tempfile
+import threading
+
+from PIL import Image
+
+DEFAULT_ROOT = Path(__file__).parent.parent.parent / "images"
+
+# <digest>.webp ou <digest>.w<taille>.webp
+_NAME = re.compile(r"^([0-9a-f]{64})(?:\.w(\d+))?\.webp$")
+
+
+def _encode(data: bytes, thumbnail_sizes: Tuple[int, ...], quality: int) -> Dict[str, bytes]:
+    """Encode l'image en WebP et ses miniatures (exécuté dans un processus du pool)"""
+    image = Image.open(BytesIO(data))
+    image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    variants = {}
+    for size in (None, *thumbnail_sizes):
+        variant = image
+        if size is not None:
+            variant = image.copy()
+            variant.thumbnail((size, size))
+        output = BytesIO()
+        variant.save(output, format="WEBP", quality=quality, method=4)
+        variants["" if size is None else f".w{size}"] = output.getvalue()
+    return variants
+
+
+class ImageStore:
+    """
+    Répertoire d'images adressées par contenu, borné en taille (éviction LRU).
+
+    L'encodage (décodage PIL, WebP, miniatures) est fait dans un pool de processus pour ne pas
+    bloquer les threads de requête sous le GIL ; processes=0 encode dans le thread appelant.
+    """
+
+    def __init__(
+        self,
+        root=DEFAULT_ROOT,
+        max_bytes: int = 512 * 1024 * 1024,
+        thumbnail_sizes: Tuple[int, ...] = (256,),
+        quality: int = 85,
+        processes: Optional[int] = 2
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.thumbnail_sizes = tuple(thumbnail_sizes)
+        self.quality = quality
+        self.processes = processes
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+        # digest -> taille totale des variantes, du moins au plus récemment utilisé
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._scan()
+
+    def _scan(self):
+        """Reconstruit l'index LRU à partir des fichiers présents (date de dernier accès = mtime)"""
+        sizes: Dict[str, int] = {}
+        mtimes: Dict[str, float] = {}
+        for path in self.root.iterdir():
+            match = _NAME.match(path.name)
+            if not match:
+                continue
+            stat = path.stat()
+            digest = match.group(1)
+            sizes[digest] = sizes.get(digest, 0) + stat.st_size
+            if match.group(2) is None:
+                mtimes[digest] = stat.st_mtime
+        for digest in sorted(mtimes, key=mtimes.get):
+            self._entries[digest] = sizes[digest]
+            self._total += sizes[digest]
+
+    def _executor(self) -> Optional[Executor]:
+        if not self.processes:
+            return None
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.processes)
+            return self._pool
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def filename(self, digest: str, size: Optional[int] = None) -> str:
+        return f"{digest}.webp" if size is None else f"{digest}.w{size}.webp"
+
+    def path(self, name: str) -> Optional[Path]:
+        """Chemin d'un fichier stocké ("<digest>.webp", "<digest>.w256.webp"), ou None ; compte comme un accès"""
+        match = _NAME.match(name)
+        if not match:
+            return None
+        path = self.root / name
+        if not path.is_file():
+            return None
+        self._touch(match.group(1))
+        return path
+
+    def _touch(self, digest: str):
+        with self._lock:
+            if digest in self._entries:
+                self._entries.move_to_end(digest)
+        try:
+            os.utime(self.root / self.filename(digest))
+        except OSError:
+            pass
+
+    def put(self, data: bytes) -> str:
+        """Stocke l'image (octets PNG, JPEG...) et renvoie son digest ; une image déjà connue n'est pas réencodée"""
+        return self.put_async(data).result()
+
+    def put_async(self, data: bytes) -> Future:
+        """Future du digest : l'encodage se poursuit dans le pool de processus"""
+        digest = self.digest(data)
+        with self._lock:
+            known = digest in self._entries
+        if known and (self.root / self.filename(digest)).is_file():
+            self._touch(digest)
+            future = Future()
+            future.set_result(digest)
+            return future
+
+        executor = self._executor()
+        if executor is None:
+            future = Future()
+            try:
+                future.set_result(self._store(digest, _encode(data, self.thumbnail_sizes, self.quality)))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        encoded = executor.submit(_encode, data, self.thumbnail_sizes, self.quality)
+        stored = Future()
+
+        def _done(result: Future):
+            try:
+                stored.set_result(self._store(digest, result.result()))
+            except Exception as e:
+                stored.set_exception(e)
+
+        encoded.add_done_callback(_done)
+        return stored
+
+    def _store(self, digest: str, variants: Dict[str, bytes]) -> str:
+        # Écriture atomique : un fichier servi est toujours complet
+        for suffix, content in variants.items():
+            fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp, self.root / f"{digest}{suffix}.webp")
+
+        size = sum(len(content) for content in variants.values())
+        with self._lock:
+            self._total += size - self._entries.pop(digest, 0)
+            self._entries[digest] = size
+            evicted = []
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                old, old_size = self._entries.popitem(last=False)
+                self._total -= old_size
+                evicted.append(old)
+        for old in evicted:
+            self._remove(old)
+        return digest
+
+    def _remove(self, digest: str):
+        for size in (None, *self.thumbnail_sizes):
+            try:
+                (self.root / self.filename(digest, size)).unlink()
+            except FileNotFoundError:
+                pass
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def __contains__(self, digest: str) -> bool:
+        with self._lock:
+            return digest in self._entries
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+
+
+@lru_cache(maxsize=None)
+def get_image_store() -> ImageStore:
+    """Stockage partagé (IMAGE_STORE_DIR, IMAGE_STORE_MAX_MB)"""
+    return ImageStore(
+        root=os.getenv("IMAGE_STORE_DIR", DEFAULT_ROOT),
+        max_bytes=int(os.getenv("IMAGE_STORE_MAX_MB", 512)) * 1024 * 1024
+    )
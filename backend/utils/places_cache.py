@@ -0,0 +1,222 @@
+"""
+Recherches Google Places (searchText, searchNearby) avec cache par cellule geohash.
+
+Une recherche autour d'un centre réutilise le résultat d'une recherche identique (mêmes types,
+même masque de champs) dont le centre est dans la même cellule ou une cellule voisine, à moins
+de max_shift_m : pour un cercle de 30 km, décaler le centre de quelques km change peu la liste.
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from backend.utils.gazetteer import get_gazetteer
+from backend.utils.geocoding import normalize_query
+from backend.utils.http_client import get_http_client
+from backend.utils.road_graph import haversine_m
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "multimodal-agents", "places.sqlite")
+PLACES_ENDPOINT = "https://places.googleapis.com/v1"
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(latitude: float, longitude: float, precision: int = 5) -> str:
+    """Geohash du point (précision 5 : cellules d'environ 4,9 × 4,9 km)"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Dimensions (degrés de latitude, degrés de longitude) d'une cellule geohash"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def neighbour_cells(latitude: float, longitude: float, precision: int = 5) -> List[str]:
+    """La cellule du point puis ses 8 voisines"""
+    dlat, dlon = cell_size(precision)
+    cells = [geohash(latitude, longitude, precision)]
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            cell = geohash(max(-90.0, min(90.0, latitude + i * dlat)), (longitude + j * dlon + 180) % 360 - 180, precision)
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+class PlacesCache:
+    """Résultats de recherches Places et centres des lieux recherchés, stockés dans SQLite"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = 7 * 24 * 3600, precision: int = 5, max_shift_m: float = 5000):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.ttl = ttl
+        self.precision = precision
+        self.max_shift_m = max_shift_m
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS nearby ("
+                " cell TEXT, query TEXT, latitude REAL, longitude REAL, value TEXT, expires_at REAL,"
+                " PRIMARY KEY (cell, query))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS location ("
+                " key TEXT PRIMARY KEY, latitude REAL, longitude REAL, expires_at REAL)"
+            )
+
+    @staticmethod
+    def query_key(types: List[str], field_mask: str, max_results: int, radius: float) -> str:
+        return json.dumps([sorted(types), ",".join(sorted(field_mask.split(","))), max_results, radius])
+
+    def get_nearby(self, latitude: float, longitude: float, query: str) -> Optional[List[Dict[str, Any]]]:
+        """Résultat en cache de la recherche la plus proche du centre (cellule ou voisines), ou None"""
+        cells = neighbour_cells(latitude, longitude, self.precision)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT latitude, longitude, value FROM nearby WHERE query = ? AND expires_at >= ?"
+                f" AND cell IN ({','.join('?' * len(cells))})",
+                (query, time.time(), *cells)
+            ).fetchall()
+        ranked = sorted((haversine_m(latitude, longitude, row[0], row[1]), row[2]) for row in rows)
+        if not ranked or ranked[0][0] > self.max_shift_m:
+            return None
+        return json.loads(ranked[0][1])
+
+    def set_nearby(self, latitude: float, longitude: float, query: str, places: List[Dict[str, Any]]):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO nearby VALUES (?, ?, ?, ?, ?, ?)",
+                (geohash(latitude, longitude, self.precision), query, latitude, longitude,
+                 json.dumps(places), time.time() + self.ttl)
+            )
+
+    def get_location(self, text: str) -> Optional[Tuple[float, float]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT latitude, longitude FROM location WHERE key = ? AND expires_at >= ?",
+                (normalize_query(text), time.time())
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set_location(self, text: str, coordinates: Tuple[float, float]):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO location VALUES (?, ?, ?, ?)",
+                (normalize_query(text), coordinates[0], coordinates[1], time.time() + self.ttl)
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class PlacesError(Exception):
+    """Réponse d'erreur de l'API Places"""
+
+
+class PlacesSearch:
+    """
+    Géocodage (searchText) et recherche autour d'un point (searchNearby) via l'API Places,
+    avec cache. Les villes connues du gazetteer local sont géocodées sans appel.
+    """
+
+    def __init__(self, cache: Optional[PlacesCache] = None, api_key: Optional[str] = None):
+        self.cache = cache
+        self.api_key = api_key
+
+    def _post(self, method: str, payload: Dict[str, Any], field_mask: str) -> Dict[str, Any]:
+        response = get_http_client().post(
+            f"{PLACES_ENDPOINT}/places:{method}",
+            headers={
+                "Content-Type": "application/json",
+                "X-Goog-Api-Key": self.api_key or os.getenv('GOOGLE_API_KEY'),
+                "X-Goog-FieldMask": field_mask
+            },
+            json=payload
+        )
+        if response.status_code != 200:
+            try:
+                message = response.json().get('error', {}).get('message', response.text)
+            except ValueError:
+                message = response.text
+            raise PlacesError(message)
+        return response.json()
+
+    def locate(self, text: str) -> Optional[Tuple[float, float]]:
+        """(lat, lon) du lieu, ou None s'il est introuvable"""
+        gazetteer = get_gazetteer()
+        coordinates = gazetteer.lookup(text) if gazetteer is not None else None
+        if coordinates is None and self.cache is not None:
+            coordinates = self.cache.get_location(text)
+        if coordinates is not None:
+            return coordinates
+
+        data = self._post("searchText", {"textQuery": text, "maxResultCount": 1}, "places.location")
+        if not data.get('places'):
+            return None
+        location = data['places'][0]['location']
+        coordinates = (location['latitude'], location['longitude'])
+        if self.cache is not None:
+            self.cache.set_location(text, coordinates)
+        return coordinates
+
+    def nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        types: List[str],
+        field_mask: str,
+        max_results: int,
+        radius: float = 30000.0
+    ) -> List[Dict[str, Any]]:
+        """Lieux des types demandés dans le cercle (réponse "places" de searchNearby)"""
+        query = PlacesCache.query_key(types, field_mask, max_results, radius)
+        if self.cache is not None:
+            places = self.cache.get_nearby(latitude, longitude, query)
+            if places is not None:
+                return places
+
+        data = self._post("searchNearby", {
+            "includedTypes": types,
+            "maxResultCount": max_results,
+            "locationRestriction": {
+                "circle": {
+                    "center": {"latitude": latitude, "longitude": longitude},
+                    "radius": radius
+                }
+            }
+        }, field_mask)
+        places = data.get('places', [])
+        if self.cache is not None:
+            self.cache.set_nearby(latitude, longitude, query, places)
+        return places
+
+
+@lru_cache(maxsize=None)
+def get_places_search() -> PlacesSearch:
+    """Recherche Places partagée (PLACES_CACHE_PATH="" désactive le cache)"""
+    path = os.getenv("PLACES_CACHE_PATH", DEFAULT_CACHE_PATH)
+    return PlacesSearch(cache=PlacesCache(path) if path else None)
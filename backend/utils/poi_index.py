@@ -0,0 +1,170 @@
+"""
+Index local des hébergements (tourism=hotel, motel, guest_house...) extraits d'un fichier OSM.
+
+Construction (une fois) :
+    python -m backend.utils.poi_index region.osm lodging.json
+Utilisation par HotelToolOpen :
+    LODGING_INDEX_PATH=lodging.json
+"""
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from math import ceil, cos, floor, radians
+from typing import Dict, List, Optional, Tuple
+import argparse
+import heapq
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+
+from backend.utils.road_graph import haversine_m
+
+LODGING_KINDS = ("hotel", "motel", "guest_house", "hostel", "apartment", "chalet", "alpine_hut")
+
+_METERS_PER_DEGREE = 111320
+
+
+@dataclass
+class LodgingPOI:
+    osm_type: str
+    osm_id: int
+    name: str
+    kind: str
+    latitude: float
+    longitude: float
+    address: str = ""
+    stars: Optional[float] = None
+
+
+def _parse_stars(value: Optional[str]) -> Optional[float]:
+    match = re.match(r"\s*(\d+(?:\.\d+)?)", value or "")
+    return float(match.group(1)) if match else None
+
+
+def _address(tags: Dict[str, str]) -> str:
+    street = " ".join(filter(None, [tags.get("addr:housenumber"), tags.get("addr:street")]))
+    city = " ".join(filter(None, [tags.get("addr:postcode"), tags.get("addr:city")]))
+    return ", ".join(filter(None, [street, city]))
+
+
+class LodgingIndex:
+    """
+    Grille régulière (cellules de cell_size degrés) sur les hébergements : requêtes par rayon
+    et k plus proches voisins, en mémoire.
+    """
+
+    def __init__(self, pois: List[LodgingPOI], cell_size: float = 0.05):
+        self.pois = pois
+        self.cell_size = cell_size
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+        for index, poi in enumerate(pois):
+            self._grid.setdefault(self._cell(poi.latitude, poi.longitude), []).append(index)
+
+    def __len__(self) -> int:
+        return len(self.pois)
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return floor(latitude / self.cell_size), floor(longitude / self.cell_size)
+
+    def _cells_around(self, latitude: float, longitude: float, radius_m: float):
+        row, col = self._cell(latitude, longitude)
+        rows = ceil(radius_m / (_METERS_PER_DEGREE * self.cell_size))
+        cols = ceil(radius_m / (_METERS_PER_DEGREE * max(cos(radians(latitude)), 0.01) * self.cell_size))
+        for r in range(row - rows, row + rows + 1):
+            for c in range(col - cols, col + cols + 1):
+                yield from self._grid.get((r, c), ())
+
+    def _distance(self, index: int, latitude: float, longitude: float) -> float:
+        poi = self.pois[index]
+        return haversine_m(latitude, longitude, poi.latitude, poi.longitude)
+
+    def within_radius(self, latitude: float, longitude: float, radius_m: float, limit: int = 10) -> List[Tuple[LodgingPOI, float]]:
+        """Hébergements dans le rayon, classés par distance pondérée par les étoiles : [(poi, distance m)]"""
+        ranked = []
+        for index in self._cells_around(latitude, longitude, radius_m):
+            distance = self._distance(index, latitude, longitude)
+            if distance <= radius_m:
+                stars = self.pois[index].stars or 0
+                # Un hôtel 5 étoiles compte comme 25 % plus proche
+                ranked.append((distance * (1 - 0.05 * min(stars, 5)), distance, index))
+        return [(self.pois[index], distance) for _, distance, index in heapq.nsmallest(limit, ranked)]
+
+    def nearest(self, latitude: float, longitude: float, k: int = 5, max_distance_m: float = 100000) -> List[Tuple[LodgingPOI, float]]:
+        """Les k hébergements les plus proches : [(poi, distance m)]"""
+        radius = _METERS_PER_DEGREE * self.cell_size
+        while True:
+            found = sorted(
+                (self._distance(index, latitude, longitude), index)
+                for index in self._cells_around(latitude, longitude, min(radius, max_distance_m))
+            )
+            found = [(distance, index) for distance, index in found if distance <= min(radius, max_distance_m)]
+            # Au-delà du rayon parcouru, un voisin plus proche reste possible : on élargit
+            if len(found) >= k or radius >= max_distance_m:
+                return [(self.pois[index], distance) for distance, index in found[:k]]
+            radius *= 2
+
+    # -- Construction et stockage ---------------------------------------------
+
+    @classmethod
+    def from_osm_xml(cls, source, **kwargs) -> "LodgingIndex":
+        """Extrait les hébergements (nœuds, et ways au centre de leurs nœuds) d'un fichier OSM XML"""
+        node_coordinates: Dict[int, Tuple[float, float]] = {}
+        pois = []
+        for _, elem in ET.iterparse(source, events=("end",)):
+            if elem.tag not in ("node", "way"):
+                continue
+            tags = {tag.get("k"): tag.get("v") for tag in elem.iter("tag")}
+            osm_id = int(elem.get("id"))
+            if elem.tag == "node":
+                coordinates = (float(elem.get("lat")), float(elem.get("lon")))
+                node_coordinates[osm_id] = coordinates
+            else:
+                points = [node_coordinates[int(nd.get("ref"))] for nd in elem.iter("nd") if int(nd.get("ref")) in node_coordinates]
+                coordinates = (
+                    (sum(lat for lat, _ in points) / len(points), sum(lon for _, lon in points) / len(points))
+                    if points else None
+                )
+            if tags.get("tourism") in LODGING_KINDS and tags.get("name") and coordinates:
+                pois.append(LodgingPOI(
+                    osm_type=elem.tag,
+                    osm_id=osm_id,
+                    name=tags["name"],
+                    kind=tags["tourism"],
+                    latitude=coordinates[0],
+                    longitude=coordinates[1],
+                    address=_address(tags),
+                    stars=_parse_stars(tags.get("stars"))
+                ))
+            elem.clear()
+        return cls(pois, **kwargs)
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([asdict(poi) for poi in self.pois], f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "LodgingIndex":
+        with open(path, encoding="utf-8") as f:
+            return cls([LodgingPOI(**poi) for poi in json.load(f)], **kwargs)
+
+
+@lru_cache(maxsize=None)
+def get_lodging_index() -> Optional[LodgingIndex]:
+    """Index partagé (LODGING_INDEX_PATH), ou None pour interroger Nominatim"""
+    path = os.getenv("LODGING_INDEX_PATH")
+    return LodgingIndex.load(path) if path else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extrait les hébergements d'un fichier OSM XML")
+    parser.add_argument("osm")
+    parser.add_argument("output")
+    args = parser.parse_args()
+
+    index = LodgingIndex.from_osm_xml(args.osm)
+    index.save(args.output)
+    print(f"{len(index)} lodgings -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
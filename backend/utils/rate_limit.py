@@ -0,0 +1,129 @@
+from functools import lru_cache
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import os
+import sqlite3
+import threading
+import time
+
+# Limites par défaut (requêtes/s, rafale) des services publics utilisés par les outils
+DEFAULT_LIMITS = {
+    # https://operations.osmfoundation.org/policies/nominatim/ : 1 requête/s au plus
+    "nominatim.openstreetmap.org": (1.0, 1.0),
+}
+
+
+class TokenBucket:
+    """Seau à jetons partagé par les threads du processus.
+
+    acquire() réserve un jeton et n'attend que si le budget est épuisé : les appelants
+    en excès sont espacés de 1/rate secondes, dans l'ordre de leur réservation.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Attend si nécessaire et renvoie le temps d'attente (secondes)"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class SqliteTokenBucket(TokenBucket):
+    """Seau à jetons dont l'état est partagé entre processus via une base SQLite"""
+
+    def __init__(self, path: str, key: str, rate: float, capacity: float = 1.0):
+        super().__init__(rate, capacity)
+        self.key = key
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS token_bucket ("
+                " key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _reserve(self, tokens: float) -> float:
+        with self._lock:
+            # BEGIN IMMEDIATE verrouille la base : une seule réservation à la fois, tous processus confondus
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._db.execute(
+                    "SELECT tokens, updated FROM token_bucket WHERE key = ?", (self.key,)
+                ).fetchone()
+                available = self.capacity if row is None else min(
+                    self.capacity, row[0] + (now - row[1]) * self.rate
+                )
+                available -= tokens
+                self._db.execute(
+                    "INSERT OR REPLACE INTO token_bucket (key, tokens, updated) VALUES (?, ?, ?)",
+                    (self.key, available, now)
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            return max(0.0, -available / self.rate)
+
+
+class RateLimiter:
+    """Un seau à jetons par hôte ; les hôtes sans limite configurée ne sont jamais freinés.
+
+    Avec `path`, l'état des seaux est stocké dans une base SQLite partagée par tous
+    les processus (ex: plusieurs workers gunicorn).
+    """
+
+    def __init__(self, limits: Optional[Dict[str, tuple]] = None, path: Optional[str] = None):
+        self.path = path
+        self._limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, host: str, rate: float, capacity: float = 1.0):
+        with self._lock:
+            self._limits[host] = (rate, capacity)
+            self._buckets.pop(host, None)
+
+    def _bucket(self, host: str) -> Optional[TokenBucket]:
+        bucket = self._buckets.get(host)
+        if bucket is None and host in self._limits:
+            with self._lock:
+                bucket = self._buckets.get(host)
+                if bucket is None:
+                    rate, capacity = self._limits[host]
+                    if self.path:
+                        bucket = SqliteTokenBucket(self.path, host, rate, capacity)
+                    else:
+                        bucket = TokenBucket(rate, capacity)
+                    self._buckets[host] = bucket
+        return bucket
+
+    @staticmethod
+    def _host(url_or_host: str) -> str:
+        return urlsplit(url_or_host).hostname if "://" in url_or_host else url_or_host
+
+    def acquire(self, url_or_host: str) -> float:
+        """Réserve une requête vers l'hôte (URL complète ou nom d'hôte), renvoie l'attente"""
+        host = self._host(url_or_host)
+        bucket = self._bucket(host)
+        return bucket.acquire() if bucket is not None else 0.0
+
+
+@lru_cache(maxsize=None)
+def get_rate_limiter() -> RateLimiter:
+    """Limiteur partagé par tout le processus (RATE_LIMIT_DB : base SQLite partagée entre processus)"""
+    return RateLimiter(path=os.getenv("RATE_LIMIT_DB") or None)
@@ -0,0 +1,379 @@
+"""
+Moteur de routage hors ligne : graphe routier compact (CSR) construit à partir d'un extrait OSM.
+
+Construction du graphe (une fois) :
+    python -m backend.utils.road_graph region.osm region.graph --profile car
+Utilisation par OpenStreetMapTool :
+    ROAD_GRAPH_PATH=region.graph
+"""
+from array import array
+from functools import lru_cache
+from math import radians, sin, cos, asin, sqrt
+from typing import Dict, List, Optional, Tuple
+import argparse
+import heapq
+import json
+import os
+import re
+import struct
+import sys
+import xml.etree.ElementTree as ET
+
+EARTH_RADIUS_M = 6371008.8
+
+# Vitesses par type de route (km/h) ; les types absents ne sont pas praticables
+SPEEDS_KMH = {
+    "car": {
+        "motorway": 110, "motorway_link": 60, "trunk": 90, "trunk_link": 50,
+        "primary": 80, "primary_link": 45, "secondary": 70, "secondary_link": 40,
+        "tertiary": 60, "tertiary_link": 35, "unclassified": 50, "residential": 30,
+        "living_street": 10, "service": 20, "road": 40,
+    },
+    "bike": {
+        "primary": 18, "primary_link": 18, "secondary": 18, "secondary_link": 18,
+        "tertiary": 18, "tertiary_link": 18, "unclassified": 16, "residential": 16,
+        "living_street": 10, "service": 14, "road": 16, "cycleway": 18, "track": 12, "path": 12,
+    },
+    "foot": {
+        "primary": 5, "secondary": 5, "tertiary": 5, "unclassified": 5, "residential": 5,
+        "living_street": 5, "service": 5, "road": 5, "track": 5, "path": 5, "footway": 5,
+        "pedestrian": 5, "steps": 2, "cycleway": 5,
+    },
+}
+
+_MAGIC = b"RGRAPH\x01\n"
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * asin(min(1.0, sqrt(a)))
+
+
+def _parse_maxspeed(value: Optional[str]) -> Optional[float]:
+    match = re.match(r"\s*(\d+(?:\.\d+)?)\s*(mph)?", value or "")
+    if not match:
+        return None
+    speed = float(match.group(1))
+    return speed * 1.609 if match.group(2) else speed
+
+
+def _way_speed(tags: Dict[str, str], profile: str) -> Optional[float]:
+    speed = SPEEDS_KMH[profile].get(tags.get("highway"))
+    if speed is None or tags.get("access") in ("no", "private"):
+        return None
+    if profile == "car":
+        maxspeed = _parse_maxspeed(tags.get("maxspeed"))
+        if maxspeed:
+            speed = min(speed, maxspeed) if tags["highway"] not in ("motorway", "trunk") else maxspeed
+    return speed
+
+
+def _oneway(tags: Dict[str, str], profile: str) -> int:
+    """1 : sens de la way uniquement, -1 : sens inverse uniquement, 0 : double sens"""
+    if profile == "foot":
+        return 0
+    value = tags.get("oneway")
+    if value in ("yes", "1", "true"):
+        return 1
+    if value == "-1":
+        return -1
+    if value is None and (tags.get("highway") in ("motorway", "motorway_link") or tags.get("junction") == "roundabout"):
+        return 1
+    return 0
+
+
+class RoadGraph:
+    """
+    Graphe routier orienté en CSR (tableaux `array`) pondéré par le temps de parcours.
+
+    Les arcs sortants du nœud u sont targets[offsets[u]:offsets[u+1]] ; l'index inverse
+    (rev_offsets / rev_edges) donne les arcs entrants, pour la recherche bidirectionnelle.
+    Les coordonnées sont en (lat, lon).
+    """
+
+    def __init__(
+        self,
+        profile: str,
+        lat: array,
+        lon: array,
+        offsets: array,
+        targets: array,
+        sources: array,
+        times: array,
+        lengths: array,
+        rev_offsets: array,
+        rev_edges: array,
+        max_speed: float,
+        cell_size: float = 0.01
+    ):
+        self.profile = profile
+        self.lat = lat
+        self.lon = lon
+        self.offsets = offsets
+        self.targets = targets
+        self.sources = sources
+        self.times = times
+        self.lengths = lengths
+        self.rev_offsets = rev_offsets
+        self.rev_edges = rev_edges
+        # Vitesse maximale (m/s) : rend l'heuristique A* admissible
+        self.max_speed = max_speed
+        self.cell_size = cell_size
+        self._grid: Optional[Dict[Tuple[int, int], List[int]]] = None
+
+    @property
+    def node_count(self) -> int:
+        return len(self.lat)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    # -- Construction -------------------------------------------------------
+
+    @classmethod
+    def from_edges(cls, profile: str, coordinates: List[Tuple[float, float]], edges: List[Tuple[int, int, float, float]]) -> "RoadGraph":
+        """Construit le CSR à partir d'arcs (source, cible, longueur m, durée s)"""
+        node_count = len(coordinates)
+        edges = sorted(edges)
+        offsets = array("q", [0] * (node_count + 1))
+        for source, _, _, _ in edges:
+            offsets[source + 1] += 1
+        for u in range(node_count):
+            offsets[u + 1] += offsets[u]
+
+        sources = array("i", (edge[0] for edge in edges))
+        targets = array("i", (edge[1] for edge in edges))
+        lengths = array("f", (edge[2] for edge in edges))
+        times = array("f", (edge[3] for edge in edges))
+
+        rev_offsets = array("q", [0] * (node_count + 1))
+        for target in targets:
+            rev_offsets[target + 1] += 1
+        for u in range(node_count):
+            rev_offsets[u + 1] += rev_offsets[u]
+        rev_edges = array("i", [0] * len(edges))
+        cursor = list(rev_offsets[:-1])
+        for e, target in enumerate(targets):
+            rev_edges[cursor[target]] = e
+            cursor[target] += 1
+
+        max_speed = max((length / time for length, time in zip(lengths, times) if time > 0), default=1.0)
+        return cls(
+            profile,
+            array("d", (lat for lat, _ in coordinates)),
+            array("d", (lon for _, lon in coordinates)),
+            offsets, targets, sources, times, lengths, rev_offsets, rev_edges, max_speed
+        )
+
+    @classmethod
+    def from_osm_xml(cls, source, profile: str = "car") -> "RoadGraph":
+        """Construit le graphe à partir d'un extrait OSM XML (chemin ou fichier ouvert)"""
+        if profile not in SPEEDS_KMH:
+            raise ValueError(f"Unknown routing profile: {profile}")
+        node_coordinates: Dict[int, Tuple[float, float]] = {}
+        ways = []
+        for _, elem in ET.iterparse(source, events=("end",)):
+            if elem.tag == "node":
+                node_coordinates[int(elem.get("id"))] = (float(elem.get("lat")), float(elem.get("lon")))
+                elem.clear()
+            elif elem.tag == "way":
+                tags = {tag.get("k"): tag.get("v") for tag in elem.iter("tag")}
+                speed = _way_speed(tags, profile)
+                if speed:
+                    refs = [int(nd.get("ref")) for nd in elem.iter("nd")]
+                    ways.append((refs, speed / 3.6, _oneway(tags, profile)))
+                elem.clear()
+
+        # Seuls les nœuds des routes praticables sont conservés, renumérotés de 0 à N-1
+        index: Dict[int, int] = {}
+        coordinates: List[Tuple[float, float]] = []
+        edges = []
+        for refs, speed, oneway in ways:
+            refs = [ref for ref in refs if ref in node_coordinates]
+            for a, b in zip(refs, refs[1:]):
+                for ref in (a, b):
+                    if ref not in index:
+                        index[ref] = len(coordinates)
+                        coordinates.append(node_coordinates[ref])
+                u, v = index[a], index[b]
+                length = haversine_m(*coordinates[u], *coordinates[v])
+                if oneway >= 0:
+                    edges.append((u, v, length, length / speed))
+                if oneway <= 0:
+                    edges.append((v, u, length, length / speed))
+        return cls.from_edges(profile, coordinates, edges)
+
+    # -- Stockage -----------------------------------------------------------
+
+    def _arrays(self) -> List[array]:
+        return [self.lat, self.lon, self.offsets, self.targets, self.sources,
+                self.times, self.lengths, self.rev_offsets, self.rev_edges]
+
+    def save(self, path: str):
+        header = json.dumps({
+            "profile": self.profile,
+            "nodes": self.node_count,
+            "edges": self.edge_count,
+            "max_speed": self.max_speed
+        }).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            for values in self._arrays():
+                if sys.byteorder == "big":
+                    values = array(values.typecode, values)
+                    values.byteswap()
+                values.tofile(f)
+
+    @classmethod
+    def load(cls, path: str) -> "RoadGraph":
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"Not a road graph file: {path}")
+            (header_size,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_size))
+            nodes, edges = header["nodes"], header["edges"]
+            arrays = []
+            for typecode, size in (("d", nodes), ("d", nodes), ("q", nodes + 1), ("i", edges), ("i", edges),
+                                   ("f", edges), ("f", edges), ("q", nodes + 1), ("i", edges)):
+                values = array(typecode)
+                values.fromfile(f, size)
+                if sys.byteorder == "big":
+                    values.byteswap()
+                arrays.append(values)
+        return cls(header["profile"], *arrays, max_speed=header["max_speed"])
+
+    # -- Requêtes -----------------------------------------------------------
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(lat // self.cell_size), int(lon // self.cell_size)
+
+    def nearest_node(self, lat: float, lon: float, max_distance_m: float = 5000) -> Optional[int]:
+        """Nœud le plus proche du point (grille construite au premier appel), ou None"""
+        if self._grid is None:
+            grid: Dict[Tuple[int, int], List[int]] = {}
+            for node in range(self.node_count):
+                grid.setdefault(self._cell(self.lat[node], self.lon[node]), []).append(node)
+            self._grid = grid
+
+        row, col = self._cell(lat, lon)
+        # Une cellule mesure au moins ~cell_size * 111 km * cos(lat) de large
+        cell_m = self.cell_size * 111000 * max(cos(radians(lat)), 0.1)
+        best, best_distance = None, max_distance_m
+        ring = 0
+        while ring * cell_m <= best_distance + cell_m:
+            for r in range(row - ring, row + ring + 1):
+                for c in range(col - ring, col + ring + 1):
+                    if max(abs(r - row), abs(c - col)) != ring:
+                        continue
+                    for node in self._grid.get((r, c), ()):
+                        distance = haversine_m(lat, lon, self.lat[node], self.lon[node])
+                        if distance <= best_distance:
+                            best, best_distance = node, distance
+            ring += 1
+        return best
+
+    def shortest_path(self, source: int, target: int) -> Optional[Tuple[float, float, List[int]]]:
+        """A* bidirectionnel (potentiels moyennés) : (durée s, longueur m, nœuds) ou None"""
+        if source == target:
+            return 0.0, 0.0, [source]
+
+        lat, lon = self.lat, self.lon
+        inverse_speed = 1.0 / self.max_speed
+        potentials: Dict[int, float] = {}
+
+        def potential(v: int) -> float:
+            p = potentials.get(v)
+            if p is None:
+                to_target = haversine_m(lat[v], lon[v], lat[target], lon[target])
+                from_source = haversine_m(lat[source], lon[source], lat[v], lon[v])
+                p = potentials[v] = (to_target - from_source) * inverse_speed / 2
+            return p
+
+        distances = ({source: 0.0}, {target: 0.0})
+        parents = ({source: -1}, {target: -1})
+        heaps = ([(potential(source), source)], [(-potential(target), target)])
+        settled = (set(), set())
+        best, meeting = float("inf"), None
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+            _, u = heapq.heappop(heaps[side])
+            if u in settled[side]:
+                continue
+            settled[side].add(u)
+            distance_u = distances[side][u]
+            other_distances = distances[1 - side]
+
+            if side == 0:
+                arcs = ((e, self.targets[e]) for e in range(self.offsets[u], self.offsets[u + 1]))
+            else:
+                arcs = ((e, self.sources[e]) for e in
+                        (self.rev_edges[k] for k in range(self.rev_offsets[u], self.rev_offsets[u + 1])))
+            for e, v in arcs:
+                candidate = distance_u + self.times[e]
+                if candidate < distances[side].get(v, float("inf")):
+                    distances[side][v] = candidate
+                    parents[side][v] = e
+                    key = candidate + potential(v) if side == 0 else candidate - potential(v)
+                    heapq.heappush(heaps[side], (key, v))
+                    if v in other_distances and candidate + other_distances[v] < best:
+                        best, meeting = candidate + other_distances[v], v
+
+        if meeting is None:
+            return None
+
+        nodes, length = [meeting], 0.0
+        e = parents[0][meeting]
+        while e != -1:
+            length += self.lengths[e]
+            nodes.append(self.sources[e])
+            e = parents[0][self.sources[e]]
+        nodes.reverse()
+        e = parents[1][meeting]
+        while e != -1:
+            length += self.lengths[e]
+            nodes.append(self.targets[e])
+            e = parents[1][self.targets[e]]
+        return best, length, nodes
+
+    def route(self, origin: Tuple[float, float], destination: Tuple[float, float]) -> Optional[Dict[str, float]]:
+        """Itinéraire entre deux points (lat, lon) : {"distance": m, "duration": s} ou None"""
+        source = self.nearest_node(*origin)
+        target = self.nearest_node(*destination)
+        if source is None or target is None:
+            return None
+        path = self.shortest_path(source, target)
+        if path is None:
+            return None
+        duration, distance, _ = path
+        return {"distance": distance, "duration": duration}
+
+
+@lru_cache(maxsize=None)
+def get_road_graph() -> Optional[RoadGraph]:
+    """Graphe local partagé (ROAD_GRAPH_PATH), ou None pour utiliser le serveur OSRM"""
+    path = os.getenv("ROAD_GRAPH_PATH")
+    return RoadGraph.load(path) if path else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construit un graphe routier à partir d'un extrait OSM XML")
+    parser.add_argument("osm")
+    parser.add_argument("output")
+    parser.add_argument("--profile", default="car", choices=sorted(SPEEDS_KMH))
+    args = parser.parse_args()
+
+    graph = RoadGraph.from_osm_xml(args.osm, profile=args.profile)
+    graph.save(args.output)
+    print(f"{graph.node_count} nodes, {graph.edge_count} edges -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -30,7 +30,16 @@ import { cx } from "class-variance-authority";
 // Derive our form values type from the zod schema.
 type TripValues = z.infer<typeof formSchema>;
 // Define a discriminated union type for a chunk:
-type Chunk = MessageChunk | ToolCallChunk | ToolResultChunk | ErrorChunk;
+type Chunk =
+	| MessageChunk
+	| MessageDeltaChunk
+	| ToolCallChunk
+	| ToolCallDeltaChunk
+	| ToolResultChunk
+	| ToolResultPatchChunk
+	| FinalResultChunk
+	| MetricsChunk
+	| ErrorChunk;
 
 interface MessageChunk {
 	type: "message";
@@ -42,6 +51,36 @@ interface MessageChunk {
 	};
 }
 
+interface MessageDeltaChunk {
+	type: "message_delta";
+	data: {
+		role: "assistant";
+		content: string;
+	};
+}
+
+interface ToolCallDeltaChunk {
+	type: "tool_call_delta";
+	data: {
+		index: number;
+		tool_name: string;
+		arguments_delta: string;
+	};
+}
+
+interface FinalResultChunk {
+	type: "final_result";
+	data: any;
+}
+
+interface MetricsChunk {
+	type: "metrics";
+	data: {
+		kind: "llm" | "tool" | "summary";
+		[key: string]: any;
+	};
+}
+
 interface ToolCallChunk {
 	type: "tool_call";
 	data: {
@@ -58,10 +97,23 @@ interface ToolResultChunk {
 	};
 }
 
+// A value of an earlier tool result that arrived later (e.g. a hotel image).
+interface ToolResultPatchChunk {
+	type: "tool_result_patch";
+	data: {
+		call_id: string | null;
+		path: (string | number)[];
+		value: any;
+	};
+}
+
+// A failed tool call carries its tool_name and call_id; the run goes on.
 interface ErrorChunk {
 	type: "error";
 	data: {
 		message: string;
+		tool_name?: string;
+		call_id?: string | null;
 	};
 }
 
@@ -113,14 +165,18 @@ export function TripForm() {
 		setAssistantStatus("");
 
 		let finalChunk: Chunk | null = null;
+		// Partial line left over from the previous read.
+		let buffer = "";
+		let lastType: Chunk["type"] | null = null;
 
 		// Read stream chunks.
 		while (true) {
 			const { done, value } = await reader.read();
 			if (done) break;
-			const chunkString = decoder.decode(value, { stream: true });
+			buffer += decoder.decode(value, { stream: true });
 			// Handle cases where multiple data lines may be present in one chunk.
-			const lines = chunkString.split("\n");
+			const lines = buffer.split("\n");
+			buffer = lines.pop() ?? "";
 			for (const line of lines) {
 				if (line.startsWith("data: ")) {
 					try {
@@ -128,7 +184,13 @@ export function TripForm() {
 							line.slice("data: ".length),
 						);
 						const chunk: Chunk = parsedData;
-						finalChunk = chunk;
+						// Keep the final result even if other events follow it.
+						if (
+							chunk.type === "final_result" ||
+							finalChunk?.type !== "final_result"
+						) {
+							finalChunk = chunk;
+						}
 
 						// Update assistant status if the chunk is an assistant message.
 						if (
@@ -136,7 +198,19 @@ export function TripForm() {
 							// chunk.data.role === "assistant"
 						) {
 							setAssistantStatus(chunk.data.content);
+						} else if (chunk.type === "metrics") {
+							// Timings of each LLM / tool call, and a summary of the trip.
+							console.info(`[trip metrics] ${chunk.data.kind}`, chunk.data);
+						} else if (chunk.type === "message_delta") {
+							// A new assistant turn starts with a fresh status.
+							const isNewTurn = lastType !== "message_delta";
+							setAssistantStatus((status) =>
+								isNewTurn
+									? chunk.data.content
+									: status + chunk.data.content,
+							);
 						}
+						lastType = chunk.type;
 					} catch (error) {
 						console.error("Error parsing stream chunk:", error);
 					}